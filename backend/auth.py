@@ -0,0 +1,132 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+
+PASSWORD_HASH_ITERATIONS = 200_000
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "64"))
+SESSION_TOKEN_TTL_SECONDS = int(os.environ.get("SESSION_TOKEN_TTL_SECONDS", "900"))
+SESSION_TOKEN_SECRET = os.environ.get("SESSION_TOKEN_SECRET")
+
+if not SESSION_TOKEN_SECRET:
+    # Tokens signed with a per-process secret only verify on the worker that
+    # issued them; set SESSION_TOKEN_SECRET when running several workers.
+    print("SESSION_TOKEN_SECRET not set, using a random per-process secret")
+    SESSION_TOKEN_SECRET = secrets.token_hex(32)
+
+
+def hash_password(password: str) -> str:
+    salt = secrets.token_bytes(16)
+    dk = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, PASSWORD_HASH_ITERATIONS)
+    return f"{salt.hex()}${dk.hex()}"
+
+
+def check_password(password: str, hashed: str) -> bool:
+    try:
+        parts = hashed.split('$')
+        if len(parts) != 2:
+            return False
+        salt_hex, hash_hex = parts
+        salt = bytes.fromhex(salt_hex)
+        expected = bytes.fromhex(hash_hex)
+        dk = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, PASSWORD_HASH_ITERATIONS)
+        return secrets.compare_digest(dk, expected)
+    except Exception:
+        return False
+
+
+class PasswordHasher:
+    """Runs PBKDF2 on a dedicated process pool with a cap on queued work.
+
+    Requests beyond PASSWORD_HASH_MAX_PENDING are rejected with 503 instead
+    of queueing, so a login storm cannot back up every other endpoint.
+    """
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected_total = 0
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            # Forking a server that already runs threads (executors, the
+            # result writer, listeners) can copy a held lock into the child.
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected_total += 1
+            raise HTTPException(status_code=503, detail="Server busy, please retry",
+                                headers={"Retry-After": "1"})
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password):
+        return await self._run(hash_password, password)
+
+    async def verify(self, password, hashed):
+        return await self._run(check_password, password, hashed)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected_total": self.rejected_total,
+        }
+
+
+password_hasher = PasswordHasher()
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SESSION_TOKEN_SECRET.encode("utf-8"), payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue_token(email: str, role: str, ttl_seconds: int = SESSION_TOKEN_TTL_SECONDS) -> str:
+    claims = {"sub": email, "role": role, "exp": int(time.time()) + ttl_seconds}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token: str):
+    """Return the token's claims, or None if it is malformed, forged or expired."""
+    try:
+        payload, signature = token.split(".")
+        # Compared as bytes: compare_digest rejects non-ASCII str arguments.
+        if not hmac.compare_digest(signature.encode("utf-8"), _sign(payload).encode("ascii")):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if not isinstance(claims, dict) or claims.get("exp", 0) < time.time():
+        return None
+    return claims
@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+import numpy as np
+
+ANSWER_LOG_DIR = os.environ.get("ANSWER_LOG_DIR", "answer_log")
+ANSWER_LOG_SEGMENT_ROWS = int(os.environ.get("ANSWER_LOG_SEGMENT_ROWS", "65536"))
+ANSWER_LOG_FLUSH_INTERVAL_SECONDS = float(os.environ.get("ANSWER_LOG_FLUSH_INTERVAL_SECONDS", "30"))
+
+DIFFICULTY_CODES = {"easy": 0, "medium": 1, "hard": 2}
+DIFFICULTY_LABELS = {code: label for label, code in DIFFICULTY_CODES.items()}
+# String columns are dictionary-encoded per segment: "<name>" holds int32
+# codes into "<name>_ids".
+_STRING_COLUMNS = ("session", "user", "question")
+
+
+class AnswerLog:
+    """Append-only log of graded answers, written as columnar segments.
+
+    Answers are buffered in memory and written by a background thread every
+    flush interval, or as soon as a segment's worth has accumulated. Each
+    segment is a directory of ``.npy`` column files renamed into place once
+    complete, so readers only ever see whole segments and can memory-map
+    them. Segment names carry the writer's pid, so several workers can share
+    one directory.
+    """
+
+    def __init__(self, directory=ANSWER_LOG_DIR, segment_rows=ANSWER_LOG_SEGMENT_ROWS,
+                 flush_interval=ANSWER_LOG_FLUSH_INTERVAL_SECONDS):
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._rows = []
+        self._full = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.recorded_total = 0
+        self.segments_total = 0
+        self.failed_flushes_total = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="answer-log", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._full.set()
+        self._thread.join(timeout=30)
+        self._thread = None
+        self.flush()
+
+    def record(self, session_id, user_id, question_id, difficulty, correct, response_ms=None):
+        row = (
+            session_id or "",
+            user_id or "",
+            question_id or "",
+            DIFFICULTY_CODES.get(difficulty, -1),
+            bool(correct),
+            -1 if response_ms is None else int(response_ms),
+            time.time(),
+        )
+        with self._lock:
+            self._rows.append(row)
+            self.recorded_total += 1
+            full = len(self._rows) >= self.segment_rows
+        if full:
+            if self._thread is None:
+                self.flush()
+            else:
+                self._full.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._full.wait(self.flush_interval)
+            self._full.clear()
+            if self._stopping.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                self.failed_flushes_total += 1
+                print(f"Answer log flush failed: {e}")
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return None
+        with self._write_lock:
+            try:
+                return self._write_segment(rows)
+            except Exception:
+                # Keep the answers for the next flush rather than dropping them.
+                with self._lock:
+                    self._rows[:0] = rows
+                raise
+
+    def _write_segment(self, rows):
+        session, user, question, difficulty, correct, response_ms, timestamp = zip(*rows)
+        columns = {
+            "difficulty": np.array(difficulty, dtype=np.int8),
+            "correct": np.array(correct, dtype=np.bool_),
+            "response_ms": np.array(response_ms, dtype=np.int32),
+            "timestamp": np.array(timestamp, dtype=np.float64),
+        }
+        for name, values in zip(_STRING_COLUMNS, (session, user, question)):
+            ids, codes = np.unique(np.array(values, dtype=str), return_inverse=True)
+            columns[name] = codes.astype(np.int32)
+            columns[f"{name}_ids"] = ids
+
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"segment-{time.time_ns()}-{os.getpid()}"
+        tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        os.makedirs(tmp_path)
+        for column, values in columns.items():
+            np.save(os.path.join(tmp_path, f"{column}.npy"), values)
+        path = os.path.join(self.directory, name)
+        os.rename(tmp_path, path)
+        self.segments_total += 1
+        return path
+
+    def stats(self):
+        with self._lock:
+            buffered = len(self._rows)
+        return {
+            "directory": self.directory,
+            "buffered": buffered,
+            "recorded_total": self.recorded_total,
+            "segments_total": self.segments_total,
+            "failed_flushes_total": self.failed_flushes_total,
+        }
+
+
+class AnswerLogReader:
+    """Memory-mapped access to the segments of an answer log directory."""
+
+    def __init__(self, directory=ANSWER_LOG_DIR):
+        self.directory = directory
+
+    def segments(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith("segment-")
+        )
+
+    @staticmethod
+    def read_segment(path, columns=None):
+        """Columns of one segment by name; numeric columns are memory-mapped."""
+        names = columns or [name[:-4] for name in os.listdir(path) if name.endswith(".npy")]
+        return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in names}
+
+    def item_statistics(self):
+        """Attempts, accuracy and mean response time per question id."""
+        index = {}
+        attempts = np.zeros(0, dtype=np.int64)
+        correct = np.zeros(0, dtype=np.int64)
+        timed = np.zeros(0, dtype=np.int64)
+        response_total = np.zeros(0, dtype=np.float64)
+
+        for path in self.segments():
+            segment = self.read_segment(path, ("question", "question_ids", "correct", "response_ms"))
+            question_ids = segment["question_ids"]
+            for question_id in question_ids:
+                index.setdefault(str(question_id), len(index))
+            if len(index) > len(attempts):
+                grow = len(index) - len(attempts)
+                attempts, correct, timed = (np.pad(a, (0, grow)) for a in (attempts, correct, timed))
+                response_total = np.pad(response_total, (0, grow))
+
+            # Per-segment counts by local code, then scattered to global rows.
+            rows = np.fromiter((index[str(q)] for q in question_ids), dtype=np.int64, count=len(question_ids))
+            codes = np.asarray(segment["question"])
+            response_ms = np.asarray(segment["response_ms"])
+            has_time = response_ms >= 0
+            attempts[rows] += np.bincount(codes, minlength=len(rows))
+            correct[rows] += np.bincount(codes, weights=segment["correct"], minlength=len(rows)).astype(np.int64)
+            timed[rows] += np.bincount(codes[has_time], minlength=len(rows))
+            response_total[rows] += np.bincount(codes[has_time], weights=response_ms[has_time], minlength=len(rows))
+
+        statistics = {}
+        for question_id, row in index.items():
+            statistics[question_id] = {
+                "attempts": int(attempts[row]),
+                "correct": int(correct[row]),
+                "p_correct": round(correct[row] / attempts[row], 4) if attempts[row] else None,
+                "mean_response_ms": round(response_total[row] / timed[row], 1) if timed[row] else None,
+            }
+        return statistics
+
+
+answer_log = AnswerLog()
+answer_log_reader = AnswerLogReader()
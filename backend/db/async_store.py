@@ -0,0 +1,88 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from backend.db import firebase_config
+from backend.metrics import datastore_timer
+
+FIRESTORE_MAX_CONCURRENCY = int(os.environ.get("FIRESTORE_MAX_CONCURRENCY", "64"))
+
+
+class AsyncCollection:
+    """Async access to one collection.
+
+    Blocking client calls run on an executor owned by this collection, so a
+    request waiting on the network suspends its coroutine instead of holding
+    one of Starlette's shared threadpool slots, and a burst against one
+    collection cannot exhaust capacity for the others.
+    """
+
+    def __init__(self, name, max_concurrency=FIRESTORE_MAX_CONCURRENCY):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"store-{name}")
+        self.in_flight = 0
+        self.calls_total = 0
+
+    @property
+    def collection(self):
+        return getattr(firebase_config, f"{self.name}_collection")
+
+    async def _call(self, operation, fn):
+        def timed():
+            with datastore_timer(self.name, operation):
+                return fn()
+
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        self.calls_total += 1
+        try:
+            return await loop.run_in_executor(self._executor, timed)
+        finally:
+            self.in_flight -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        # Arbitrary blocking work is labelled with the function's name.
+        return await self._call(getattr(fn, "__name__", "run"), functools.partial(fn, *args, **kwargs))
+
+    async def get(self, doc_id):
+        def _get():
+            doc = self.collection.document(doc_id).get()
+            return doc.to_dict() if doc.exists else None
+        return await self._call("get", _get)
+
+    async def set(self, doc_id, data, merge=False):
+        await self._call("set", lambda: self.collection.document(doc_id).set(data, merge=merge))
+
+    async def add(self, data):
+        def _add():
+            doc_ref = self.collection.document()
+            doc_ref.set(data)
+            return doc_ref.id
+        return await self._call("add", _add)
+
+    async def delete(self, doc_id):
+        await self._call("delete", lambda: self.collection.document(doc_id).delete())
+
+    async def where(self, field, op, value):
+        def _where():
+            return [(doc.id, doc.to_dict()) for doc in self.collection.where(field, op, value).stream()]
+        return await self._call("where", _where)
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "calls_total": self.calls_total,
+        }
+
+
+users = AsyncCollection("users")
+questions = AsyncCollection("questions")
+results = AsyncCollection("results")
+quizzes = AsyncCollection("quizzes")
+user_stats = AsyncCollection("user_stats")
+submissions = AsyncCollection("submissions")
+# Quiz sessions live in the session store rather than a datastore
+# collection; only ``run`` is used with it.
+sessions = AsyncCollection("sessions")
@@ -1,21 +1,51 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
 import os
 
+# firestore (default) talks to Google Cloud; memory and sqlite run offline
+# through backend.db.local_store with the same client API.
+DATASTORE_BACKEND = os.environ.get("DATASTORE_BACKEND", "firestore")
+DATASTORE_SQLITE_PATH = os.environ.get("DATASTORE_SQLITE_PATH", "nexus_quiz.db")
+# Firestore rejects batched writes and transactions with more than 500 operations.
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def run_transaction(client, callback):
+    """Run ``callback(transaction)`` as one read-modify-write transaction.
+
+    The callback reads with ``ref.get(transaction=transaction)`` and writes
+    with ``transaction.set``. Firestore retries it on contention; local
+    datastores serialise it against every other write.
+    """
+    if hasattr(client, "run_transaction"):
+        return client.run_transaction(callback)
+    from google.cloud import firestore as cloud_firestore
+    return cloud_firestore.transactional(callback)(client.transaction())
+
 try:
-    json_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+    if DATASTORE_BACKEND == "firestore":
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+
+        json_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+
+        if not json_path:
+            raise ValueError("GOOGLE_APPLICATION_CREDENTIALS environment variable not set")
+
+        cred = credentials.Certificate(json_path)
+        firebase_admin.initialize_app(cred)
 
-    if not json_path:
-        raise ValueError("GOOGLE_APPLICATION_CREDENTIALS environment variable not set")
+        db = firestore.client()
+    else:
+        from backend.db.local_store import create_local_client
 
-    cred = credentials.Certificate(json_path)
-    firebase_admin.initialize_app(cred)
+        db = create_local_client(DATASTORE_BACKEND, DATASTORE_SQLITE_PATH)
+        print(f"Using local {DATASTORE_BACKEND} datastore")
 
-    db = firestore.client()
     users_collection = db.collection("users")
     questions_collection = db.collection("questions")
     results_collection = db.collection("results")
     quizzes_collection = db.collection("quizzes")
+    user_stats_collection = db.collection("user_stats")
+    submissions_collection = db.collection("submissions")
 
 except Exception as e:
     print(f"Firebase initialization error: {e}")
@@ -24,3 +54,5 @@ except Exception as e:
     questions_collection = None
     results_collection = None
     quizzes_collection = None
+    user_stats_collection = None
+    submissions_collection = None
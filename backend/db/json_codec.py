@@ -0,0 +1,18 @@
+"""JSON hooks shared by the result spool and the SQLite datastore.
+
+Datetimes round-trip as ``{"__datetime__": iso}``; everything else must
+already be JSON-serialisable.
+"""
+from datetime import datetime
+
+
+def encode_json_value(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+
+def decode_json_object(obj):
+    if set(obj) == {"__datetime__"}:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
@@ -0,0 +1,393 @@
+"""Offline stand-ins for the Firestore client.
+
+``MemoryClient`` and ``SQLiteClient`` implement the part of the Firestore API
+the app uses: ``collection()``, document ``get``/``set``/``update``/``delete``,
+``where``/``order_by``/``select``/``start_after``/``limit``/``stream`` queries,
+write batches and read-modify-write transactions (``run_transaction``). firebase_config hands one of them out instead of a
+Firestore client when DATASTORE_BACKEND is ``memory`` or ``sqlite``, so the
+whole API runs without Google credentials.
+"""
+import copy
+import json
+import operator
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from backend.db.json_codec import decode_json_object, encode_json_value
+
+_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda value, options: value in options,
+}
+
+
+def _matches(data, filters):
+    for field, op, value in filters:
+        current = data.get(field)
+        if current is None and op != "==":
+            return False
+        try:
+            if not _OPERATORS[op](current, value):
+                return False
+        except TypeError:
+            return False
+    return True
+
+
+def _reference_id(value):
+    if isinstance(value, dict):
+        value = value.get("__name__")
+    return getattr(value, "id", value)
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return self._data.get(field) if self._data is not None else None
+
+
+class DocumentReference:
+    def __init__(self, collection, doc_id):
+        self._collection = collection
+        self.id = doc_id
+
+    def get(self, *args, **kwargs):
+        return DocumentSnapshot(self, self._collection._read(self.id))
+
+    def set(self, data, merge=False):
+        self._collection._client._apply([("set", self._collection.name, self.id, data, merge)])
+
+    def update(self, data):
+        self._collection._client._apply([("update", self._collection.name, self.id, data, True)])
+
+    def delete(self):
+        self._collection._client._apply([("delete", self._collection.name, self.id, None, False)])
+
+
+class Query:
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+    def __init__(self, collection, filters=(), order=None, descending=False, after=None, fields=None, limit=None):
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._order = order
+        self._descending = descending
+        self._after = after
+        self._fields = fields
+        self._limit = limit
+
+    def _with(self, **changes):
+        state = {
+            "filters": self._filters,
+            "order": self._order,
+            "descending": self._descending,
+            "after": self._after,
+            "fields": self._fields,
+            "limit": self._limit,
+        }
+        state.update(changes)
+        return Query(self._collection, **state)
+
+    def where(self, field=None, op=None, value=None, filter=None):
+        if filter is not None:
+            field, op, value = filter.field_path, filter.op_string, filter.value
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported operator {op!r}")
+        return self._with(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field, direction=ASCENDING):
+        return self._with(order=field, descending=direction == Query.DESCENDING)
+
+    def start_after(self, value):
+        return self._with(after=value)
+
+    def select(self, fields):
+        return self._with(fields=list(fields))
+
+    def limit(self, count):
+        return self._with(limit=count)
+
+    def stream(self, *args, **kwargs):
+        collection = self._collection
+        for doc_id, data in collection._client._query(collection.name, self):
+            if self._fields is not None:
+                data = {key: data[key] for key in self._fields if key in data}
+            yield DocumentSnapshot(DocumentReference(collection, doc_id), data)
+
+    def get(self, *args, **kwargs):
+        return list(self.stream())
+
+    def on_snapshot(self, callback):
+        raise NotImplementedError("Local datastores do not push change notifications")
+
+
+class CollectionReference(Query):
+    def __init__(self, client, name):
+        super().__init__(self)
+        self._client = client
+        self.name = name
+
+    def document(self, doc_id=None):
+        return DocumentReference(self, doc_id or uuid.uuid4().hex[:20])
+
+    def _read(self, doc_id):
+        return self._client._read(self.name, doc_id)
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def set(self, reference, data, merge=False):
+        self._ops.append(("set", reference._collection.name, reference.id, data, merge))
+
+    def update(self, reference, data):
+        self._ops.append(("update", reference._collection.name, reference.id, data, True))
+
+    def delete(self, reference):
+        self._ops.append(("delete", reference._collection.name, reference.id, None, False))
+
+    def commit(self):
+        self._client._apply(self._ops)
+        self._ops = []
+
+
+class LocalClient:
+    def collection(self, name):
+        return CollectionReference(self, name)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        for reference in references:
+            yield reference.get()
+
+    def run_transaction(self, callback):
+        """Run ``callback(transaction)`` atomically and return its result.
+
+        The callback reads documents with ``get()`` and queues writes on the
+        transaction, which has the ``WriteBatch`` API; no other write to the
+        datastore can interleave between those reads and the commit.
+        """
+        raise NotImplementedError
+
+
+class MemoryClient(LocalClient):
+    """Process-local datastore; every collection is a dict of documents."""
+
+    def __init__(self):
+        # Re-entrant so a transaction can hold it across its reads and commit.
+        self._lock = threading.RLock()
+        self._collections = {}
+
+    def _read(self, name, doc_id):
+        with self._lock:
+            return copy.deepcopy(self._collections.get(name, {}).get(doc_id))
+
+    def _apply(self, ops):
+        with self._lock:
+            for op, name, doc_id, data, merge in ops:
+                docs = self._collections.setdefault(name, {})
+                if op == "delete":
+                    docs.pop(doc_id, None)
+                elif op == "update" and doc_id not in docs:
+                    raise KeyError(f"No document to update: {name}/{doc_id}")
+                elif merge and doc_id in docs:
+                    docs[doc_id].update(copy.deepcopy(data))
+                else:
+                    docs[doc_id] = copy.deepcopy(data)
+
+    def run_transaction(self, callback):
+        with self._lock:
+            transaction = WriteBatch(self)
+            result = callback(transaction)
+            transaction.commit()
+            return result
+
+    def _query(self, name, query):
+        with self._lock:
+            items = list(self._collections.get(name, {}).items())
+        items = [(doc_id, data) for doc_id, data in items if _matches(data, query._filters)]
+        # Past the cursor means after it in the query's own direction.
+        beyond = operator.lt if query._descending else operator.gt
+        if query._order in (None, "__name__"):
+            items.sort(key=lambda item: item[0], reverse=query._descending)
+            if query._after is not None:
+                after = _reference_id(query._after)
+                items = [item for item in items if beyond(item[0], after)]
+        else:
+            items = [item for item in items if item[1].get(query._order) is not None]
+            items.sort(key=lambda item: (item[1][query._order], item[0]), reverse=query._descending)
+            if query._after is not None:
+                after = query._after.get(query._order) if isinstance(query._after, dict) else query._after
+                items = [item for item in items if beyond(item[1][query._order], after)]
+        if query._limit is not None:
+            items = items[: query._limit]
+        return [(doc_id, copy.deepcopy(data)) for doc_id, data in items]
+
+
+class SQLiteClient(LocalClient):
+    """Documents as JSON rows in one WAL-mode SQLite file.
+
+    Filters and ordering run in SQL through ``json_extract``; the first query
+    on a field creates an expression index for it, so repeated lookups such
+    as results by ``user_id`` stay index scans at millions of rows.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._indexed = set()
+        self._index_lock = threading.Lock()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "collection TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, "
+            "PRIMARY KEY (collection, id))"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _read(self, name, doc_id):
+        row = self._conn().execute(
+            "SELECT data FROM documents WHERE collection = ? AND id = ?", (name, doc_id)
+        ).fetchone()
+        return json.loads(row[0], object_hook=decode_json_object) if row is not None else None
+
+    def _apply(self, ops):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._write(conn, ops)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def run_transaction(self, callback):
+        # BEGIN IMMEDIATE takes the write lock up front, so the callback's
+        # reads (on this thread's connection) see no concurrent writer from
+        # any process until COMMIT.
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            transaction = WriteBatch(self)
+            result = callback(transaction)
+            self._write(conn, transaction._ops)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def _write(self, conn, ops):
+        for op, name, doc_id, data, merge in ops:
+            if op == "delete":
+                conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?", (name, doc_id))
+                continue
+            if merge:
+                row = conn.execute(
+                    "SELECT data FROM documents WHERE collection = ? AND id = ?", (name, doc_id)
+                ).fetchone()
+                if row is None and op == "update":
+                    raise KeyError(f"No document to update: {name}/{doc_id}")
+                if row is not None:
+                    data = {**json.loads(row[0], object_hook=decode_json_object), **data}
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                (name, doc_id, json.dumps(data, default=encode_json_value)),
+            )
+
+    @staticmethod
+    def _path(field, value):
+        if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", field):
+            raise ValueError(f"Unsupported field name {field!r}")
+        # Datetimes are stored as {"__datetime__": iso}; ISO strings sort chronologically.
+        return f"$.{field}.__datetime__" if isinstance(value, datetime) else f"$.{field}"
+
+    @staticmethod
+    def _param(value):
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    def _ensure_index(self, name, path):
+        key = (name, path)
+        if key in self._indexed:
+            return
+        with self._index_lock:
+            if key in self._indexed:
+                return
+            index = "documents_" + re.sub(r"\W", "_", f"{name}{path}")
+            self._conn().execute(
+                f"CREATE INDEX IF NOT EXISTS {index} ON documents "
+                f"(collection, json_extract(data, '{path}'), id)"
+            )
+            self._indexed.add(key)
+
+    def _query(self, name, query):
+        clauses = ["collection = ?"]
+        params = [name]
+        for field, op, value in query._filters:
+            sample = value[0] if op == "in" and value else value
+            path = self._path(field, sample)
+            self._ensure_index(name, path)
+            if op == "in":
+                placeholders = ", ".join("?" for _ in value)
+                clauses.append(f"json_extract(data, '{path}') IN ({placeholders})")
+                params.extend(self._param(option) for option in value)
+            else:
+                clauses.append(f"json_extract(data, '{path}') {'=' if op == '==' else op} ?")
+                params.append(self._param(value))
+
+        direction, beyond = ("DESC", "<") if query._descending else ("ASC", ">")
+        if query._order in (None, "__name__"):
+            order = f"id {direction}"
+            if query._after is not None:
+                clauses.append(f"id {beyond} ?")
+                params.append(_reference_id(query._after))
+        else:
+            after = query._after.get(query._order) if isinstance(query._after, dict) else query._after
+            path = self._path(query._order, after)
+            order = f"json_extract(data, '{path}') {direction}, id {direction}"
+            clauses.append(f"json_extract(data, '{path}') IS NOT NULL")
+            if after is not None:
+                clauses.append(f"json_extract(data, '{path}') {beyond} ?")
+                params.append(self._param(after))
+
+        sql = f"SELECT id, data FROM documents WHERE {' AND '.join(clauses)} ORDER BY {order}"
+        if query._limit is not None:
+            sql += " LIMIT ?"
+            params.append(query._limit)
+        for doc_id, data in self._conn().execute(sql, params):
+            yield doc_id, json.loads(data, object_hook=decode_json_object)
+
+
+def create_local_client(backend, sqlite_path=None):
+    if backend == "memory":
+        return MemoryClient()
+    if backend == "sqlite":
+        return SQLiteClient(sqlite_path)
+    raise ValueError(f"Unknown datastore backend {backend!r}")
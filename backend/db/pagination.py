@@ -0,0 +1,57 @@
+import json
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+MAX_PAGE_SIZE = 1000
+
+
+def serialize_document(doc):
+    data = doc.to_dict()
+    ts = data.get("timestamp")
+    if hasattr(ts, "isoformat"):
+        data["timestamp"] = ts.isoformat()
+    return {"id": doc.id, **data}
+
+
+def parse_fields(fields):
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+def stream_documents(collection, limit=None, start_after=None, fields=None):
+    # Documents are ordered by id, so the last id of a page is a stable cursor.
+    query = collection.order_by("__name__")
+    if fields:
+        query = query.select(fields)
+    if start_after:
+        query = query.start_after({"__name__": collection.document(start_after)})
+    if limit:
+        query = query.limit(limit)
+    for doc in query.stream():
+        yield serialize_document(doc)
+
+
+def document_listing(collection, limit=None, start_after=None, fields=None, stream=False):
+    """Build the response for an admin listing endpoint.
+
+    ``stream`` returns NDJSON read lazily from Firestore; ``limit`` returns one
+    page plus a ``next_page_token`` to pass back as ``start_after``; neither
+    returns the plain list the endpoints always returned.
+    """
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    fields = parse_fields(fields)
+    documents = stream_documents(collection, limit, start_after, fields)
+
+    if stream:
+        return StreamingResponse(
+            (json.dumps(document, default=str) + "\n" for document in documents),
+            media_type="application/x-ndjson",
+        )
+
+    items = list(documents)
+    if limit is None:
+        return items
+    next_page_token = items[-1]["id"] if len(items) == limit else None
+    return {"items": items, "next_page_token": next_page_token}
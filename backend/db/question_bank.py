@@ -0,0 +1,277 @@
+import os
+import random
+import threading
+import time
+from backend.db.firebase_config import db, questions_collection
+from backend.metrics import datastore_timer
+
+QUESTION_BANK_TTL_SECONDS = float(os.environ.get("QUESTION_BANK_TTL_SECONDS", "300"))
+
+# A handful of rejection-sampling draws is enough because sessions exclude at
+# most ~10 ids; we only fall back to a filtered scan when a partition is nearly
+# exhausted.
+_SAMPLE_ATTEMPTS = 8
+
+
+class QuestionBankNotReady(Exception):
+    """The bank has not finished its first load; callers should retry later."""
+
+
+class _Partition:
+    """Id list plus position map, giving O(1) add, remove and random pick."""
+
+    def __init__(self):
+        self.ids = []
+        self.positions = {}
+
+    def add(self, question_id):
+        if question_id in self.positions:
+            return
+        self.positions[question_id] = len(self.ids)
+        self.ids.append(question_id)
+
+    def remove(self, question_id):
+        index = self.positions.pop(question_id, None)
+        if index is None:
+            return
+        last = self.ids.pop()
+        if last != question_id:
+            self.ids[index] = last
+            self.positions[last] = index
+
+    def sample(self, exclude):
+        if not self.ids:
+            return None
+        for _ in range(_SAMPLE_ATTEMPTS):
+            candidate = random.choice(self.ids)
+            if candidate not in exclude:
+                return candidate
+        remaining = [qid for qid in self.ids if qid not in exclude]
+        return random.choice(remaining) if remaining else None
+
+
+class QuestionBank:
+    """Process-local index of the questions collection, partitioned by difficulty."""
+
+    def __init__(self, collection, client=None, ttl_seconds=QUESTION_BANK_TTL_SECONDS):
+        self._collection = collection
+        self._client = client
+        self._ttl = ttl_seconds
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        self._questions = {}
+        self._partitions = {}
+        self._all = _Partition()
+        self._loaded_at = None
+        self._listener = None
+        self._change_listeners = []
+        # Bumped on every change to the index; cached read responses are
+        # valid for exactly one generation.
+        self.generation = 0
+
+    def add_change_listener(self, callback):
+        """Call ``callback(upserted, removed)`` after the index changes.
+
+        ``upserted`` maps question id to data; ``removed`` is an iterable of ids.
+        """
+        self._change_listeners.append(callback)
+
+    def _notify(self, upserted, removed=()):
+        for callback in self._change_listeners:
+            try:
+                callback(upserted, removed)
+            except Exception as e:
+                print(f"Question bank listener failed: {e}")
+
+    def start(self):
+        if self._collection is None:
+            return
+        self.reload()
+        try:
+            self._listener = self._collection.on_snapshot(self._on_snapshot)
+        except Exception as e:
+            print(f"Question bank listener unavailable, using TTL refresh: {e}")
+            self._listener = None
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.unsubscribe()
+            self._listener = None
+
+    def reload(self):
+        if self._collection is None:
+            return
+        # Single-flight: concurrent callers wait for the in-progress load.
+        with self._reload_lock:
+            questions = {}
+            with datastore_timer("questions", "stream"):
+                for doc in self._collection.stream():
+                    data = doc.to_dict()
+                    data["id"] = doc.id
+                    questions[doc.id] = data
+
+            partitions = {}
+            everything = _Partition()
+            for question_id, data in questions.items():
+                partitions.setdefault(data.get("difficulty"), _Partition()).add(question_id)
+                everything.add(question_id)
+
+            with self._lock:
+                removed = self._questions.keys() - questions.keys()
+                self._questions = questions
+                self._partitions = partitions
+                self._all = everything
+                self._loaded_at = time.monotonic()
+                self.generation += 1
+            self._notify(questions, removed)
+
+    def refresh(self):
+        """Reload now unless a change listener keeps the index current.
+
+        Blocks for a full scan; meant for background jobs that must not act
+        on a TTL-stale index, not for request handlers.
+        """
+        if self._listener is None or self._loaded_at is None:
+            self.reload()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def is_live(self):
+        """True while a change listener keeps the index (and its generation)
+        in step with the collection, rather than a TTL refresh."""
+        return self._listener is not None
+
+    def ready(self):
+        return self._collection is None or self._loaded_at is not None or bool(self._questions)
+
+    def _reload_in_background(self):
+        if not self._reload_lock.locked():
+            threading.Thread(target=self.reload, name="question-bank-reload", daemon=True).start()
+
+    def _ensure_fresh(self):
+        if self._collection is None:
+            return
+        if self._listener is not None and self._loaded_at is not None:
+            return
+        # Request handlers never wait on a full collection scan: before the
+        # first load completes they are turned away, afterwards they are
+        # served the current index while a background thread refreshes it.
+        if not self.ready():
+            self._reload_in_background()
+            raise QuestionBankNotReady("Question bank is still loading")
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self._ttl:
+            self._reload_in_background()
+
+    def _on_snapshot(self, docs, changes, read_time):
+        for change in changes:
+            doc = change.document
+            if change.type.name == "REMOVED":
+                self.remove(doc.id)
+            else:
+                self.upsert(doc.id, doc.to_dict())
+
+    def upsert(self, question_id, data):
+        data = dict(data)
+        data["id"] = question_id
+        with self._lock:
+            previous = self._questions.get(question_id)
+            if previous is not None and previous.get("difficulty") != data.get("difficulty"):
+                self._partitions[previous.get("difficulty")].remove(question_id)
+            self._questions[question_id] = data
+            self._partitions.setdefault(data.get("difficulty"), _Partition()).add(question_id)
+            self._all.add(question_id)
+            self.generation += 1
+        self._notify({question_id: data})
+
+    def remove(self, question_id):
+        with self._lock:
+            previous = self._questions.pop(question_id, None)
+            if previous is None:
+                return
+            self._partitions[previous.get("difficulty")].remove(question_id)
+            self._all.remove(question_id)
+            self.generation += 1
+        self._notify({}, (question_id,))
+
+    def get(self, question_id):
+        self._ensure_fresh()
+        with self._lock:
+            data = self._questions.get(question_id)
+            return dict(data) if data is not None else None
+
+    def fetch(self, question_id):
+        question = self.get(question_id)
+        if question is not None or self._collection is None:
+            return question
+        doc = self._collection.document(question_id).get()
+        if not doc.exists:
+            return None
+        self.upsert(doc.id, doc.to_dict())
+        return self.get(question_id)
+
+    def fetch_many(self, question_ids):
+        """Read the questions among ``question_ids`` that are not indexed yet in
+        one batched ``get_all`` and index those that exist."""
+        with self._lock:
+            missing = [question_id for question_id in dict.fromkeys(question_ids)
+                       if question_id not in self._questions]
+        if not missing or self._collection is None or self._client is None:
+            return
+        references = [self._collection.document(question_id) for question_id in missing]
+        with datastore_timer("questions", "get_all"):
+            docs = [doc for doc in self._client.get_all(references) if doc.exists]
+        for doc in docs:
+            self.upsert(doc.id, doc.to_dict())
+
+    def sample(self, difficulty=None, exclude_question_ids=None):
+        self._ensure_fresh()
+        exclude = set(exclude_question_ids or ())
+        with self._lock:
+            partition = self._partitions.get(difficulty) if difficulty else self._all
+            if partition is None:
+                return None
+            question_id = partition.sample(exclude)
+            if question_id is None:
+                return None
+            return dict(self._questions[question_id])
+
+    def current_generation(self):
+        """Generation of the index, refreshing it first if it has gone stale."""
+        self._ensure_fresh()
+        return self.generation
+
+    def list(self, difficulty=None):
+        """Copies of every question, or of one difficulty partition, by id."""
+        self._ensure_fresh()
+        with self._lock:
+            partition = self._partitions.get(difficulty) if difficulty else self._all
+            if partition is None:
+                return []
+            return [dict(self._questions[question_id]) for question_id in sorted(partition.ids)]
+
+    def sample_ids(self, difficulty, count, exclude_question_ids=None):
+        """Up to ``count`` distinct random ids from one difficulty partition."""
+        self._ensure_fresh()
+        exclude = set(exclude_question_ids or ())
+        picked = []
+        with self._lock:
+            partition = self._partitions.get(difficulty) if difficulty else self._all
+            while partition is not None and len(picked) < count:
+                question_id = partition.sample(exclude)
+                if question_id is None:
+                    break
+                picked.append(question_id)
+                exclude.add(question_id)
+        return picked
+
+    def count(self, difficulty=None):
+        with self._lock:
+            if difficulty:
+                partition = self._partitions.get(difficulty)
+                return len(partition.ids) if partition else 0
+            return len(self._questions)
+
+
+question_bank = QuestionBank(questions_collection, db)
@@ -0,0 +1,244 @@
+import hashlib
+import html
+import os
+import random
+import re
+import time
+import requests
+from backend.db.firebase_config import FIRESTORE_BATCH_LIMIT
+from backend.models.question import Question
+from backend.metrics import datastore_timer
+
+OPENTDB_API_URL = "https://opentdb.com/api.php"
+OPENTDB_TOKEN_URL = "https://opentdb.com/api_token.php"
+
+# Open Trivia DB response codes: 0 success, 1 no results, 4 token exhausted,
+# 5 rate limited (one request per IP every five seconds).
+_OPENTDB_RATE_LIMITED = 5
+_OPENTDB_RETRIES = 5
+_OPENTDB_RETRY_SECONDS = 5.0
+# Spacing between requests from this process; the limit is per IP, so
+# requests are made one at a time and never faster than this.
+OPENTDB_REQUEST_INTERVAL_SECONDS = float(os.environ.get("OPENTDB_REQUEST_INTERVAL_SECONDS", "5.0"))
+# The API returns at most 50 questions per request. Pages are paced five
+# seconds apart, so the page cap also bounds how long one import runs.
+OPENTDB_MAX_AMOUNT = 50
+OPENTDB_MAX_PAGES = int(os.environ.get("OPENTDB_MAX_PAGES", "20"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question_text(text):
+    return _WHITESPACE.sub(" ", html.unescape(text or "")).strip().lower()
+
+
+def content_hash(text):
+    return hashlib.sha1(normalize_question_text(text).encode("utf-8")).hexdigest()
+
+
+class RequestPacer:
+    """Spaces successive requests at least ``interval`` seconds apart."""
+
+    def __init__(self, interval=OPENTDB_REQUEST_INTERVAL_SECONDS, clock=time.monotonic, sleep=time.sleep):
+        self.interval = interval
+        self.clock = clock
+        self.sleep = sleep
+        self._last = None
+
+    def wait(self):
+        if self._last is not None:
+            delay = self._last + self.interval - self.clock()
+            if delay > 0:
+                self.sleep(delay)
+        self._last = self.clock()
+
+
+def request_session_token(http_get=requests.get, pacer=None):
+    # A session token stops Open Trivia DB from repeating questions across pages.
+    if pacer is not None:
+        pacer.wait()
+    try:
+        response = http_get(OPENTDB_TOKEN_URL, params={"command": "request"}, timeout=30)
+        return response.json().get("token")
+    except Exception as e:
+        print(f"Could not get Open Trivia DB token: {e}")
+        return None
+
+
+def fetch_trivia_page(params, http_get=requests.get, pacer=None):
+    pacer = pacer or RequestPacer()
+    for attempt in range(_OPENTDB_RETRIES):
+        pacer.wait()
+        response = http_get(OPENTDB_API_URL, params=params, timeout=30)
+        if response.status_code != 200:
+            raise RuntimeError(f"Open Trivia DB returned HTTP {response.status_code}")
+        data = response.json()
+        if data.get("response_code") != _OPENTDB_RATE_LIMITED:
+            return data.get("results", [])
+        # Another client on this IP used the slot: back off exponentially
+        # on top of the pacing, with full jitter so importers limited
+        # together do not retry in lockstep.
+        pacer.sleep(random.uniform(0, _OPENTDB_RETRY_SECONDS * 2 ** attempt))
+    raise RuntimeError("Open Trivia DB rate limit retries exhausted")
+
+
+def fetch_trivia_pages(pages, amount=50, category=18, http_get=requests.get, pacer=None):
+    """Yield (page_number, questions or None, error or None) page by page,
+    one request at a time at the API's rate limit."""
+    pacer = pacer or RequestPacer()
+    params = {"amount": amount, "category": category, "type": "multiple"}
+    token = request_session_token(http_get, pacer)
+    if token:
+        params["token"] = token
+
+    for page in range(1, pages + 1):
+        try:
+            yield page, fetch_trivia_page(params, http_get, pacer), None
+        except Exception as e:
+            yield page, None, str(e)
+
+
+def question_from_trivia(api_question):
+    correct_answer = html.unescape(api_question["correct_answer"])
+    options = [html.unescape(ans) for ans in api_question["incorrect_answers"]] + [correct_answer]
+    random.shuffle(options)
+    difficulty = api_question.get("difficulty", "medium")
+    return Question(
+        question_text=html.unescape(api_question["question"]),
+        options=options,
+        correct_answer=correct_answer,
+        difficulty=difficulty if difficulty in ("easy", "medium", "hard") else "medium",
+    )
+
+
+def question_from_sample(sample_question):
+    return Question(
+        question_text=sample_question["question"],
+        options=[
+            sample_question["option1"],
+            sample_question["option2"],
+            sample_question["option3"],
+            sample_question["option4"],
+        ],
+        correct_answer=sample_question["correct_answer"],
+        difficulty=sample_question["difficulty"],
+    )
+
+
+def load_existing_hashes(collection):
+    # One projected pass over the bank instead of a query per candidate.
+    hashes = set()
+    with datastore_timer("questions", "select_stream"):
+        for doc in collection.select(["question_text", "content_hash"]).stream():
+            data = doc.to_dict()
+            hashes.add(data.get("content_hash") or content_hash(data.get("question_text")))
+    return hashes
+
+
+class QuestionImporter:
+    """Deduplicates questions against the bank and writes them in batches.
+
+    Exact repeats are caught by content hash. With a ``similarity_index``,
+    reworded near-duplicates are skipped too; accepted questions go into the
+    index as soon as they are queued so later rows in the same import are
+    checked against them.
+    """
+
+    def __init__(self, db, collection, on_commit=None, similarity_index=None):
+        self.db = db
+        self.collection = collection
+        self.on_commit = on_commit
+        self.similarity_index = similarity_index
+        self.seen_hashes = load_existing_hashes(collection)
+        self.imported = 0
+        self.duplicates = 0
+        self.near_duplicates = 0
+        self.failed = 0
+        self._batch = []
+
+    def add(self, question):
+        if not question.question_text or not question.correct_answer:
+            self.failed += 1
+            return
+        digest = content_hash(question.question_text)
+        if digest in self.seen_hashes:
+            self.duplicates += 1
+            return
+        if self.similarity_index is not None and self.similarity_index.find_similar(question.question_text, limit=1):
+            self.near_duplicates += 1
+            return
+        self.seen_hashes.add(digest)
+        data = question.dict()
+        data.pop("id", None)
+        data["content_hash"] = digest
+        doc_ref = self.collection.document()
+        if self.similarity_index is not None:
+            self.similarity_index.add(doc_ref.id, question.question_text)
+        self._batch.append((doc_ref, data))
+        if len(self._batch) >= FIRESTORE_BATCH_LIMIT:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        batch = self.db.batch()
+        for doc_ref, data in self._batch:
+            batch.set(doc_ref, data)
+        try:
+            with datastore_timer("questions", "batch_commit"):
+                batch.commit()
+        except Exception as e:
+            print(f"Question batch write failed: {e}")
+            self.failed += len(self._batch)
+            for doc_ref, data in self._batch:
+                self.seen_hashes.discard(data["content_hash"])
+                if self.similarity_index is not None:
+                    self.similarity_index.remove(doc_ref.id)
+        else:
+            self.imported += len(self._batch)
+            if self.on_commit is not None:
+                for doc_ref, data in self._batch:
+                    self.on_commit(doc_ref.id, data)
+        self._batch = []
+
+    def progress(self, event, **extra):
+        return {
+            "event": event,
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "near_duplicates": self.near_duplicates,
+            "failed": self.failed,
+            **extra,
+        }
+
+
+def import_trivia_questions(db, collection, pages=1, amount=50, category=18,
+                            http_get=requests.get, on_commit=None, similarity_index=None):
+    """Generator of progress events; the last event has ``event == "done"``."""
+    importer = QuestionImporter(db, collection, on_commit, similarity_index)
+    total_available = 0
+    for page, api_questions, error in fetch_trivia_pages(pages, amount, category, http_get):
+        if error:
+            yield importer.progress("page_failed", page=page, error=error)
+            continue
+        total_available += len(api_questions)
+        for api_question in api_questions:
+            try:
+                importer.add(question_from_trivia(api_question))
+            except Exception as e:
+                print(f"Skipping malformed question: {e}")
+                importer.failed += 1
+        importer.flush()
+        yield importer.progress("page", page=page, received=len(api_questions))
+    yield importer.progress("done", total_available=total_available)
+
+
+def import_sample_question_list(db, collection, samples, on_commit=None, similarity_index=None):
+    importer = QuestionImporter(db, collection, on_commit, similarity_index)
+    for sample_question in samples:
+        try:
+            importer.add(question_from_sample(sample_question))
+        except Exception as e:
+            print(f"Error importing sample question: {e}")
+    importer.flush()
+    return importer
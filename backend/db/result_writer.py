@@ -0,0 +1,320 @@
+import fcntl
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from backend.db.firebase_config import FIRESTORE_BATCH_LIMIT, db, results_collection
+from backend.db.json_codec import decode_json_object, encode_json_value
+from backend.metrics import datastore_timer
+
+RESULT_SPOOL_DIR = os.environ.get("RESULT_SPOOL_DIR", "result_spool")
+RESULT_SPOOL_FSYNC = os.environ.get("RESULT_SPOOL_FSYNC", "0") == "1"
+RESULT_FLUSH_INTERVAL_SECONDS = float(os.environ.get("RESULT_FLUSH_INTERVAL_SECONDS", "1.0"))
+RESULT_QUEUE_MAX = int(os.environ.get("RESULT_QUEUE_MAX", "10000"))
+# Under steady load the spool never drains to empty; past this many lines it
+# is rewritten with only the uncommitted records.
+RESULT_SPOOL_COMPACT_LINES = int(os.environ.get("RESULT_SPOOL_COMPACT_LINES", "20000"))
+_RETRY_BACKOFF_MAX_SECONDS = 30.0
+
+
+class ResultWriter:
+    """Write-behind pipeline for result documents.
+
+    submit() assigns the document id, appends the record to this process's
+    spool file and queues it; a background thread commits queued records in
+    Firestore batches. After each commit a marker line listing the
+    committed ids is appended, so only uncommitted records are ever
+    replayed. The spool is truncated whenever everything written to it has
+    been committed, and rotated into a fresh file holding just the
+    uncommitted records once it grows past RESULT_SPOOL_COMPACT_LINES.
+
+    Spools left behind by dead processes are replayed on start(). A record
+    whose document already exists was committed before its marker made it
+    to disk; it is dropped rather than written again, so its committed_at
+    and the flush listeners' effects are not repeated.
+    """
+
+    def __init__(self, db, collection, spool_dir=RESULT_SPOOL_DIR,
+                 flush_interval=RESULT_FLUSH_INTERVAL_SECONDS, max_queue=RESULT_QUEUE_MAX,
+                 batch_size=FIRESTORE_BATCH_LIMIT, compact_lines=RESULT_SPOOL_COMPACT_LINES):
+        self.db = db
+        self.collection = collection
+        self.spool_dir = spool_dir
+        self.flush_interval = flush_interval
+        self.batch_size = min(batch_size, FIRESTORE_BATCH_LIMIT)
+        self.compact_lines = compact_lines
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._spool_lock = threading.Lock()
+        self._spool = None
+        self._spool_path = None
+        self._spool_lines = 0
+        # Spooled records not yet committed, by id, in submission order.
+        self._uncommitted = {}
+        self._flush_listeners = []
+        self._thread = None
+        self._stopping = threading.Event()
+        self.enqueued_total = 0
+        self.flushed_total = 0
+        self.batches_total = 0
+        self.failed_batches_total = 0
+        self.sync_writes_total = 0
+        self.replayed_total = 0
+        self.replay_skipped_total = 0
+        self.max_queue_depth = 0
+        self.last_flush_at = None
+        self.last_flush_seconds = None
+
+    def add_flush_listener(self, callback):
+        """Call ``callback(records)`` with each list of committed ``{"id", "data"}``
+        records; ``data`` carries the ``committed_at`` it was written with."""
+        self._flush_listeners.append(callback)
+
+    def start(self):
+        if self.collection is None or self._thread is not None:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        # A fresh name per start: after a container restart our pid may well
+        # be reused, and a dead process's spool must stay an orphan.
+        self._open_spool()
+        orphaned, claimed = self._collect_orphaned_spools()
+        records = self._uncommitted_records(orphaned)
+        with self._spool_lock:
+            self._write_spool(records)
+            self._sync_spool()
+        # Only now that the records are durable in our spool may the
+        # orphaned files go.
+        for path, f in claimed:
+            os.remove(path)
+            f.close()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+        for record in records:
+            self._queue.put(record)
+        self.replayed_total += len(records)
+        self.replay_skipped_total += len(orphaned) - len(records)
+        if orphaned:
+            print(f"Replaying {len(records)} spooled results ({len(orphaned) - len(records)} already committed)")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout=30)
+        self._thread = None
+        with self._spool_lock:
+            self._spool.close()
+            self._spool = None
+            if not self._uncommitted:
+                os.remove(self._spool_path)
+
+    def submit(self, data):
+        doc_id = self.collection.document().id
+        record = {"id": doc_id, "data": data}
+        if self._thread is None:
+            self._notify_flushed(self._write_direct([record]))
+            return doc_id
+
+        with self._spool_lock:
+            self._write_spool([record])
+            if RESULT_SPOOL_FSYNC:
+                os.fsync(self._spool.fileno())
+        try:
+            self._queue.put_nowait(record)
+            self.enqueued_total += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        except queue.Full:
+            # Backpressure: the request pays for its own write rather than
+            # growing the queue without bound.
+            committed = self._write_direct([record])
+            self.sync_writes_total += 1
+            self._mark_committed([record])
+            self._notify_flushed(committed)
+        return doc_id
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "pending": len(self._uncommitted),
+            "max_queue_depth": self.max_queue_depth,
+            "enqueued_total": self.enqueued_total,
+            "flushed_total": self.flushed_total,
+            "batches_total": self.batches_total,
+            "failed_batches_total": self.failed_batches_total,
+            "sync_writes_total": self.sync_writes_total,
+            "replayed_total": self.replayed_total,
+            "replay_skipped_total": self.replay_skipped_total,
+            "last_flush_at": self.last_flush_at,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
+
+    def _open_spool(self):
+        path = os.path.join(self.spool_dir, f"results.{os.getpid()}.{uuid.uuid4().hex[:8]}.jsonl")
+        spool = open(path, "a", encoding="utf-8")
+        # The lock marks this spool as live; other workers only replay
+        # spools whose owner has gone away.
+        fcntl.flock(spool.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._spool, self._spool_path, self._spool_lines = spool, path, 0
+
+    def _write_spool(self, records):
+        for record in records:
+            self._spool.write(json.dumps(record, default=encode_json_value) + "\n")
+            self._uncommitted[record["id"]] = record
+        self._spool.flush()
+        self._spool_lines += len(records)
+
+    def _sync_spool(self):
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+
+    def _collect_orphaned_spools(self):
+        """Uncommitted records from spools whose owner is gone, plus the
+        still-locked ``(path, file)`` pairs to remove once they are re-spooled."""
+        records = {}
+        claimed = []
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "results.*.jsonl"))):
+            if path == self._spool_path:
+                continue
+            try:
+                f = open(path, "r", encoding="utf-8")
+            except FileNotFoundError:
+                # Claimed and removed by another worker since the glob.
+                continue
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                continue
+            if not os.path.exists(path):
+                # Removed between our open and our lock.
+                f.close()
+                continue
+            for line in f:
+                try:
+                    entry = json.loads(line, object_hook=decode_json_object)
+                except ValueError:
+                    # A torn final line from a crash mid-append.
+                    continue
+                if "committed" in entry:
+                    for doc_id in entry["committed"]:
+                        records.pop(doc_id, None)
+                else:
+                    records[entry["id"]] = entry
+            claimed.append((path, f))
+        return list(records.values()), claimed
+
+    def _uncommitted_records(self, records):
+        # A crash between a batch commit and its marker leaves committed
+        # records in the spool; their documents already exist.
+        remaining = []
+        for offset in range(0, len(records), self.batch_size):
+            chunk = records[offset:offset + self.batch_size]
+            references = [self.collection.document(record["id"]) for record in chunk]
+            with datastore_timer("results", "get_all"):
+                existing = {doc.id for doc in self.db.get_all(references) if doc.exists}
+            remaining.extend(record for record in chunk if record["id"] not in existing)
+        return remaining
+
+    def _write_direct(self, records):
+        """Commit ``records`` and return them as written, with ``committed_at``."""
+        # committed_at, unlike the result's own timestamp, orders documents by
+        # when they became readable; incremental training reads by it.
+        committed_at = datetime.utcnow()
+        committed = [{"id": record["id"], "data": {**record["data"], "committed_at": committed_at}} for record in records]
+        batch = self.db.batch()
+        for record in committed:
+            batch.set(self.collection.document(record["id"]), record["data"])
+        with datastore_timer("results", "batch_commit"):
+            batch.commit()
+        return committed
+
+    def _notify_flushed(self, records):
+        for callback in self._flush_listeners:
+            try:
+                callback(records)
+            except Exception as e:
+                print(f"Result flush listener failed: {e}")
+
+    def _mark_committed(self, records):
+        with self._spool_lock:
+            for record in records:
+                self._uncommitted.pop(record["id"], None)
+            if self._spool is None:
+                return
+            if not self._uncommitted:
+                self._spool.seek(0)
+                self._spool.truncate()
+                self._spool_lines = 0
+                return
+            self._spool.write(json.dumps({"committed": [record["id"] for record in records]}) + "\n")
+            self._spool.flush()
+            self._spool_lines += 1
+            if self._spool_lines >= self.compact_lines:
+                self._compact()
+
+    def _compact(self):
+        # Move the uncommitted records into a fresh spool; the old one is
+        # removed only once the new one is on disk. A crash in between
+        # leaves both, and replay keeps one copy of each record.
+        old_spool, old_path = self._spool, self._spool_path
+        self._open_spool()
+        self._write_spool(list(self._uncommitted.values()))
+        self._sync_spool()
+        os.remove(old_path)
+        old_spool.close()
+
+    def _next_batch(self):
+        try:
+            records = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(records) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stopping.is_set():
+                break
+            try:
+                records.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return records
+
+    def _run(self):
+        backoff = self.flush_interval
+        records = []
+        while True:
+            if not records:
+                if self._stopping.is_set() and self._queue.empty():
+                    return
+                records = self._next_batch()
+                if not records:
+                    continue
+
+            started = time.monotonic()
+            try:
+                committed = self._write_direct(records)
+            except Exception as e:
+                # Keep the batch and retry; the records stay in the spool.
+                self.failed_batches_total += 1
+                print(f"Result batch write failed, retrying in {backoff:.1f}s: {e}")
+                if self._stopping.wait(backoff):
+                    return
+                backoff = min(backoff * 2, _RETRY_BACKOFF_MAX_SECONDS)
+                continue
+
+            backoff = self.flush_interval
+            self.batches_total += 1
+            self.flushed_total += len(records)
+            self.last_flush_at = time.time()
+            self.last_flush_seconds = time.monotonic() - started
+            self._mark_committed(records)
+            self._notify_flushed(committed)
+            records = []
+
+
+result_writer = ResultWriter(db, results_collection)
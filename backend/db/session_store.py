@@ -0,0 +1,264 @@
+import json
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from quiz_engine.grader import answer_digest
+
+SESSION_STORE = os.environ.get("SESSION_STORE", "memory")
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", "quiz_sessions.db")
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", "3600"))
+SESSION_MAX_ACTIVE = int(os.environ.get("SESSION_MAX_ACTIVE", "100000"))
+SESSION_SWEEP_INTERVAL_SECONDS = float(os.environ.get("SESSION_SWEEP_INTERVAL_SECONDS", "60"))
+
+
+class QuizSession:
+    __slots__ = (
+        "session_id",
+        "user_id",
+        "current_difficulty",
+        "questions_answered",
+        "correct_answers",
+        "answered_questions",
+        "last_question_id",
+        "served_at",
+        "served_difficulty",
+        "answer_keys",
+        "ability",
+        "responses",
+        "plan",
+        "is_completed",
+    )
+
+    def __init__(self, user_id, initial_difficulty, session_id=None):
+        self.session_id = session_id or str(uuid.uuid4())
+        self.user_id = user_id
+        self.current_difficulty = initial_difficulty
+        self.questions_answered = 0
+        self.correct_answers = 0
+        self.answered_questions = []
+        self.last_question_id = None
+        self.served_at = None
+        self.served_difficulty = None
+        # Digests of the served questions' normalised correct answers.
+        self.answer_keys = {}
+        self.ability = None
+        self.responses = {}
+        # Candidate question ids per difficulty, drawn once at quiz start
+        # (bucket selection only; empty under IRT selection).
+        self.plan = {}
+        self.is_completed = False
+
+    def serve(self, question):
+        self.last_question_id = question["id"]
+        self.served_at = time.time()
+        self.served_difficulty = question.get("difficulty")
+        self.answer_keys[question["id"]] = answer_digest(question.get("correct_answer"))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        session = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(session, name, data.get(name))
+        session.answered_questions = session.answered_questions or []
+        session.answer_keys = session.answer_keys or {}
+        session.responses = session.responses or {}
+        session.plan = session.plan or {}
+        return session
+
+
+class SessionStore(ABC):
+    """Interface for quiz session storage. Callers must save() after mutating."""
+
+    # Whether calls do I/O and belong on an executor rather than the event loop.
+    blocking = False
+
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self.expired_total = 0
+        self.evicted_total = 0
+        self.last_sweep_at = None
+
+    @abstractmethod
+    def get(self, session_id):
+        """The live session, or None if it is unknown or expired."""
+
+    @abstractmethod
+    def save(self, session):
+        """Store ``session`` and restart its TTL."""
+
+    @abstractmethod
+    def delete(self, session_id):
+        ...
+
+    @abstractmethod
+    def sweep(self):
+        """Drop expired sessions and return how many were dropped."""
+
+    @abstractmethod
+    def live_count(self):
+        ...
+
+    def stats(self):
+        return {
+            "backend": type(self).__name__,
+            "live": self.live_count(),
+            "expired_total": self.expired_total,
+            "evicted_total": self.evicted_total,
+            "ttl_seconds": self.ttl_seconds,
+            "last_sweep_at": self.last_sweep_at,
+        }
+
+
+class InMemorySessionStore(SessionStore):
+    """LRU + TTL store for a single worker process."""
+
+    def __init__(self, ttl_seconds=SESSION_TTL_SECONDS, max_sessions=SESSION_MAX_ACTIVE):
+        super().__init__(ttl_seconds)
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            session, expires_at = entry
+            if expires_at <= now:
+                del self._sessions[session_id]
+                self.expired_total += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session):
+        with self._lock:
+            self._sessions[session.session_id] = (session, time.monotonic() + self.ttl_seconds)
+            self._sessions.move_to_end(session.session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted_total += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def sweep(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [sid for sid, (_, expires_at) in self._sessions.items() if expires_at <= now]
+            for session_id in expired:
+                del self._sessions[session_id]
+            self.expired_total += len(expired)
+        self.last_sweep_at = time.time()
+        return len(expired)
+
+    def live_count(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a WAL-mode SQLite file shared by every worker on the host."""
+
+    blocking = True
+
+    def __init__(self, path=SESSION_DB_PATH, ttl_seconds=SESSION_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS quiz_sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS quiz_sessions_expires ON quiz_sessions (expires_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        row = self._conn().execute(
+            "SELECT data, expires_at FROM quiz_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= time.time():
+            self.delete(session_id)
+            self.expired_total += 1
+            return None
+        return QuizSession.from_dict(json.loads(row[0]))
+
+    def save(self, session):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO quiz_sessions (session_id, data, expires_at) VALUES (?, ?, ?)",
+            (session.session_id, json.dumps(session.to_dict()), time.time() + self.ttl_seconds),
+        )
+
+    def delete(self, session_id):
+        self._conn().execute("DELETE FROM quiz_sessions WHERE session_id = ?", (session_id,))
+
+    def sweep(self):
+        cursor = self._conn().execute("DELETE FROM quiz_sessions WHERE expires_at <= ?", (time.time(),))
+        self.expired_total += cursor.rowcount
+        self.last_sweep_at = time.time()
+        return cursor.rowcount
+
+    def live_count(self):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM quiz_sessions WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+
+class SessionSweeper:
+    def __init__(self, store, interval_seconds=SESSION_SWEEP_INTERVAL_SECONDS):
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="session-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.store.sweep()
+            except Exception as e:
+                print(f"Session sweep failed: {e}")
+
+
+def create_session_store(backend=SESSION_STORE):
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "memory":
+        return InMemorySessionStore()
+    raise ValueError(f"Unknown SESSION_STORE backend: {backend}")
+
+
+session_store = create_session_store()
+session_sweeper = SessionSweeper(session_store)
@@ -0,0 +1,101 @@
+import threading
+from datetime import datetime
+from backend.db.firebase_config import FIRESTORE_BATCH_LIMIT, db, submissions_collection
+from backend.metrics import datastore_timer
+from quiz_engine.grader import GRADE_CORRECT, grade_batch
+
+
+def summarize(results):
+    return {
+        "results": results.tolist(),
+        "correct": int((results == GRADE_CORRECT).sum()),
+        "graded": int((results >= 0).sum()),
+    }
+
+
+class SubmissionStore:
+    """Batch-graded exam submissions, one document per submitted paper.
+
+    Each document keeps the question ids and raw answers next to their
+    grades, so ``start_regrade`` can re-grade every stored paper against the
+    current answer key in one streaming pass, rewriting only the papers
+    whose grades changed. Papers referencing a question that has no key
+    (deleted, or never found) are skipped rather than regraded as invalid.
+    """
+
+    def __init__(self, db, collection):
+        self.db = db
+        self.collection = collection
+        self._regrade_lock = threading.Lock()
+        self._regrade = None
+
+    def save(self, submission):
+        doc_ref = self.collection.document()
+        doc_ref.set(submission)
+        return doc_ref.id
+
+    def start_regrade(self, answer_key, question_bank):
+        with self._regrade_lock:
+            if self._regrade is not None and self._regrade["status"] == "running":
+                return dict(self._regrade)
+            self._regrade = {
+                "status": "running",
+                "started_at": datetime.utcnow().isoformat(),
+                "finished_at": None,
+                "submissions": 0,
+                "changed": 0,
+                "skipped": 0,
+                "error": None,
+            }
+            threading.Thread(target=self._run_regrade, args=(answer_key, question_bank),
+                             name="submission-regrade", daemon=True).start()
+            return dict(self._regrade)
+
+    def regrade_status(self):
+        with self._regrade_lock:
+            return dict(self._regrade) if self._regrade is not None else None
+
+    def _run_regrade(self, answer_key, question_bank):
+        try:
+            # Grade against the bank as stored now, not a stale or
+            # half-loaded index.
+            question_bank.refresh()
+            absent = set()
+            batch = self.db.batch()
+            pending = 0
+            regraded_at = datetime.utcnow()
+            for doc in self.collection.order_by("__name__").stream():
+                data = doc.to_dict()
+                question_ids = data.get("question_ids", [])
+                self._regrade["submissions"] += 1
+                missing = [question_id for question_id in answer_key.missing(question_ids) if question_id not in absent]
+                if missing:
+                    question_bank.fetch_many(missing)
+                    absent.update(answer_key.missing(missing))
+                if answer_key.unkeyed(question_ids):
+                    self._regrade["skipped"] += 1
+                    continue
+                results = grade_batch(question_ids, data.get("answers", []), answer_key)
+                if results.tolist() == data.get("results"):
+                    continue
+                batch.set(doc.reference, {**summarize(results), "regraded_at": regraded_at}, merge=True)
+                self._regrade["changed"] += 1
+                pending += 1
+                if pending == FIRESTORE_BATCH_LIMIT:
+                    with datastore_timer("submissions", "batch_commit"):
+                        batch.commit()
+                    batch = self.db.batch()
+                    pending = 0
+            if pending:
+                with datastore_timer("submissions", "batch_commit"):
+                    batch.commit()
+            self._regrade["status"] = "completed"
+        except Exception as e:
+            print(f"Submission regrade failed: {e}")
+            self._regrade["status"] = "failed"
+            self._regrade["error"] = str(e)
+        finally:
+            self._regrade["finished_at"] = datetime.utcnow().isoformat()
+
+
+submission_store = SubmissionStore(db, submissions_collection)
@@ -0,0 +1,154 @@
+import threading
+from datetime import datetime
+from backend.db.firebase_config import FIRESTORE_BATCH_LIMIT, db, results_collection, user_stats_collection, run_transaction
+from backend.metrics import datastore_timer
+from quiz_engine.user_stats import UserStats
+
+_LOCK_STRIPES = 64
+
+
+class UserStatsStore:
+    """Per-user result aggregates, one document per user keyed by email.
+
+    ``record_results`` runs as a result-writer flush listener: once a batch
+    of results is committed it folds them into their users' documents, one
+    transaction per user, so concurrent workers cannot lose each other's
+    updates and quiz requests never wait on it. Reading a summary is one
+    document fetch however many results the user has. ``start_backfill``
+    rebuilds every document from the results collection in one ordered
+    streaming pass; a rebuilt document replaces the stored one only if the
+    stored one has no result committed after the stream read.
+    """
+
+    def __init__(self, db, collection, results):
+        self.db = db
+        self.collection = collection
+        self.results = results
+        self._locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+        self._backfill_lock = threading.Lock()
+        self._backfill = None
+        # Results recorded while a backfill is streaming, keyed by result id.
+        self._recorded_during_backfill = {}
+
+    def _lock_for(self, email):
+        return self._locks[hash(email) % _LOCK_STRIPES]
+
+    def get(self, email):
+        doc = self.collection.document(email).get()
+        return UserStats.from_dict(doc.to_dict()) if doc.exists else None
+
+    def record_results(self, records):
+        """Fold committed ``{"id", "data"}`` result records into user documents."""
+        if self.collection is None:
+            return
+        by_user = {}
+        for record in records:
+            email = record["data"].get("user_id")
+            if email:
+                by_user.setdefault(email, []).append(record)
+        for email, user_records in by_user.items():
+            # The stripe only orders this against a backfill in this process;
+            # the transaction is what serialises workers.
+            with self._lock_for(email):
+                self._record_user(email, user_records)
+                if self._backfill is not None and self._backfill["status"] == "running":
+                    for record in user_records:
+                        self._recorded_during_backfill[record["id"]] = record["data"]
+
+    def _record_user(self, email, records):
+        ref = self.collection.document(email)
+
+        def update(transaction):
+            snapshot = ref.get(transaction=transaction)
+            stats = UserStats.from_dict(snapshot.to_dict()) if snapshot.exists else UserStats()
+            for record in records:
+                # A spool replay can commit a result a second time.
+                if not stats.includes(record["id"]):
+                    stats.add(record["data"], result_id=record["id"])
+            transaction.set(ref, stats.to_dict())
+
+        with datastore_timer("user_stats", "transaction"):
+            run_transaction(self.db, update)
+
+    def start_backfill(self):
+        with self._backfill_lock:
+            if self._backfill is not None and self._backfill["status"] == "running":
+                return dict(self._backfill)
+            self._recorded_during_backfill = {}
+            self._backfill = {
+                "status": "running",
+                "started_at": datetime.utcnow().isoformat(),
+                "finished_at": None,
+                "results": 0,
+                "users": 0,
+                "error": None,
+            }
+            threading.Thread(target=self._run_backfill, name="user-stats-backfill", daemon=True).start()
+            return dict(self._backfill)
+
+    def backfill_status(self):
+        with self._backfill_lock:
+            return dict(self._backfill) if self._backfill is not None else None
+
+    def _run_backfill(self):
+        try:
+            aggregates = {}
+            seen = set()
+            # Ordered by timestamp so streaks and recent history come out as
+            # they would have live. Results without a timestamp are skipped.
+            for doc in self.results.order_by("timestamp").stream():
+                data = doc.to_dict()
+                email = data.get("user_id")
+                if not email:
+                    continue
+                aggregates.setdefault(email, UserStats()).add(data, result_id=doc.id)
+                if doc.id in self._recorded_during_backfill:
+                    seen.add(doc.id)
+                self._backfill["results"] += 1
+
+            # Hold every stripe while writing so no live record() interleaves;
+            # results it recorded after the stream passed them are re-applied.
+            for lock in self._locks:
+                lock.acquire()
+            try:
+                for result_id, result in self._recorded_during_backfill.items():
+                    if result_id not in seen:
+                        aggregates.setdefault(result["user_id"], UserStats()).add(result, result_id=result_id)
+                self._write(aggregates)
+                self._backfill["users"] = len(aggregates)
+                self._backfill["status"] = "completed"
+            finally:
+                self._recorded_during_backfill = {}
+                for lock in self._locks:
+                    lock.release()
+        except Exception as e:
+            print(f"User stats backfill failed: {e}")
+            self._backfill["status"] = "failed"
+            self._backfill["error"] = str(e)
+        finally:
+            self._backfill["finished_at"] = datetime.utcnow().isoformat()
+
+    def _write(self, aggregates):
+        emails = list(aggregates)
+        for offset in range(0, len(emails), FIRESTORE_BATCH_LIMIT):
+            chunk = emails[offset:offset + FIRESTORE_BATCH_LIMIT]
+            references = [self.collection.document(email) for email in chunk]
+
+            def replace(transaction):
+                # Another worker may have recorded results after the stream
+                # passed them; its document then holds a newer watermark
+                # than the rebuild and is left as it is.
+                stored = {
+                    snapshot.id: UserStats.from_dict(snapshot.to_dict())
+                    for snapshot in self.db.get_all(references, transaction=transaction)
+                    if snapshot.exists
+                }
+                for email in chunk:
+                    if email in stored and stored[email].newer_than(aggregates[email]):
+                        continue
+                    transaction.set(self.collection.document(email), aggregates[email].to_dict())
+
+            with datastore_timer("user_stats", "transaction"):
+                run_transaction(self.db, replace)
+
+user_stats_store = UserStatsStore(db, user_stats_collection, results_collection)
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Header, HTTPException
+from backend.db.firebase_config import users_collection
+from backend.db import async_store
+from backend.db.question_bank import QuestionBankNotReady, question_bank
+from backend.auth import verify_token
+
+ROLE_CACHE_TTL_SECONDS = float(os.environ.get("ROLE_CACHE_TTL_SECONDS", "60"))
+ROLE_CACHE_MAX_ENTRIES = int(os.environ.get("ROLE_CACHE_MAX_ENTRIES", "10000"))
+QUESTION_BANK_RETRY_AFTER_SECONDS = 5
+
+MISSING = object()
+
+
+class RoleCache:
+    """Bounded TTL cache of user roles; unknown users are cached as None.
+
+    ``POST /api/users/register`` is the only place the app writes a user
+    document, and it invalidates the entry. That reaches this worker only:
+    other workers, and roles edited in the datastore directly, pick up the
+    change once their entry's TTL runs out.
+    """
+
+    def __init__(self, collection, ttl_seconds=ROLE_CACHE_TTL_SECONDS, max_entries=ROLE_CACHE_MAX_ENTRIES):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, email):
+        """Return the cached role, or MISSING when the entry is absent or stale."""
+        now = time.monotonic()
+        with self._lock:
+            role, expires_at = self._entries.get(email, (MISSING, 0))
+            if role is not MISSING and expires_at > now:
+                self._entries.move_to_end(email)
+                self.hits += 1
+                return role
+            self.misses += 1
+            return MISSING
+
+    def load(self, email):
+        user_doc = self.collection.document(email).get()
+        role = user_doc.to_dict().get("role") if user_doc.exists else None
+
+        with self._lock:
+            self._entries[email] = (role, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return role
+
+    def get_role(self, email):
+        role = self.lookup(email)
+        return self.load(email) if role is MISSING else role
+
+    def invalidate(self, email=None):
+        with self._lock:
+            if email is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(email, None)
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+role_cache = RoleCache(users_collection)
+
+
+def token_claims(authorization: Optional[str]):
+    """Claims of a valid ``Authorization: Bearer`` token, else None."""
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    return verify_token(authorization[len("Bearer "):].strip())
+
+
+async def require_admin(x_user_email: Optional[str] = Header(None),
+                        authorization: Optional[str] = Header(None)) -> str:
+    claims = token_claims(authorization)
+    if claims is not None:
+        if claims.get("role") != "admin":
+            raise HTTPException(status_code=403, detail="Admin privileges required")
+        return claims["sub"]
+
+    # No usable token (absent or expired): fall back to the role lookup.
+    if users_collection is None:
+        raise HTTPException(status_code=500, detail="Database not initialized")
+    if not x_user_email:
+        raise HTTPException(status_code=401, detail="Missing user email header")
+    role = role_cache.lookup(x_user_email)
+    if role is MISSING:
+        role = await async_store.users.run(role_cache.load, x_user_email)
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return x_user_email
+
+
+async def require_question_bank():
+    """503 while the question bank is still loading, rather than holding the
+    request (and an event-loop turn) until the first scan completes."""
+    try:
+        question_bank.current_generation()
+    except QuestionBankNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(QUESTION_BANK_RETRY_AFTER_SECONDS)})
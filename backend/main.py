@@ -1,8 +1,66 @@
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from backend.routes import user, quiz, question, result
+from backend.db.question_bank import question_bank
+from backend.db.session_store import session_store, session_sweeper
+from backend.db.result_writer import result_writer
+from backend.db.answer_log import answer_log
+from backend.auth import password_hasher
+from backend import metrics
 
-app = FastAPI(title="Adaptive Quiz Platform", version="1.0.0")
+# Loading the question bank, model and adaptive state is readiness work:
+# /health answers as soon as the process is up, /ready once this is done.
+readiness = {"status": "starting", "started_at": None, "ready_at": None, "error": None}
+
+
+def warm_up():
+    try:
+        quiz.load_adaptive_state()
+        question_bank.start()
+        quiz.difficulty_model.load()
+        quiz.model_watcher.start(quiz.difficulty_model.version)
+        readiness["status"] = "ready"
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+        readiness["status"] = "failed"
+        readiness["error"] = str(e)
+    finally:
+        readiness["ready_at"] = datetime.utcnow().isoformat()
+
+def start_background_services(block=True):
+    readiness.update(status="starting", started_at=datetime.utcnow().isoformat(), ready_at=None, error=None)
+    result_writer.start()
+    answer_log.start()
+    quiz.retrain_scheduler.start()
+    session_sweeper.start()
+    if block:
+        warm_up()
+    else:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+def stop_background_services():
+    session_sweeper.stop()
+    quiz.retrain_scheduler.stop()
+    quiz.model_watcher.stop()
+    question_bank.stop()
+    result_writer.stop()
+    answer_log.stop()
+    password_hasher.shutdown()
+    # Last, so a failed save surfaces as a shutdown error without leaving
+    # other services running.
+    quiz.save_adaptive_state()
+
+@asynccontextmanager
+async def lifespan(app):
+    start_background_services(block=False)
+    yield
+    stop_background_services()
+
+app = FastAPI(title="Adaptive Quiz Platform", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,6 +70,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def instrument(app):
+    """Mount the request metrics middleware, the service gauges and ``/metrics``."""
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.register_gauge("quiz_sessions_active", "Live quiz sessions.", session_store.live_count)
+    metrics.register_gauge("question_bank_questions", "Questions in the in-memory bank.", question_bank.count)
+    metrics.register_gauge("result_queue_depth", "Results waiting for a batched write.",
+                           lambda: result_writer.stats()["queue_depth"])
+    metrics.register_gauge("difficulty_model_version", "Model registry version being served.",
+                           lambda: quiz.difficulty_model.version or 0)
+    metrics.register_gauge("answer_log_buffered", "Answers waiting for the next log segment.",
+                           lambda: answer_log.stats()["buffered"])
+    metrics.register_gauge("password_hash_pending", "Password hashes queued or running.",
+                           lambda: password_hasher.pending)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+if metrics.METRICS_ENABLED:
+    instrument(app)
+
 app.include_router(user.router, prefix="/api/users", tags=["users"])
 app.include_router(quiz.router, prefix="/api/quiz", tags=["quiz"])
 app.include_router(question.router, prefix="/api/questions", tags=["questions"])
@@ -25,6 +104,10 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    return JSONResponse(readiness, status_code=200 if readiness["status"] == "ready" else 503)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,213 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+With METRICS_ENABLED=0 the middleware is not mounted and every ``inc``,
+``observe`` and ``timer`` call returns before taking a lock or reading the
+clock, so instrumented hot paths pay one attribute check.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MODEL_BUCKETS = (0.000001, 0.000005, 0.00001, 0.00005, 0.0001, 0.001, 0.01, 0.1, 1.0, 10.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._render_value(labels, value))
+        return lines
+
+    def _render_value(self, labels, value):
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """Gauge whose value is read from ``callback`` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, callback):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def render(self):
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", f"{self.name} {value}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def timer(self, *labels):
+        if not METRICS_ENABLED:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _render_value(self, labels, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += bucket_count
+            le = bound if bound == "+Inf" else repr(float(bound))
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', le)])} {cumulative}")
+        label_text = _format_labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{label_text} {total}")
+        lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status")))
+http_request_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route and method.", ("route", "method")))
+datastore_operations = registry.register(Counter(
+    "datastore_operations_total", "Datastore calls by collection, operation and outcome.",
+    ("collection", "operation", "outcome")))
+datastore_operation_seconds = registry.register(Histogram(
+    "datastore_operation_duration_seconds", "Datastore call latency by collection and operation.",
+    ("collection", "operation")))
+model_predict_seconds = registry.register(Histogram(
+    "model_predict_duration_seconds", "DifficultyModel.predict_difficulty latency.", buckets=MODEL_BUCKETS))
+model_train_seconds = registry.register(Histogram(
+    "model_train_duration_seconds", "Difficulty model retraining duration by outcome.", ("outcome",),
+    buckets=MODEL_BUCKETS))
+
+
+@contextmanager
+def datastore_timer(collection, operation):
+    """Count and time one datastore call, labelling failures by outcome."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        datastore_operation_seconds.observe(time.perf_counter() - started, collection, operation)
+        datastore_operations.inc(collection, operation, outcome)
+
+
+def register_gauge(name, documentation, callback):
+    return registry.register(Gauge(name, documentation, callback))
+
+
+def observe_retrain_job(job):
+    if job.get("duration_seconds") is not None:
+        model_train_seconds.observe(job["duration_seconds"], job["status"])
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request counts and latency.
+
+    Requests are labelled with the matched route template, e.g.
+    ``/api/users/{email}``, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            http_request_seconds.observe(time.perf_counter() - started, path, method)
+            http_requests.inc(path, method, str(status))
@@ -14,6 +14,12 @@ class QuizAnswer(BaseModel):
     question_id: str
     user_answer: str
 
+class GradeBatchRequest(BaseModel):
+    submissions: List[QuizQuestion]
+    user_id: Optional[str] = None
+    exam_id: Optional[str] = None
+    store: bool = False
+
 class NextQuestionRequest(BaseModel):
     session_id: str
     previous_score: float  
\ No newline at end of file
@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+# Bodies smaller than this are not worth compressing.
+RESPONSE_CACHE_COMPRESS_MIN_BYTES = int(os.environ.get("RESPONSE_CACHE_COMPRESS_MIN_BYTES", "1024"))
+
+
+class CachedBody:
+    """One JSON body with its precompressed encodings and their strong ETags."""
+
+    __slots__ = ("generation", "encodings")
+
+    def __init__(self, generation, body):
+        self.generation = generation
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # encoding -> (body, etag); each encoding is its own representation.
+        self.encodings = {"identity": (body, f'"{digest}"')}
+        if len(body) >= RESPONSE_CACHE_COMPRESS_MIN_BYTES:
+            self.encodings["gzip"] = (gzip.compress(body, mtime=0), f'"{digest}-gzip"')
+            if brotli is not None:
+                self.encodings["br"] = (brotli.compress(body), f'"{digest}-br"')
+
+    def etags(self):
+        return {etag for _, etag in self.encodings.values()}
+
+    def negotiate(self, accept_encoding):
+        accepted = {part.split(";")[0].strip() for part in (accept_encoding or "").lower().split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.encodings:
+                return encoding
+        return "identity"
+
+
+def _if_none_match(header):
+    if not header:
+        return set()
+    # The weak comparison RFC 9110 prescribes for If-None-Match ignores W/.
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+class ResponseCache:
+    """Bounded LRU of serialised read responses keyed by endpoint and query.
+
+    Each entry records the data generation it was built from (for the
+    question endpoints, ``QuestionBank.generation``). A request at the same
+    generation reuses the stored bytes, or gets a 304 when its
+    ``If-None-Match`` names any encoding of them. Any other generation
+    rebuilds the entry.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _get(self, key, generation):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.generation != generation:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def respond(self, request: Request, key, generation, build, cache_control="no-cache"):
+        """Response for ``key`` at ``generation``; ``build`` is an async callable
+        returning the JSON-serialisable payload on a miss."""
+        entry = self._get(key, generation)
+        if entry is None:
+            payload = await build()
+            entry = CachedBody(generation, json.dumps(payload, default=str, separators=(",", ":")).encode())
+            self._put(key, entry)
+
+        encoding = entry.negotiate(request.headers.get("accept-encoding"))
+        body, etag = entry.encodings[encoding]
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+        requested = _if_none_match(request.headers.get("if-none-match"))
+        if "*" in requested or requested & entry.etags():
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "brotli": brotli is not None,
+            }
+
+
+question_response_cache = ResponseCache()
@@ -1,12 +1,28 @@
-from fastapi import APIRouter, HTTPException, Request
-import requests
-import html
-import random
-from backend.db.firebase_config import questions_collection, users_collection
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import json
+from backend.db.firebase_config import db, questions_collection
+from backend.db import async_store
+from backend.dependencies import require_admin, require_question_bank
+from backend.db.question_bank import question_bank
+from backend.db.question_import import (
+    OPENTDB_MAX_AMOUNT, OPENTDB_MAX_PAGES, import_sample_question_list, import_trivia_questions, content_hash,
+)
+from backend.db.pagination import document_listing
+from backend.response_cache import question_response_cache
+from quiz_engine.question_search import SearchIndex, SEARCH_MAX_LIMIT
+from quiz_engine.similarity_index import SimilarityIndex
+from typing import Optional
 from backend.models.question import Question
 
 router = APIRouter()
 
+similarity_index = SimilarityIndex()
+question_bank.add_change_listener(similarity_index.sync_questions)
+search_index = SearchIndex()
+question_bank.add_change_listener(search_index.sync_questions)
+
 SAMPLE_QUESTIONS = [
     {
         "question": "What is the capital of France?",
@@ -55,252 +71,211 @@ SAMPLE_QUESTIONS = [
     }
 ]
 
-@router.post("/import-from-api")
-def import_questions_from_api(request: Request):
+def _drain(events):
+    event = None
+    for event in events:
+        pass
+    return event
+
+# Imports check near-duplicates against the similarity index, which the
+# question bank fills on its first load.
+@router.post("/import-from-api", dependencies=[Depends(require_question_bank)])
+async def import_questions_from_api(pages: int = 1, amount: int = 50, category: int = 18,
+                              stream: bool = False, admin_email: str = Depends(require_admin)):
+    if not 1 <= amount <= OPENTDB_MAX_AMOUNT:
+        raise HTTPException(status_code=400, detail=f"amount must be between 1 and {OPENTDB_MAX_AMOUNT}")
+    if not 1 <= pages <= OPENTDB_MAX_PAGES:
+        raise HTTPException(status_code=400, detail=f"pages must be between 1 and {OPENTDB_MAX_PAGES}")
     try:
         if questions_collection is None:
             raise HTTPException(status_code=500, detail="Database not initialized")
             
-        email = request.headers.get("x-user-email")
-        if not email:
-            raise HTTPException(status_code=401, detail="Missing user email header")
-            
-        user_doc = users_collection.document(email).get()
-        if not user_doc.exists or user_doc.to_dict().get("role") != "admin":
-            raise HTTPException(status_code=403, detail="Admin privileges required")
+        events = import_trivia_questions(
+            db, questions_collection, pages=pages, amount=amount, category=category,
+            on_commit=question_bank.upsert, similarity_index=similarity_index,
+        )
 
-        print("🔍 Starting API import from Open Trivia DB...")
-        
-        QUESTIONS_API_URL = "https://opentdb.com/api.php?amount=50&category=18&type=multiple"
-        
-        response = requests.get(QUESTIONS_API_URL, timeout=30)
-        print(f"🔍 API Response Status: {response.status_code}")
-        
-        if response.status_code != 200:
-            print(f"🔍 API Error: {response.text}")
-            raise HTTPException(status_code=500, detail="Failed to fetch questions from API")
-        
-        data = response.json()
-        api_questions = data.get('results', [])
-        print(f"🔍 Received {len(api_questions)} questions from API")
-        
-        if not api_questions:
-            print("🔍 No questions found in API response")
+        if stream:
+            return StreamingResponse(
+                (json.dumps(event) + "\n" for event in events),
+                media_type="application/x-ndjson",
+            )
+
+        event = await async_store.questions.run(_drain, events)
+
+        if event["total_available"] == 0:
             raise HTTPException(status_code=500, detail="No questions found in API response")
-        
-        print(f"🔍 First question sample: {api_questions[0].get('question', 'No question text')[:50]}...")
-        
-        imported_count = 0
-        failed_imports = 0
-        
-        for i, api_question in enumerate(api_questions):
-            try:
-                print(f"🔍 Processing question {i+1}: {api_question.get('question', 'No question text')[:50]}...")
-                
-                question_text = html.unescape(api_question['question'])
-                correct_answer = html.unescape(api_question['correct_answer'])
-                incorrect_answers = [html.unescape(ans) for ans in api_question['incorrect_answers']]
-                
-                all_options = incorrect_answers + [correct_answer]
-                random.shuffle(all_options)
-                
-                opentdb_difficulty = api_question.get('difficulty', 'medium')
-                difficulty_map = {
-                    'easy': 'easy',
-                    'medium': 'medium', 
-                    'hard': 'hard'
-                }
-                difficulty = difficulty_map.get(opentdb_difficulty, 'medium')
-                
-                question = Question(
-                    question_text=question_text,
-                    options=all_options,
-                    correct_answer=correct_answer,
-                    difficulty=difficulty
-                )
-                
-                if not question.question_text or not question.correct_answer:
-                    print(f"🔍 Skipping question {i+1} - missing required fields")
-                    failed_imports += 1
-                    continue
-                
-                existing_questions = questions_collection.where(
-                    "question_text", "==", question.question_text
-                ).get()
-                
-                if not existing_questions:
-                    question_doc = questions_collection.document()
-                    question_data = question.dict()
-                    if question_data.get("id"):
-                        del question_data["id"]
-                    question_doc.set(question_data)
-                    imported_count += 1
-                    print(f"✅ Imported question {i+1}")
-                else:
-                    print(f"⏭️ Skipping duplicate question {i+1}")
-                    failed_imports += 1
-                    
-            except Exception as e:
-                print(f"❌ Error importing question {i+1}: {e}")
-                failed_imports += 1
-                continue
 
-        print(f"🎉 Import completed: {imported_count} questions imported, {failed_imports} failed")
-        
         return {
-            "message": f"Successfully imported {imported_count} questions from Open Trivia DB",
-            "imported": imported_count,
-            "failed": failed_imports,
-            "total_available": len(api_questions)
+            "message": f"Successfully imported {event['imported']} questions from Open Trivia DB",
+            "imported": event["imported"],
+            "duplicates": event["duplicates"],
+            "near_duplicates": event["near_duplicates"],
+            "failed": event["failed"] + event["duplicates"] + event["near_duplicates"],
+            "total_available": event["total_available"]
         }
         
     except Exception as e:
-        print(f"❌ API import failed: {e}")
+        print(f"API import failed: {e}")
         raise HTTPException(status_code=500, detail=f"API import failed: {str(e)}")
 
-@router.post("/import-sample-questions")
-def import_sample_questions(request: Request):
+@router.post("/import-sample-questions", dependencies=[Depends(require_question_bank)])
+async def import_sample_questions(admin_email: str = Depends(require_admin)):
     try:
         if questions_collection is None:
             raise HTTPException(status_code=500, detail="Database not initialized")
             
-        email = request.headers.get("x-user-email")
-        if not email:
-            raise HTTPException(status_code=401, detail="Missing user email header")
-            
-        user_doc = users_collection.document(email).get()
-        if not user_doc.exists or user_doc.to_dict().get("role") != "admin":
-            raise HTTPException(status_code=403, detail="Admin privileges required")
-
-        imported_count = 0
-        
-        for sample_question in SAMPLE_QUESTIONS:
-            try:
-                question = Question(
-                    question_text=sample_question['question'],
-                    options=[
-                        sample_question['option1'],
-                        sample_question['option2'],
-                        sample_question['option3'],
-                        sample_question['option4']
-                    ],
-                    correct_answer=sample_question['correct_answer'],
-                    difficulty=sample_question['difficulty']
-                )
-                
-                existing_questions = questions_collection.where(
-                    "question_text", "==", question.question_text
-                ).get()
-                
-                if not existing_questions:
-                    question_doc = questions_collection.document()
-                    question_data = question.dict()
-                    if question_data.get("id"):
-                        del question_data["id"]
-                    question_doc.set(question_data)
-                    imported_count += 1
-                    
-            except Exception as e:
-                print(f"Error importing sample question: {e}")
-                continue
+        importer = await async_store.questions.run(
+            import_sample_question_list, db, questions_collection, SAMPLE_QUESTIONS,
+            on_commit=question_bank.upsert, similarity_index=similarity_index,
+        )
 
         return {
-            "message": f"Successfully imported {imported_count} sample questions",
-            "imported": imported_count
+            "message": f"Successfully imported {importer.imported} sample questions",
+            "imported": importer.imported
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sample import failed: {str(e)}")
 
-@router.post("/add")
-def add_question(question: Question, request: Request):
+@router.post("/add", dependencies=[Depends(require_question_bank)])
+async def add_question(question: Question, force: bool = False, admin_email: str = Depends(require_admin)):
     try:
         if questions_collection is None:
             raise HTTPException(status_code=500, detail="Database not initialized")
+        
+        if not force:
+            similar = similarity_index.find_similar(question.question_text)
+            if similar:
+                raise HTTPException(status_code=409, detail={
+                    "message": "Question is a near-duplicate of existing questions; pass force=true to add it anyway",
+                    "similar": _describe_similar(similar),
+                })
             
-        email = request.headers.get("x-user-email")
-        if not email:
-            raise HTTPException(status_code=401, detail="Missing user email header")
-            
-        user_doc = users_collection.document(email).get()
-        if not user_doc.exists or user_doc.to_dict().get("role") != "admin":
-            raise HTTPException(status_code=403, detail="Admin privileges required")
-
-        question_doc = questions_collection.document()
         question_data = question.dict()
-        if question_data.get("id"):
-            del question_data["id"]
+        question_data.pop("id", None)
+        question_data["content_hash"] = content_hash(question.question_text)
             
-        question_doc.set(question_data)
-        return {"id": question_doc.id, **question_data}
+        question_id = await async_store.questions.add(question_data)
+        question_bank.upsert(question_id, question_data)
+        return {"id": question_id, **question_data}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to add question: {str(e)}")
 
-@router.get("/by-difficulty/{difficulty}")
-def get_questions_by_difficulty(difficulty: str):
+def _describe_similar(matches):
+    described = []
+    for question_id, similarity in matches:
+        data = question_bank.get(question_id) or {}
+        described.append({"id": question_id, "similarity": similarity, "question_text": data.get("question_text")})
+    return described
+
+@router.get("/by-difficulty/{difficulty}", dependencies=[Depends(require_question_bank)])
+async def get_questions_by_difficulty(difficulty: str, request: Request):
     try:
         if questions_collection is None:
             raise HTTPException(status_code=500, detail="Database not initialized")
             
-        docs = questions_collection.where("difficulty", "==", difficulty).get()
-        questions = []
-        for doc in docs:
-            question_data = doc.to_dict()
-            question_data["id"] = doc.id
-            questions.append(question_data)
-            
-        return questions
+        # Served from the question bank index; the body is rebuilt only when
+        # the bank's generation moves on.
+        async def build():
+            return question_bank.list(difficulty)
+        
+        return await question_response_cache.respond(
+            request, ("by-difficulty", difficulty), question_bank.current_generation(), build
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get questions: {str(e)}")
 
-@router.get("/all")
-def list_all_questions(request: Request):
+@router.get("/all", dependencies=[Depends(require_question_bank)])
+async def list_all_questions(request: Request, limit: Optional[int] = None, start_after: Optional[str] = None,
+                       fields: Optional[str] = None, stream: bool = False,
+                       admin_email: str = Depends(require_admin)):
     try:
         if questions_collection is None:
             raise HTTPException(status_code=500, detail="Database not initialized")
-            
-        # Admin check
-        email = request.headers.get("x-user-email")
-        if not email:
-            raise HTTPException(status_code=401, detail="Missing user email header")
-            
-        user_doc = users_collection.document(email).get()
-        if not user_doc.exists or user_doc.to_dict().get("role") != "admin":
-            raise HTTPException(status_code=403, detail="Admin privileges required")
-
-        docs = questions_collection.get()
-        questions = []
-        for doc in docs:
-            question_data = doc.to_dict()
-            question_data["id"] = doc.id
-            questions.append(question_data)
-            
-        return questions
+        
+        if stream:
+            return await async_store.questions.run(
+                document_listing, questions_collection, limit, start_after, fields, stream
+            )
+        
+        async def build():
+            return await async_store.questions.run(
+                document_listing, questions_collection, limit, start_after, fields
+            )
+        
+        # The listing is read from the collection, not the bank. The bank's
+        # generation only follows the collection while a listener is
+        # attached; under TTL refresh a cached body could outlive writes
+        # by other workers, so it is read afresh every time.
+        if not question_bank.is_live():
+            return await build()
+        
+        return await question_response_cache.respond(
+            request, ("all", limit, start_after, fields), question_bank.current_generation(), build,
+            cache_control="private, no-cache"
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get questions: {str(e)}")
 
+@router.get("/search", dependencies=[Depends(require_question_bank)])
+async def search_questions(q: str, difficulty: Optional[str] = None, limit: int = 20, offset: int = 0,
+                           admin_email: str = Depends(require_admin)):
+    if not 1 <= limit <= SEARCH_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {SEARCH_MAX_LIMIT}")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset must not be negative")
+    # Refreshes a stale bank, and through its listeners the index.
+    question_bank.current_generation()
+    total, matches = search_index.search(q, difficulty, limit, offset)
+    items = []
+    for question_id, score in matches:
+        data = question_bank.get(question_id)
+        if data is not None:
+            items.append({**data, "id": question_id, "score": score})
+    next_offset = offset + limit if offset + limit < total else None
+    return {"total": total, "items": items, "next_offset": next_offset}
+
+@router.get("/duplicates", dependencies=[Depends(require_question_bank)])
+async def list_duplicate_clusters(threshold: Optional[float] = None, admin_email: str = Depends(require_admin)):
+    """Groups of existing questions whose texts are near-duplicates of each other."""
+    clusters = await asyncio.get_running_loop().run_in_executor(None, similarity_index.clusters, threshold)
+    report = []
+    for cluster in clusters:
+        questions = []
+        for question_id in cluster:
+            data = question_bank.get(question_id) or {}
+            questions.append({
+                "id": question_id,
+                "question_text": data.get("question_text"),
+                "difficulty": data.get("difficulty"),
+            })
+        report.append(questions)
+    return {
+        "threshold": similarity_index.threshold if threshold is None else threshold,
+        "indexed": len(similarity_index),
+        "clusters": report,
+    }
+
+@router.get("/cache/stats")
+async def question_cache_stats():
+    return question_response_cache.stats()
+
 @router.delete("/{question_id}")
-def delete_question(question_id: str, request: Request):
+async def delete_question(question_id: str, admin_email: str = Depends(require_admin)):
     try:
         if questions_collection is None:
             raise HTTPException(status_code=500, detail="Database not initialized")
             
-        email = request.headers.get("x-user-email")
-        if not email:
-            raise HTTPException(status_code=401, detail="Missing user email header")
-            
-        user_doc = users_collection.document(email).get()
-        if not user_doc.exists or user_doc.to_dict().get("role") != "admin":
-            raise HTTPException(status_code=403, detail="Admin privileges required")
-
-        doc_ref = questions_collection.document(question_id)
-        doc = doc_ref.get()
-        if not doc.exists:
+        if await async_store.questions.get(question_id) is None:
             raise HTTPException(status_code=404, detail="Question not found")
             
-        doc_ref.delete()
+        await async_store.questions.delete(question_id)
+        question_bank.remove(question_id)
         return {"message": "Question deleted", "id": question_id}
     except HTTPException:
         raise
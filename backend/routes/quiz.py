@@ -1,48 +1,95 @@
-from fastapi import APIRouter, HTTPException
-from backend.db.firebase_config import db, questions_collection, results_collection
-from backend.models.quiz import Quiz, QuizAnswer, NextQuestionRequest
+import os
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException
+from backend.db.firebase_config import db, questions_collection, submissions_collection
+from backend.db import async_store
+from backend.db.question_bank import question_bank
+from backend.db.session_store import QuizSession, session_store
+from backend.db.result_writer import result_writer
+from backend.db.user_stats_store import user_stats_store
+from backend.db.submission_store import submission_store, summarize
+from backend.db.answer_log import answer_log
+from backend.dependencies import require_admin, require_question_bank, token_claims
+from backend.metrics import model_predict_seconds, observe_retrain_job
+from backend.models.quiz import Quiz, QuizAnswer, NextQuestionRequest, GradeBatchRequest
 from quiz_engine.difficulty_model import DifficultyModel
-from quiz_engine.grader import grade_answer
+from quiz_engine.retrain_scheduler import RetrainScheduler
+from quiz_engine.model_registry import RegistryWatcher
+from quiz_engine.adaptive_engine import AdaptiveEngine, ADAPTIVE_STATE_PATH, LABEL_DIFFICULTY, ability_label
+from quiz_engine.grader import AnswerKey, answer_digest, grade_answer_digest, grade_batch
 from quiz_engine.feedback_generator import generate_feedback
 from quiz_engine.selector import select_difficulty
 from datetime import datetime
-import random
-import uuid
+from typing import Optional
+
+# "irt" picks the most informative item for the session's ability estimate;
+# "bucket" keeps the accuracy-bucket selection with a random pick per bucket.
+ADAPTIVE_SELECTION = os.environ.get("ADAPTIVE_SELECTION", "irt")
+QUIZ_LENGTH = 10
+GRADE_BATCH_MAX = int(os.environ.get("GRADE_BATCH_MAX", "10000"))
+# Ids outside the bank index cost a datastore read each; an unauthenticated
+# batch may only bring this many.
+GRADE_BATCH_FETCH_MAX = int(os.environ.get("GRADE_BATCH_FETCH_MAX", "100"))
 
 router = APIRouter()
 
 difficulty_model = DifficultyModel()
+# Picks up versions published or rolled back by any worker.
+model_watcher = RegistryWatcher(difficulty_model.registry, difficulty_model.apply_artifact)
+retrain_scheduler = RetrainScheduler(difficulty_model, db)
+result_writer.add_flush_listener(lambda records: retrain_scheduler.notify_results(len(records)))
+result_writer.add_flush_listener(user_stats_store.record_results)
+retrain_scheduler.add_job_listener(observe_retrain_job)
+
+adaptive_engine = AdaptiveEngine()
+question_bank.add_change_listener(adaptive_engine.sync_items)
+
+
+def load_adaptive_state():
+    # Must run before the question bank loads so synced items keep their
+    # learned difficulties.
+    adaptive_engine.load(ADAPTIVE_STATE_PATH)
+
+def save_adaptive_state(job=None):
+    adaptive_engine.save(ADAPTIVE_STATE_PATH)
+
+# Checkpoint learned abilities and item difficulties alongside each retrain;
+# a failed save is reported like any other failing job listener.
+retrain_scheduler.add_job_listener(save_adaptive_state)
+
+answer_key = AnswerKey()
+question_bank.add_change_listener(answer_key.sync_questions)
+
+
+async def session_call(fn, *args):
+    # The in-memory store is a dict operation under a lock, cheaper than the
+    # hop to an executor; only a store doing I/O is moved off the loop.
+    if session_store.blocking:
+        return await async_store.sessions.run(fn, *args)
+    return fn(*args)
+
 
-active_sessions = {}
-
-class QuizSession:
-    def __init__(self, user_id, initial_difficulty):
-        self.session_id = str(uuid.uuid4())
-        self.user_id = user_id
-        self.current_difficulty = initial_difficulty
-        self.questions_answered = 0
-        self.correct_answers = 0
-        self.questions = []
-        self.current_question_index = 0
-        self.is_completed = False
-        self.answered_questions = []  
-
-@router.post("/start")
-def start_quiz(quiz: Quiz):
+@router.post("/start", dependencies=[Depends(require_question_bank)])
+async def start_quiz(quiz: Quiz):
     try:
         if questions_collection is None:
             raise HTTPException(status_code=500, detail="Database not initialized")
             
-        initial_difficulty = difficulty_model.predict_difficulty(quiz.previous_score)
+        with model_predict_seconds.timer():
+            initial_difficulty = difficulty_model.predict_difficulty(quiz.previous_score)
         
         session = QuizSession(quiz.user_id, initial_difficulty)
+        session.ability = adaptive_engine.ability(quiz.user_id, LABEL_DIFFICULTY[initial_difficulty])
+        session.plan = build_question_plan()
         
-        question = get_question_by_difficulty(initial_difficulty, [])
+        question = select_question(session)
         if not question:
             raise HTTPException(status_code=404, detail="No questions available")
         
+        session.serve(question)
+        
         # Store session
-        active_sessions[session.session_id] = session
+        await session_call(session_store.save, session)
         
         return {
             "session_id": session.session_id,
@@ -54,123 +101,271 @@ def start_quiz(quiz: Quiz):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/next-question")
-def get_next_question(payload: dict):
+@router.post("/next-question", dependencies=[Depends(require_question_bank)])
+async def get_next_question(payload: dict):
     try:
         session_id = payload.get("session_id")
         previous_score = payload.get("previous_score", 0)  
         
-        if not session_id or session_id not in active_sessions:
+        session = await session_call(session_store.get, session_id) if session_id else None
+        if session is None:
             raise HTTPException(status_code=404, detail="Quiz session not found")
         
-        session = active_sessions[session_id]
-        
-        session.questions_answered += 1
-        if previous_score == 1:
-            session.correct_answers += 1
-        
-        if hasattr(session, 'last_question_id'):
-            session.answered_questions.append(session.last_question_id)
-        
-        if session.questions_answered >= 10:
-            return end_quiz_session(session_id)
-        
-        current_accuracy = (session.correct_answers / session.questions_answered) * 100
+        return await advance_session(session, previous_score)
         
-        new_difficulty = select_difficulty(current_accuracy)
-        session.current_difficulty = new_difficulty
-        
-        question = get_question_by_difficulty(new_difficulty, session.answered_questions)
-        if not question:
-            question = get_question_by_difficulty(None, session.answered_questions)
-            if not question:
-                return end_quiz_session(session_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/submit-answer", dependencies=[Depends(require_question_bank)])
+async def submit_answer(payload: dict):
+    try:
+        session_id = payload.get("session_id")
+        question_id = payload.get("question_id")
+        user_answer = payload.get("user_answer")
         
-        session.last_question_id = question["id"]
+        session = await session_call(session_store.get, session_id) if session_id else None
+        if session is None:
+            raise HTTPException(status_code=404, detail="Quiz session not found")
         
-        return {
-            "session_id": session_id,
-            "difficulty": new_difficulty,
-            "question": question,
-            "questions_answered": session.questions_answered,
-            "correct_answers": session.correct_answers,
-            "current_accuracy": current_accuracy,
-            "total_questions": 10
-        }
+        graded = await grade_session_answer(session, question_id, user_answer)
+        await session_call(session_store.save, session)
+        return graded
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/submit-answer")
-def submit_answer(payload: dict):
+@router.post("/submit-and-next", dependencies=[Depends(require_question_bank)])
+async def submit_and_next(payload: dict):
+    """Grade the answer and return the next question (or the final result)
+    in one round trip, equivalent to /submit-answer then /next-question."""
     try:
         session_id = payload.get("session_id")
         question_id = payload.get("question_id")
         user_answer = payload.get("user_answer")
         
-        if not session_id or session_id not in active_sessions:
+        session = await session_call(session_store.get, session_id) if session_id else None
+        if session is None:
             raise HTTPException(status_code=404, detail="Quiz session not found")
         
-        question_doc = questions_collection.document(question_id).get()
-        if not question_doc.exists:
-            raise HTTPException(status_code=404, detail="Question not found")
-            
-        question_data = question_doc.to_dict()
-        correct_answer = question_data.get("correct_answer")
+        graded = await grade_session_answer(session, question_id, user_answer)
+        return {**graded, "next": await advance_session(session, graded["score"])}
         
-        if not correct_answer:
-            raise HTTPException(status_code=500, detail="Question has no correct answer")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/grade-batch", dependencies=[Depends(require_question_bank)])
+async def grade_batch_answers(request: GradeBatchRequest, x_user_email: Optional[str] = Header(None),
+                              authorization: Optional[str] = Header(None)):
+    try:
+        if len(request.submissions) > GRADE_BATCH_MAX:
+            raise HTTPException(status_code=400, detail=f"At most {GRADE_BATCH_MAX} answers per batch")
+        if request.store and not request.user_id:
+            raise HTTPException(status_code=400, detail="user_id is required to store a submission")
+        if request.store:
+            # A stored paper is attributed to user_id: only that user, with
+            # a valid token, or an admin may store it.
+            claims = token_claims(authorization)
+            if claims is None or claims.get("sub") != request.user_id:
+                await require_admin(x_user_email, authorization)
         
-        # Grade the answer
-        grade = grade_answer(user_answer, correct_answer)
+        question_ids = [submission.id for submission in request.submissions]
+        user_answers = [submission.user_answer for submission in request.submissions]
         
-        # Store the current question ID in session
-        session = active_sessions[session_id]
-        session.last_question_id = question_id
+        # Questions outside the bank index are read in one batch, which also
+        # adds their keys to the answer key.
+        missing = answer_key.missing(question_ids)
+        if len(missing) > GRADE_BATCH_FETCH_MAX:
+            raise HTTPException(status_code=400,
+                                detail=f"At most {GRADE_BATCH_FETCH_MAX} question ids outside the question bank per batch")
+        if missing:
+            await async_store.questions.run(question_bank.fetch_many, missing)
         
-        return {
-            "is_correct": grade["is_correct"],
-            "score": grade["score"],
-            "message": grade["message"],
-            "correct_answer": correct_answer
-        }
+        summary = summarize(grade_batch(question_ids, user_answers, answer_key))
+        response = {**summary, "total": len(question_ids)}
+        
+        if request.store:
+            if submissions_collection is None:
+                raise HTTPException(status_code=500, detail="Database not initialized")
+            response["submission_id"] = await async_store.submissions.run(submission_store.save, {
+                "user_id": request.user_id,
+                "exam_id": request.exam_id,
+                "question_ids": question_ids,
+                "answers": user_answers,
+                **summary,
+                "timestamp": datetime.utcnow()
+            })
+        
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/regrade")
+async def regrade_submissions(admin_email: str = Depends(require_admin)):
+    if submissions_collection is None:
+        raise HTTPException(status_code=500, detail="Database not initialized")
+    return submission_store.start_regrade(answer_key, question_bank)
+
+@router.get("/regrade")
+async def regrade_status(admin_email: str = Depends(require_admin)):
+    status = submission_store.regrade_status()
+    if status is None:
+        raise HTTPException(status_code=404, detail="No regrade has run")
+    return status
+
 @router.post("/end-quiz")
-def end_quiz(payload: dict):
+async def end_quiz(payload: dict):
     try:
         session_id = payload.get("session_id")
-        if not session_id or session_id not in active_sessions:
+        session = await session_call(session_store.get, session_id) if session_id else None
+        if session is None:
             raise HTTPException(status_code=404, detail="Quiz session not found")
         
-        return end_quiz_session(session_id)
+        return await end_quiz_session(session)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/sessions/stats")
+async def session_stats():
+    return await session_call(session_store.stats)
+
 @router.post("/retrain-model")
-def retrain_model():
+async def retrain_model(full: bool = False):
     try:
         if db is None:
             raise HTTPException(status_code=500, detail="Database not initialized")
             
-        difficulty_model.train_from_firebase(db)
-        return {"message": "Model retrained successfully with latest data"}
+        job = retrain_scheduler.request_run(full=full)
+        return {"message": "Model retraining queued", **job}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Model retraining failed: {str(e)}")
 
-def end_quiz_session(session_id):
-    session = active_sessions[session_id]
+@router.get("/retrain-model/{job_id}")
+async def retrain_model_status(job_id: str):
+    job = retrain_scheduler.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Retraining job not found")
+    return job
+
+@router.get("/model")
+async def model_versions():
+    return {
+        "version": difficulty_model.version,
+        "live_version": difficulty_model.registry.current_version(),
+        "pinned_version": difficulty_model.registry.pinned_version(),
+        "versions": difficulty_model.registry.versions(),
+    }
+
+@router.post("/model/rollback")
+async def rollback_model(version: Optional[int] = None, admin_email: str = Depends(require_admin)):
+    try:
+        version = difficulty_model.rollback(version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    model_watcher.version = version
+    return {"message": "Model rolled back", "version": version}
+
+@router.post("/model/unpin")
+async def unpin_model(admin_email: str = Depends(require_admin)):
+    """Let the next retrain publish live again after a rollback."""
+    difficulty_model.registry.unpin()
+    return {"message": "Model unpinned", "version": difficulty_model.registry.current_version()}
+
+async def grade_session_answer(session, question_id, user_answer):
+    """Grade one answer and fold it into the session; the caller saves it."""
+    # Questions served by this session carry a digest of their answer key;
+    # anything else is read through the question bank cache. The answer
+    # itself is only shown back, so it is taken from the bank if present.
+    key_digest = session.answer_keys.get(question_id)
+    question_data = question_bank.get(question_id)
+    if key_digest is None:
+        if question_data is None:
+            question_data = await async_store.questions.run(question_bank.fetch, question_id)
+        if question_data is None:
+            raise HTTPException(status_code=404, detail="Question not found")
+        key_digest = answer_digest(question_data.get("correct_answer"))
+    correct_answer = question_data.get("correct_answer") if question_data is not None else None
+    
+    if not key_digest:
+        raise HTTPException(status_code=500, detail="Question has no correct answer")
+    
+    grade = grade_answer_digest(user_answer, key_digest)
+    
+    # Only the first answer to a question moves the ability estimates and
+    # goes into the answer log.
+    if question_id not in session.responses:
+        session.responses[question_id] = grade["is_correct"]
+        session.ability = adaptive_engine.record(
+            session.user_id, question_id, grade["is_correct"], theta=session.ability
+        )
+        is_current = question_id == session.last_question_id and session.served_at is not None
+        answer_log.record(
+            session.session_id, session.user_id, question_id,
+            session.served_difficulty if is_current else None, grade["is_correct"],
+            (time.time() - session.served_at) * 1000 if is_current else None
+        )
+    
+    session.last_question_id = question_id
+    
+    return {
+        "is_correct": grade["is_correct"],
+        "score": grade["score"],
+        "message": grade["message"],
+        "correct_answer": correct_answer,
+        "ability": session.ability
+    }
+
+async def advance_session(session, previous_score):
+    """Count the last answer, then serve the next question or end the quiz."""
+    session.questions_answered += 1
+    if previous_score == 1:
+        session.correct_answers += 1
+    
+    if session.last_question_id is not None:
+        session.answered_questions.append(session.last_question_id)
     
+    if session.questions_answered >= QUIZ_LENGTH:
+        return await end_quiz_session(session)
+    
+    current_accuracy = (session.correct_answers / session.questions_answered) * 100
+    
+    if ADAPTIVE_SELECTION == "irt" and session.ability is not None:
+        new_difficulty = ability_label(session.ability)
+    else:
+        new_difficulty = select_difficulty(current_accuracy)
+    session.current_difficulty = new_difficulty
+    
+    question = select_question(session)
+    if not question:
+        return await end_quiz_session(session)
+    
+    session.serve(question)
+    await session_call(session_store.save, session)
+    
+    return {
+        "session_id": session.session_id,
+        "difficulty": new_difficulty,
+        "question": question,
+        "questions_answered": session.questions_answered,
+        "correct_answers": session.correct_answers,
+        "current_accuracy": current_accuracy,
+        "total_questions": QUIZ_LENGTH
+    }
+
+async def end_quiz_session(session):
     final_score = (session.correct_answers / session.questions_answered) * 100 if session.questions_answered > 0 else 0
     
     feedback = generate_feedback(final_score)
     next_difficulty = select_difficulty(final_score)
     
-    result_doc = results_collection.document()
-    result_doc.set({
+    # The user's aggregate is updated by the result writer once the result
+    # is committed.
+    await async_store.results.run(result_writer.submit, {
         "user_id": session.user_id,
         "total_score": final_score,
         "questions_answered": session.questions_answered,
@@ -181,10 +376,7 @@ def end_quiz_session(session_id):
         "timestamp": datetime.utcnow()
     })
     
-    if db:
-        difficulty_model.train_from_firebase(db)
-    
-    del active_sessions[session_id]
+    await session_call(session_store.delete, session.session_id)
     
     return {
         "final_score": final_score,
@@ -195,32 +387,40 @@ def end_quiz_session(session_id):
         "session_completed": True
     }
 
+def build_question_plan():
+    """Candidate ids for every difficulty the quiz can move to, drawn in one
+    pass at start so bucket selection needs no per-question sampling.
+
+    Bucket mode only: under IRT selection (the default) the next item
+    depends on the ability estimate after every answer, so it is ranked
+    against the whole bank per question and the plan stays empty; a
+    session whose IRT pick fails falls back to sampling its bucket.
+    """
+    if ADAPTIVE_SELECTION == "irt":
+        return {}
+    return {difficulty: question_bank.sample_ids(difficulty, QUIZ_LENGTH) for difficulty in LABEL_DIFFICULTY}
+
+def select_question(session):
+    """Next question for the session: the most informative unseen item under
+    IRT selection, else the next planned or a random one from the session's
+    difficulty bucket."""
+    if ADAPTIVE_SELECTION == "irt" and session.ability is not None:
+        question_id = adaptive_engine.select(session.ability, session.answered_questions)
+        question = question_bank.get(question_id) if question_id else None
+        if question:
+            return question
+    candidates = session.plan.get(session.current_difficulty) or []
+    while candidates:
+        question_id = candidates.pop(0)
+        question = question_bank.get(question_id) if question_id not in session.answered_questions else None
+        if question:
+            return question
+    question = get_question_by_difficulty(session.current_difficulty, session.answered_questions)
+    return question or get_question_by_difficulty(None, session.answered_questions)
+
 def get_question_by_difficulty(difficulty, exclude_question_ids=None):
     try:
-        if exclude_question_ids is None:
-            exclude_question_ids = []
-            
-        if difficulty:
-            docs = questions_collection.where("difficulty", "==", difficulty).get()
-        else:
-            docs = questions_collection.limit(100).get()
-            
-        if not docs:
-            return None
-        
-        available_questions = []
-        for doc in docs:
-            if doc.id not in exclude_question_ids:
-                question_data = doc.to_dict()
-                question_data["id"] = doc.id
-                available_questions.append(question_data)
-        
-        if not available_questions:
-            return None
-            
-        chosen = random.choice(available_questions)
-        return chosen
-        
+        return question_bank.sample(difficulty, exclude_question_ids)
     except Exception as e:
         print(f"Error getting question: {e}")
         return None
\ No newline at end of file
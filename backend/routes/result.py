@@ -1,6 +1,14 @@
-from fastapi import APIRouter, HTTPException, Request
-from backend.db.firebase_config import results_collection, users_collection
 import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from backend.db.firebase_config import results_collection
+from backend.db import async_store
+from backend.dependencies import require_admin
+from backend.db.result_writer import result_writer
+from backend.db.pagination import document_listing
+from backend.db.user_stats_store import user_stats_store
+from backend.db.answer_log import answer_log, answer_log_reader
+from quiz_engine.user_stats import UserStats
+from typing import Optional
 
 router = APIRouter()
 
@@ -11,54 +19,79 @@ async def submit_result(request: Request):
             raise HTTPException(status_code=500, detail="Database not initialized")
             
         payload = await request.json()
-        result_doc = results_collection.document()
-        result_doc.set(payload)
-        return {"id": result_doc.id, **payload}
+        result_id = await async_store.results.run(result_writer.submit, payload)
+        return {"id": result_id, **payload}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to submit result: {str(e)}")
 
+@router.get("/pipeline/stats")
+async def result_pipeline_stats():
+    return result_writer.stats()
+
+@router.get("/answers/stats")
+async def answer_log_stats():
+    return answer_log.stats()
+
+@router.get("/answers/item-stats")
+async def answer_item_stats(admin_email: str = Depends(require_admin)):
+    try:
+        # Scans every log segment; keep it off the event loop.
+        return await asyncio.get_running_loop().run_in_executor(None, answer_log_reader.item_statistics)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute item statistics: {str(e)}")
+
 @router.get("/user/{email}")
-def get_user_results(email: str):
+async def get_user_results(email: str):
     try:
         if results_collection is None:
             raise HTTPException(status_code=500, detail="Database not initialized")
             
-        result_docs = results_collection.where("user_id", "==", email).get()
+        result_docs = await async_store.results.where("user_id", "==", email)
         results = []
-        for doc in result_docs:
-            data = doc.to_dict()
+        for doc_id, data in result_docs:
             ts = data.get('timestamp')
             if hasattr(ts, 'isoformat'):
                 data['timestamp'] = ts.isoformat()
-            results.append({"id": doc.id, **data})
+            results.append({"id": doc_id, **data})
             
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get results: {str(e)}")
 
-@router.get("/all")
-def get_all_results(request: Request):
+@router.get("/user/{email}/summary")
+async def get_user_summary(email: str):
     try:
         if results_collection is None:
             raise HTTPException(status_code=500, detail="Database not initialized")
-            
-        email = request.headers.get("x-user-email")
-        if not email:
-            raise HTTPException(status_code=401, detail="Missing user email header")
-            
-        user_doc = users_collection.document(email).get()
-        if not user_doc.exists or user_doc.to_dict().get("role") != "admin":
-            raise HTTPException(status_code=403, detail="Admin privileges required")
 
-        docs = results_collection.get()
-        out = []
-        for doc in docs:
-            data = doc.to_dict()
-            ts = data.get('timestamp')
-            if hasattr(ts, 'isoformat'):
-                data['timestamp'] = ts.isoformat()
-            out.append({"id": doc.id, **data})
+        stats = await async_store.user_stats.run(user_stats_store.get, email)
+        return {"user_id": email, **(stats or UserStats()).summary()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get result summary: {str(e)}")
+
+@router.post("/user-stats/backfill")
+async def backfill_user_stats(admin_email: str = Depends(require_admin)):
+    return user_stats_store.start_backfill()
+
+@router.get("/user-stats/backfill")
+async def user_stats_backfill_status(admin_email: str = Depends(require_admin)):
+    status = user_stats_store.backfill_status()
+    if status is None:
+        raise HTTPException(status_code=404, detail="No backfill has run")
+    return status
+
+@router.get("/all")
+async def get_all_results(limit: Optional[int] = None, start_after: Optional[str] = None,
+                    fields: Optional[str] = None, stream: bool = False,
+                    admin_email: str = Depends(require_admin)):
+    try:
+        if results_collection is None:
+            raise HTTPException(status_code=500, detail="Database not initialized")
             
-        return out
+        return await async_store.results.run(
+            document_listing, results_collection, limit, start_after, fields, stream
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get results: {str(e)}")
\ No newline at end of file
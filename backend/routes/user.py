@@ -1,55 +1,38 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi import Body
 from backend.db.firebase_config import users_collection
+from backend.db import async_store
+from backend.auth import password_hasher, issue_token, SESSION_TOKEN_TTL_SECONDS
+from backend.dependencies import require_admin, role_cache
 from backend.models.user import User
-import hashlib
-import secrets
 
 router = APIRouter()
 
-def _hash_password(password: str) -> str:
-    salt = secrets.token_bytes(16)
-    dk = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 200_000)
-    return f"{salt.hex()}${dk.hex()}"
-
-def _check_password(password: str, hashed: str) -> bool:
-    try:
-        parts = hashed.split('$')
-        if len(parts) != 2:
-            return False
-        salt_hex, hash_hex = parts
-        salt = bytes.fromhex(salt_hex)
-        expected = bytes.fromhex(hash_hex)
-        dk = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 200_000)
-        return secrets.compare_digest(dk, expected)
-    except Exception:
-        return False
-
 @router.post("/register")
-def register_user(user: User = Body(...)):
+async def register_user(user: User = Body(...)):
     try:
         if users_collection is None:
             raise HTTPException(status_code=500, detail="Database not initialized")
             
-        user_doc = users_collection.document(user.email)
-        if user_doc.get().exists:
+        if await async_store.users.get(user.email) is not None:
             raise HTTPException(status_code=400, detail="User already exists")
             
         data = user.dict()
         pwd = data.pop('password', None)
         if pwd:
-            data['password_hash'] = _hash_password(pwd)
+            data['password_hash'] = await password_hasher.hash(pwd)
 
-        user_doc.set(data)
+        await async_store.users.set(user.email, data)
+        role_cache.invalidate(user.email)
         safe = {k: v for k, v in data.items() if k != 'password_hash'}
-        return {"id": user_doc.id, **safe}
+        return {"id": user.email, **safe}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 @router.post('/login')
-def login(payload: dict = Body(...)):
+async def login(payload: dict = Body(...)):
     try:
         if users_collection is None:
             raise HTTPException(status_code=500, detail="Database not initialized")
@@ -59,33 +42,40 @@ def login(payload: dict = Body(...)):
         if not email or not password:
             raise HTTPException(status_code=400, detail='email and password required')
             
-        user_doc = users_collection.document(email).get()
-        if not user_doc.exists:
+        data = await async_store.users.get(email)
+        if data is None:
             raise HTTPException(status_code=401, detail='Invalid credentials')
             
-        data = user_doc.to_dict()
         hashed = data.get('password_hash')
-        if not hashed or not _check_password(password, hashed):
+        if not hashed or not await password_hasher.verify(password, hashed):
             raise HTTPException(status_code=401, detail='Invalid credentials')
             
         safe = {k: v for k, v in data.items() if k != 'password_hash'}
-        return {"id": user_doc.id, **safe}
+        token = issue_token(email, data.get('role', 'student'))
+        return {"id": email, **safe, "token": token, "token_expires_in": SESSION_TOKEN_TTL_SECONDS}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
 
+@router.get("/role-cache/stats")
+async def role_cache_stats(admin_email: str = Depends(require_admin)):
+    return role_cache.stats()
+
+@router.get("/password-hasher/stats")
+async def password_hasher_stats(admin_email: str = Depends(require_admin)):
+    return password_hasher.stats()
+
 @router.get("/{email}")
-def get_user(email: str):
+async def get_user(email: str):
     try:
         if users_collection is None:
             raise HTTPException(status_code=500, detail="Database not initialized")
             
-        user_doc = users_collection.document(email).get()
-        if not user_doc.exists:
+        data = await async_store.users.get(email)
+        if data is None:
             raise HTTPException(status_code=404, detail="User not found")
             
-        data = user_doc.to_dict()
         data.pop('password_hash', None)
         return data
     except HTTPException:
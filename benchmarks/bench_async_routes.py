@@ -0,0 +1,103 @@
+"""Requests/second for sync vs async route handlers under many concurrent takers.
+
+Both apps serve GET /api/users/{email} against the same stand-in collection
+that sleeps for --latency-ms per read, approximating a Firestore round trip.
+"before" is the previous plain ``def`` handler, which Starlette runs on its
+shared threadpool; "after" mounts the real users router, whose handlers are
+``async def`` and offload reads through backend.db.async_store.
+
+    python -m benchmarks.bench_async_routes --concurrency 500 --requests 4
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+
+class _Snapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _Document:
+    def __init__(self, collection, doc_id):
+        self.collection = collection
+        self.id = doc_id
+
+    def get(self):
+        time.sleep(self.collection.latency)
+        return _Snapshot(self.id, self.collection.docs.get(self.id))
+
+
+class LatencyCollection:
+    def __init__(self, latency, docs):
+        self.latency = latency
+        self.docs = docs
+
+    def document(self, doc_id):
+        return _Document(self, doc_id)
+
+
+def build_before_app(collection):
+    app = FastAPI()
+
+    @app.get("/api/users/{email}")
+    def get_user(email: str):
+        user_doc = collection.document(email).get()
+        if not user_doc.exists:
+            raise HTTPException(status_code=404, detail="User not found")
+        return user_doc.to_dict()
+
+    return app
+
+
+def build_after_app(collection):
+    from backend.db import firebase_config
+    from backend.routes import user
+
+    firebase_config.users_collection = collection
+    user.users_collection = collection
+    app = FastAPI()
+    app.include_router(user.router, prefix="/api/users")
+    return app
+
+
+async def drive(app, concurrency, requests_per_taker, user_count):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def taker(index):
+            for _ in range(requests_per_taker):
+                response = await client.get(f"/api/users/user{index % user_count}@example.com")
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(taker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return concurrency * requests_per_taker / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=4, help="requests per taker")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    user_count = 100
+    docs = {f"user{i}@example.com": {"name": f"User {i}", "role": "student"} for i in range(user_count)}
+    collection = LatencyCollection(args.latency_ms / 1000, docs)
+
+    for label, app in (("before", build_before_app(collection)), ("after", build_after_app(collection))):
+        rps, elapsed = asyncio.run(drive(app, args.concurrency, args.requests, user_count))
+        print(f"{label:>6}: {rps:8.1f} req/s ({elapsed:.2f}s for {args.concurrency * args.requests} requests)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Latency and throughput of the quiz loop, plus hot-path micro-benchmarks.
+
+Every simulated taker runs one full quiz against the real app, in-process,
+over the in-memory datastore: /start, then /submit-answer and /next-question
+until the session ends. The final /next-question call, which finishes the
+session through end_quiz_session, is reported as "end-quiz". With
+--combined each answer is one /submit-and-next call instead. Per-endpoint
+p50/p95/p99 latency and throughput are printed, followed by per-call timings
+for get_question_by_difficulty, grade_answer, predict_difficulty and the
+adaptive engine's item selection.
+
+    python -m benchmarks.bench_quiz_flow --takers 200 --concurrency 50 --questions 10000
+    python -m benchmarks.bench_quiz_flow --combined
+    python -m benchmarks.bench_quiz_flow --save-baseline benchmarks/baseline_quiz_flow.json
+    python -m benchmarks.bench_quiz_flow --compare benchmarks/baseline_quiz_flow.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import timeit
+
+os.environ.setdefault("DATASTORE_BACKEND", "memory")
+os.environ.setdefault("RESULT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "nexus_quiz_bench_spool"))
+os.environ.setdefault("ADAPTIVE_STATE_PATH", os.path.join(tempfile.gettempdir(), "nexus_quiz_bench_adaptive.npz"))
+os.environ.setdefault("ANSWER_LOG_DIR", os.path.join(tempfile.gettempdir(), "nexus_quiz_bench_answer_log"))
+os.environ.setdefault("MODEL_REGISTRY_DIR", os.path.join(tempfile.gettempdir(), "nexus_quiz_bench_model_registry"))
+os.environ.setdefault("DIFFICULTY_STATS_PATH", os.path.join(tempfile.gettempdir(), "nexus_quiz_bench_stats.json"))
+# Keep model retraining out of the measured window.
+os.environ.setdefault("RETRAIN_EVERY_N_RESULTS", "1000000000")
+os.environ.setdefault("RETRAIN_MAX_DELAY_SECONDS", "1000000000")
+
+import httpx
+import numpy as np
+
+from backend.db import firebase_config
+from backend.main import app, start_background_services, stop_background_services
+from backend.routes import quiz
+from benchmarks.seed_datastore import synthetic_questions, write_batches
+from quiz_engine.grader import grade_answer
+
+PERCENTILES = (50, 95, 99)
+
+
+def summarize(samples, elapsed):
+    latencies = np.asarray(samples) * 1000
+    summary = {f"p{p}_ms": round(float(np.percentile(latencies, p)), 3) for p in PERCENTILES}
+    summary["requests"] = len(samples)
+    summary["throughput_rps"] = round(len(samples) / elapsed, 1)
+    return summary
+
+
+async def run_quiz(client, rng, latencies, combined=False):
+    async def call(endpoint, path, body):
+        started = time.perf_counter()
+        response = await client.post(path, json=body)
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        data = response.json()
+        if endpoint == "next-question" and data.get("session_completed"):
+            endpoint = "end-quiz"
+        if endpoint == "submit-and-next" and data["next"].get("session_completed"):
+            endpoint = "end-quiz"
+        latencies.setdefault(endpoint, []).append(elapsed)
+        return data
+
+    state = await call("start", "/api/quiz/start", {
+        "user_id": f"user{rng.randrange(10_000)}@example.com",
+        "previous_score": rng.randint(0, 100),
+        "questions": [],
+    })
+    session_id = state["session_id"]
+    while "question" in state:
+        question = state["question"]
+        answer = question["correct_answer"] if rng.random() < 0.6 else "wrong"
+        if combined:
+            graded = await call("submit-and-next", "/api/quiz/submit-and-next", {
+                "session_id": session_id,
+                "question_id": question["id"],
+                "user_answer": answer,
+            })
+            state = graded["next"]
+            continue
+        graded = await call("submit-answer", "/api/quiz/submit-answer", {
+            "session_id": session_id,
+            "question_id": question["id"],
+            "user_answer": answer,
+        })
+        state = await call("next-question", "/api/quiz/next-question", {
+            "session_id": session_id,
+            "previous_score": graded["score"],
+        })
+
+
+async def load_test(takers, concurrency, seed, combined=False):
+    latencies = {}
+    rng = random.Random(seed)
+    limit = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def taker():
+            async with limit:
+                await run_quiz(client, rng, latencies, combined)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(taker() for _ in range(takers)))
+        elapsed = time.perf_counter() - started
+    return {endpoint: summarize(samples, elapsed) for endpoint, samples in latencies.items()}
+
+
+def micro_benchmarks(repeat):
+    rng = random.Random(0)
+    exclude = [f"q{rng.randrange(1000):08d}" for _ in range(9)]
+    scores = [rng.uniform(0, 100) for _ in range(1000)]
+    cases = {
+        "get_question_by_difficulty": lambda: quiz.get_question_by_difficulty("medium", exclude),
+        "grade_answer": lambda: grade_answer(" Paris ", "paris"),
+        "predict_difficulty": lambda: quiz.difficulty_model.predict_difficulty(scores[rng.randrange(1000)]),
+        "adaptive_select": lambda: quiz.adaptive_engine.select(rng.uniform(-2, 2), exclude),
+    }
+    results = {}
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=repeat, repeat=5))
+        results[name] = {"us_per_call": round(best / repeat * 1e6, 3)}
+    return results
+
+
+def compare(current, baseline):
+    print("\nvs baseline:")
+    if current["config"] != baseline.get("config"):
+        print(f"  note: baseline was recorded with {baseline.get('config')}")
+    for section in ("endpoints", "micro"):
+        for name, metrics in current[section].items():
+            before = baseline.get(section, {}).get(name)
+            if before is None:
+                continue
+            for key, value in metrics.items():
+                if key == "requests" or not before.get(key):
+                    continue
+                change = (value - before[key]) / before[key] * 100
+                print(f"  {name:>27} {key:>15}: {before[key]:>10} -> {value:>10} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--takers", type=int, default=200, help="quizzes to run")
+    parser.add_argument("--concurrency", type=int, default=50, help="quizzes in flight at once")
+    parser.add_argument("--questions", type=int, default=10_000, help="question bank size")
+    parser.add_argument("--micro-repeat", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--combined", action="store_true", help="answer through /submit-and-next")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    args = parser.parse_args()
+
+    if firebase_config.DATASTORE_BACKEND == "firestore":
+        raise SystemExit("Run against DATASTORE_BACKEND=memory or sqlite, not production Firestore")
+    db = firebase_config.db
+    if not any(True for _ in firebase_config.questions_collection.limit(1).stream()):
+        write_batches(db, firebase_config.questions_collection, synthetic_questions(args.questions, random.Random(args.seed)))
+
+    start_background_services()
+    try:
+        endpoints = asyncio.run(load_test(args.takers, args.concurrency, args.seed, args.combined))
+        micro = micro_benchmarks(args.micro_repeat)
+    finally:
+        stop_background_services()
+
+    report = {
+        "config": {
+            "takers": args.takers,
+            "concurrency": args.concurrency,
+            "questions": args.questions,
+            "datastore": firebase_config.DATASTORE_BACKEND,
+            "combined": args.combined,
+        },
+        "endpoints": endpoints,
+        "micro": micro,
+    }
+
+    for endpoint, summary in endpoints.items():
+        print(f"{endpoint:>14}: " + "  ".join(f"{key}={value}" for key, value in summary.items()))
+    for name, summary in micro.items():
+        print(f"{name:>27}: {summary['us_per_call']} us/call")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.save_baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Cold-start cost of the API process.
+
+Each run starts a fresh interpreter so nothing is warm: "import" times
+``import backend.main`` on its own; the server runs then launch uvicorn over
+a seeded SQLite datastore and record, from process spawn, when /health first
+answers (liveness) and when /ready first returns 200 (question bank, model
+and adaptive state loaded), followed by the latency of the first
+/api/quiz/start. Medians over --runs are printed.
+
+    python -m benchmarks.bench_startup --runs 5 --questions 10000
+    python -m benchmarks.bench_startup --save-baseline benchmarks/baseline_startup.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+# This process only seeds the datastore; keep it off Firestore.
+os.environ.setdefault("DATASTORE_BACKEND", "memory")
+
+from backend.db.local_store import create_local_client
+from benchmarks.seed_datastore import synthetic_questions, write_batches
+
+POLL_INTERVAL_SECONDS = 0.01
+
+
+def bench_env(sqlite_path, workdir):
+    env = dict(os.environ)
+    env.update({
+        "DATASTORE_BACKEND": "sqlite",
+        "DATASTORE_SQLITE_PATH": sqlite_path,
+        "RESULT_SPOOL_DIR": os.path.join(workdir, "spool"),
+        "ANSWER_LOG_DIR": os.path.join(workdir, "answer_log"),
+        "ADAPTIVE_STATE_PATH": os.path.join(workdir, "adaptive.npz"),
+        "METRICS_ENABLED": "0",
+    })
+    return env
+
+
+def time_import(env):
+    code = "import time; t = time.perf_counter(); import backend.main; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(client, path, started, timeout):
+    while time.perf_counter() - started < timeout:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(POLL_INTERVAL_SECONDS)
+    raise TimeoutError(f"{path} not ready after {timeout}s")
+
+
+def time_server(env, timeout):
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            health = wait_for(client, "/health", started, timeout)
+            ready = wait_for(client, "/ready", started, timeout)
+            request_started = time.perf_counter()
+            client.post("/api/quiz/start", json={"user_id": "bench@example.com", "previous_score": 50}).raise_for_status()
+            first_request = time.perf_counter() - request_started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {"health_s": health, "ready_s": ready, "first_request_s": first_request}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=10_000, help="question bank size")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for the server")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        sqlite_path = os.path.join(workdir, "bench.db")
+        db = create_local_client("sqlite", sqlite_path)
+        write_batches(db, db.collection("questions"), synthetic_questions(args.questions, random.Random(0)))
+        env = bench_env(sqlite_path, workdir)
+
+        imports = [time_import(env) for _ in range(args.runs)]
+        servers = [time_server(env, args.timeout) for _ in range(args.runs)]
+
+    report = {
+        "config": {"runs": args.runs, "questions": args.questions},
+        "import_s": round(statistics.median(imports), 3),
+    }
+    for key in servers[0]:
+        report[key] = round(statistics.median(run[key] for run in servers), 3)
+
+    for key, value in report.items():
+        if key != "config":
+            print(f"{key:>16}: {value}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.save_baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Fill a local datastore with synthetic questions, users and results.
+
+Point DATASTORE_BACKEND/DATASTORE_SQLITE_PATH at the same file the API will
+use, e.g. to reproduce production volumes offline:
+
+    DATASTORE_BACKEND=sqlite DATASTORE_SQLITE_PATH=bench.db \\
+        python -m benchmarks.seed_datastore --questions 100000 --results 10000000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from backend.db import firebase_config
+from backend.db.question_import import content_hash
+
+DIFFICULTIES = ("easy", "medium", "hard")
+BATCH_SIZE = 500
+
+
+def write_batches(db, collection, documents):
+    written = 0
+    batch = db.batch()
+    pending = 0
+    for doc_id, data in documents:
+        batch.set(collection.document(doc_id), data)
+        pending += 1
+        if pending == BATCH_SIZE:
+            batch.commit()
+            written += pending
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+        written += pending
+    return written
+
+
+def synthetic_questions(count, rng):
+    for i in range(count):
+        text = f"Synthetic question {i}?"
+        options = [f"Option {i}-{k}" for k in range(4)]
+        yield f"q{i:08d}", {
+            "question_text": text,
+            "options": options,
+            "correct_answer": options[rng.randrange(4)],
+            "difficulty": DIFFICULTIES[i % 3],
+            "category": "Synthetic",
+            "content_hash": content_hash(text),
+        }
+
+
+def synthetic_users(count):
+    for i in range(count):
+        email = f"user{i}@example.com"
+        yield email, {"name": f"User {i}", "email": email, "role": "student"}
+
+
+def synthetic_results(count, user_count, rng):
+    started = datetime.utcnow() - timedelta(days=365)
+    for i in range(count):
+        correct = rng.randint(0, 10)
+        difficulty = DIFFICULTIES[min(correct // 4, 2)]
+        yield f"r{i:010d}", {
+            "user_id": f"user{rng.randrange(user_count)}@example.com",
+            "total_score": correct * 10.0,
+            "questions_answered": 10,
+            "correct_answers": correct,
+            "final_difficulty": difficulty,
+            "next_difficulty": difficulty,
+            "timestamp": started + timedelta(seconds=i),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--results", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    db = firebase_config.db
+    if db is None or firebase_config.DATASTORE_BACKEND == "firestore":
+        raise SystemExit("Set DATASTORE_BACKEND=sqlite (or memory) to seed a local datastore")
+
+    rng = random.Random(args.seed)
+    for name, documents in (
+        ("questions", synthetic_questions(args.questions, rng)),
+        ("users", synthetic_users(args.users)),
+        ("results", synthetic_results(args.results, args.users, rng)),
+    ):
+        started = time.perf_counter()
+        written = write_batches(db, db.collection(name), documents)
+        print(f"{name:>9}: {written} documents in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,16 @@ let currentSession = null;
 let currentQuestion = null;
 let userAnswers = [];
 
+// Identity headers for API calls; the signed token from /login lets the
+// server authorize without looking the user up again.
+function authHeaders() {
+    const headers = { 'x-user-email': currentUser.email };
+    if (currentUser.token) {
+        headers['Authorization'] = `Bearer ${currentUser.token}`;
+    }
+    return headers;
+}
+
 // Authentication Functions
 async function loginUser(email, password) {
     try {
@@ -76,7 +86,7 @@ async function startNewQuiz() {
             method: 'POST',
             headers: { 
                 'Content-Type': 'application/json',
-                'x-user-email': currentUser.email 
+                ...authHeaders()
             },
             body: JSON.stringify({
                 user_id: currentUser.email,
@@ -153,12 +163,12 @@ async function submitAnswer() {
             user_answer: currentQuestion.userAnswer
         });
         
-        // Submit the answer to get grading
-        const gradeResponse = await fetch(`${API_BASE}/quiz/submit-answer`, {
+        // Grade the answer and fetch the next question in one request
+        const gradeResponse = await fetch(`${API_BASE}/quiz/submit-and-next`, {
             method: 'POST',
             headers: { 
                 'Content-Type': 'application/json',
-                'x-user-email': currentUser.email 
+                ...authHeaders()
             },
             body: JSON.stringify({
                 session_id: currentSession.id,
@@ -175,7 +185,7 @@ async function submitAnswer() {
         const gradeResult = await gradeResponse.json();
         
         // Show immediate feedback
-        showAnswerFeedback(gradeResult);
+        showAnswerFeedback(gradeResult, gradeResult.next.session_completed);
         
         // Update session stats immediately
         currentSession.questionsAnswered++;
@@ -183,23 +193,14 @@ async function submitAnswer() {
             currentSession.correctAnswers++;
         }
         
-        // Check if this was the last question
-        if (currentSession.questionsAnswered >= currentSession.totalQuestions) {
-            // Wait a moment then submit the complete quiz
-            setTimeout(async () => {
-                // Hide feedback modal
-                const feedbackModal = document.getElementById('feedbackModal');
-                if (feedbackModal) {
-                    feedbackModal.style.display = 'none';
-                }
-                await submitCompleteQuiz();
-            }, 2000);
-        } else {
-            // Wait a moment then get next question
-            setTimeout(async () => {
-                await getNextQuestion(gradeResult.score);
-            }, 2000);
-        }
+        // Wait a moment then show the next question or the final results
+        setTimeout(() => {
+            const feedbackModal = document.getElementById('feedbackModal');
+            if (feedbackModal) {
+                feedbackModal.style.display = 'none';
+            }
+            showNextStep(gradeResult.next);
+        }, 2000);
         
     } catch (error) {
         showNotification('Failed to submit answer: ' + error.message, 'error');
@@ -239,55 +240,19 @@ function showAnswerFeedback(gradeResult, isLastQuestion = false) {
     
     feedbackModal.style.display = 'flex';
 }
-async function getNextQuestion(previousScore) {
-    try {
-        showLoading(true);
-        
-        const response = await fetch(`${API_BASE}/quiz/next-question`, {
-            method: 'POST',
-            headers: { 
-                'Content-Type': 'application/json',
-                'x-user-email': currentUser.email 
-            },
-            body: JSON.stringify({
-                session_id: currentSession.id,
-                previous_score: previousScore
-            })
+function showNextStep(nextData) {
+    if (nextData.session_completed) {
+        showFinalResults({
+            ...nextData,
+            total_score: nextData.final_score,
+            difficulty: currentSession.currentDifficulty
         });
-        
-        if (!response.ok) {
-            const errorData = await response.json();
-            throw new Error(errorData.detail || 'Failed to get next question');
-        }
-        
-        const nextData = await response.json();
-        
-        // Hide feedback modal
-        const feedbackModal = document.getElementById('feedbackModal');
-        if (feedbackModal) {
-            feedbackModal.style.display = 'none';
-        }
-        
-        // Check if quiz is completed
-        if (nextData.session_completed) {
-            await submitCompleteQuiz();
-        } else {
-            // Update session and load next question
-            currentSession.questionsAnswered = nextData.questions_answered;
-            currentSession.correctAnswers = nextData.correct_answers;
-            currentSession.currentDifficulty = nextData.difficulty;
-            
-            loadQuestion(nextData.question);
-        }
-        
-    } catch (error) {
-        // If we can't get the next question, end the quiz
-        console.error('Error getting next question:', error);
-        showNotification('Quiz completed!', 'success');
-        await submitCompleteQuiz();
-    } finally {
-        showLoading(false);
+        return;
     }
+    currentSession.questionsAnswered = nextData.questions_answered;
+    currentSession.correctAnswers = nextData.correct_answers;
+    currentSession.currentDifficulty = nextData.difficulty;
+    loadQuestion(nextData.question);
 }
 
 // CORRECTED QUIZ COMPLETION FUNCTIONS
@@ -305,7 +270,7 @@ async function submitCompleteQuiz() {
             method: 'POST',
             headers: { 
                 'Content-Type': 'application/json',
-                'x-user-email': currentUser.email 
+                ...authHeaders()
             },
             body: JSON.stringify({
                 user_id: currentUser.email,
@@ -440,11 +405,11 @@ async function endQuizEarly() {
 // Dashboard Functions
 async function loadDashboard() {
     try {
-        // Load user results for dashboard stats
-        const response = await fetch(`${API_BASE}/results/user/${currentUser.email}`);
+        // Load the user's precomputed result summary for dashboard stats
+        const response = await fetch(`${API_BASE}/results/user/${currentUser.email}/summary`);
         if (response.ok) {
-            const results = await response.json();
-            updateDashboardStats(results);
+            const summary = await response.json();
+            updateDashboardStats(summary);
         }
         
         // Load user profile
@@ -459,8 +424,8 @@ async function loadDashboard() {
     }
 }
 
-function updateDashboardStats(results) {
-    if (results.length === 0) {
+function updateDashboardStats(summary) {
+    if (summary.attempts === 0) {
         // Set default values for new users
         document.getElementById('totalPoints').textContent = '0';
         document.getElementById('quizzesCompleted').textContent = '0';
@@ -473,21 +438,11 @@ function updateDashboardStats(results) {
         return;
     }
     
-    // Calculate stats
-    const totalPoints = results.reduce((sum, result) => sum + (result.total_score || 0), 0);
-    const quizzesCompleted = results.length;
-    const averageScore = results.reduce((sum, result) => sum + (result.total_score || 0), 0) / results.length;
-    
-    // Calculate streak (consecutive quizzes with score >= 70)
-    let currentStreak = 0;
-    const sortedResults = results.sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp));
-    for (let result of sortedResults) {
-        if (result.total_score >= 70) {
-            currentStreak++;
-        } else {
-            break;
-        }
-    }
+    const totalPoints = summary.total_points;
+    const quizzesCompleted = summary.attempts;
+    const averageScore = summary.mean_score;
+    // Consecutive quizzes with score >= 70, maintained server-side
+    const currentStreak = summary.current_streak;
     
     // Update dashboard
     document.getElementById('totalPoints').textContent = Math.round(totalPoints);
@@ -517,11 +472,22 @@ function getPreviousScore() {
 }
 
 // Admin Functions
+const QUESTION_SEARCH_PAGE_SIZE = 50;
+let questionSearchOffset = null;
+let questionSearchTimer = null;
+
 async function showQuestionManager() {
+    if (document.getElementById('questionSearch').value.trim()) {
+        return searchQuestions();
+    }
+    
     try {
         showLoading(true);
-        const response = await fetch(`${API_BASE}/questions/all`, {
-            headers: { 'x-user-email': currentUser.email }
+        // Without a query, list the bank (or one cached difficulty partition)
+        const difficulty = document.getElementById('questionDifficultyFilter').value;
+        const url = difficulty ? `${API_BASE}/questions/by-difficulty/${difficulty}` : `${API_BASE}/questions/all`;
+        const response = await fetch(url, {
+            headers: authHeaders()
         });
         
         if (!response.ok) {
@@ -530,6 +496,7 @@ async function showQuestionManager() {
         
         const questions = await response.json();
         displayQuestions(questions);
+        document.getElementById('loadMoreQuestions').style.display = 'none';
         
         // Show the question manager section
         document.getElementById('questionManager').style.display = 'block';
@@ -541,11 +508,52 @@ async function showQuestionManager() {
     }
 }
 
-function displayQuestions(questions) {
+function onQuestionSearchInput() {
+    // Wait for a pause in typing before querying the server
+    clearTimeout(questionSearchTimer);
+    questionSearchTimer = setTimeout(showQuestionManager, 250);
+}
+
+async function searchQuestions(append = false) {
+    const query = document.getElementById('questionSearch').value.trim();
+    const difficulty = document.getElementById('questionDifficultyFilter').value;
+    const params = new URLSearchParams({
+        q: query,
+        limit: QUESTION_SEARCH_PAGE_SIZE,
+        offset: append ? questionSearchOffset : 0
+    });
+    if (difficulty) params.set('difficulty', difficulty);
+    
+    try {
+        showLoading(true);
+        const response = await fetch(`${API_BASE}/questions/search?${params}`, {
+            headers: authHeaders()
+        });
+        
+        if (!response.ok) {
+            throw new Error('Search failed');
+        }
+        
+        const result = await response.json();
+        displayQuestions(result.items, append);
+        questionSearchOffset = result.next_offset;
+        document.getElementById('loadMoreQuestions').style.display = questionSearchOffset === null ? 'none' : 'block';
+        document.getElementById('questionManager').style.display = 'block';
+        
+    } catch (error) {
+        showNotification('Failed to search questions: ' + error.message, 'error');
+    } finally {
+        showLoading(false);
+    }
+}
+
+function displayQuestions(questions, append = false) {
     const container = document.getElementById('questionsList');
-    container.innerHTML = '';
+    if (!append) {
+        container.innerHTML = '';
+    }
     
-    if (questions.length === 0) {
+    if (questions.length === 0 && !append) {
         container.innerHTML = '<p class="no-questions">No questions found. Import some questions to get started.</p>';
         return;
     }
@@ -579,7 +587,7 @@ async function deleteQuestion(questionId) {
         showLoading(true);
         const response = await fetch(`${API_BASE}/questions/${questionId}`, {
             method: 'DELETE',
-            headers: { 'x-user-email': currentUser.email }
+            headers: authHeaders()
         });
         
         if (!response.ok) {
@@ -603,7 +611,7 @@ async function importFromAPI() {
         showLoading(true);
         const response = await fetch(`${API_BASE}/questions/import-from-api`, {
             method: 'POST',
-            headers: { 'x-user-email': currentUser.email }
+            headers: authHeaders()
         });
         
         if (!response.ok) {
@@ -628,15 +636,17 @@ async function importFromAPI() {
 async function showSystemStats() {
     try {
         showLoading(true);
-        const response = await fetch(`${API_BASE}/results/all`, {
-            headers: { 'x-user-email': currentUser.email }
+        // Stream only the columns the stats need instead of the full history
+        const response = await fetch(`${API_BASE}/results/all?stream=true&fields=user_id,total_score`, {
+            headers: authHeaders()
         });
         
         if (!response.ok) {
             throw new Error('Failed to load system statistics');
         }
         
-        const allResults = await response.json();
+        const body = await response.text();
+        const allResults = body.split('\n').filter(line => line).map(line => JSON.parse(line));
         displaySystemStats(allResults);
         
     } catch (error) {
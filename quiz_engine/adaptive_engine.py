@@ -0,0 +1,250 @@
+"""Elo-style 1PL IRT engine: per-item difficulty, per-user ability.
+
+Both parameters live on the same logit scale. The probability that a user
+of ability ``theta`` answers an item of difficulty ``b`` correctly is
+``sigmoid(theta - b)``. After each response both move towards the
+observation by a step that shrinks as they accumulate evidence. The most
+informative next item under 1PL is the one whose difficulty is closest to
+the user's ability, so selection is one vectorised distance scan over the
+array-backed item bank.
+
+Estimates live in each worker process and move independently. Saving
+merges into the shared state file rather than replacing it: for every item
+and user the estimate backed by more responses wins, so workers do not
+erase what the others learned, though their concurrent updates to the same
+item are not combined.
+"""
+import fcntl
+import math
+import os
+import threading
+import numpy as np
+
+ADAPTIVE_STATE_PATH = os.environ.get(
+    "ADAPTIVE_STATE_PATH", os.path.join(os.path.dirname(__file__), "adaptive_state.npz"))
+ELO_USER_K = float(os.environ.get("ELO_USER_K", "0.6"))
+ELO_ITEM_K = float(os.environ.get("ELO_ITEM_K", "0.4"))
+ELO_K_DECAY = float(os.environ.get("ELO_K_DECAY", "0.05"))
+ELO_USER_K_MIN = 0.1
+ELO_ITEM_K_MIN = 0.02
+
+# Priors for items that have no responses yet, and the inverse mapping used
+# to report a label for a session's current ability.
+LABEL_DIFFICULTY = {"easy": -1.0, "medium": 0.0, "hard": 1.0}
+_LABEL_CUTOFFS = (-0.5, 0.5)
+# Noise drawn afresh for every selection, so users at the same ability do not
+# all get the same item among equally informative ones. Only items within
+# _JITTER of the nearest can win the draw, so only they (at most
+# _JITTER_CANDIDATES of them, picked at random) get noise.
+_JITTER = 0.05
+_JITTER_CANDIDATES = 32
+
+
+def ability_label(theta: float) -> str:
+    if theta < _LABEL_CUTOFFS[0]:
+        return "easy"
+    if theta > _LABEL_CUTOFFS[1]:
+        return "hard"
+    return "medium"
+
+
+def _step(k, min_k, responses):
+    return max(min_k, k / (1.0 + ELO_K_DECAY * responses))
+
+
+class ItemBank:
+    """Question ids with difficulty and response counts in parallel arrays.
+
+    Rows are never reused, so an id keeps its learned difficulty if it is
+    removed and later re-added. ``penalty`` is added to every distance during
+    selection: zero while active, infinity once removed.
+    """
+
+    def __init__(self, capacity=1024):
+        self.ids = []
+        self.rows = {}
+        self.difficulty = np.zeros(capacity)
+        self.responses = np.zeros(capacity, dtype=np.int64)
+        self.penalty = np.full(capacity, np.inf)
+        # Reused distance buffer, so selection allocates nothing per item.
+        self._distance = np.empty(capacity)
+        self._rng = np.random.default_rng()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _grow(self):
+        capacity = len(self.difficulty) * 2
+        for name in ("difficulty", "responses", "penalty"):
+            current = getattr(self, name)
+            grown = np.full(capacity, np.inf) if name == "penalty" else np.zeros(capacity, dtype=current.dtype)
+            grown[: len(current)] = current
+            setattr(self, name, grown)
+
+    def add(self, item_id, difficulty, responses=0, active=True):
+        row = self.rows.get(item_id)
+        if row is None:
+            if len(self.ids) == len(self.difficulty):
+                self._grow()
+            row = len(self.ids)
+            self.ids.append(item_id)
+            self.rows[item_id] = row
+            self.difficulty[row] = difficulty
+            self.responses[row] = responses
+        self.penalty[row] = 0.0 if active else np.inf
+        return row
+
+    def deactivate(self, item_id):
+        row = self.rows.get(item_id)
+        if row is not None:
+            self.penalty[row] = np.inf
+
+    def closest(self, theta, exclude_rows):
+        """Row of the active item whose difficulty is nearest ``theta``, or None."""
+        count = len(self.ids)
+        if count == 0:
+            return None
+        if len(self._distance) < count:
+            self._distance = np.empty(len(self.difficulty))
+        distance = self._distance[:count]
+        np.subtract(self.difficulty[:count], theta, out=distance)
+        np.abs(distance, out=distance)
+        distance += self.penalty[:count]
+        if exclude_rows:
+            distance[exclude_rows] = np.inf
+        nearest = distance.min()
+        if not math.isfinite(nearest):
+            return None
+        candidates = np.flatnonzero(distance <= nearest + _JITTER)
+        if len(candidates) > _JITTER_CANDIDATES:
+            candidates = candidates[self._rng.integers(0, len(candidates), _JITTER_CANDIDATES)]
+        jittered = distance[candidates] + self._rng.uniform(0, _JITTER, len(candidates))
+        return int(candidates[np.argmin(jittered)])
+
+
+class AdaptiveEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.items = ItemBank()
+        # user_id -> [ability, responses]
+        self.users = {}
+
+    def sync_items(self, upserted=None, removed=()):
+        """Mirror question-bank changes; known items keep their learned difficulty."""
+        with self._lock:
+            for item_id, data in (upserted or {}).items():
+                prior = data.get("irt_difficulty", LABEL_DIFFICULTY.get(data.get("difficulty"), 0.0))
+                self.items.add(item_id, prior)
+            for item_id in removed:
+                self.items.deactivate(item_id)
+
+    def ability(self, user_id, default=0.0):
+        with self._lock:
+            state = self.users.get(user_id)
+            return state[0] if state is not None else default
+
+    def record(self, user_id, item_id, correct, theta=None):
+        """Fold one graded response into both estimates; returns the new ability.
+
+        ``theta`` seeds users the engine has not seen yet, e.g. from the
+        label-based prior at quiz start.
+        """
+        with self._lock:
+            state = self.users.get(user_id)
+            if state is None:
+                state = self.users[user_id] = [0.0 if theta is None else theta, 0]
+            row = self.items.rows.get(item_id)
+            if row is None:
+                return state[0]
+
+            b = self.items.difficulty[row]
+            surprise = (1.0 if correct else 0.0) - 1.0 / (1.0 + math.exp(b - state[0]))
+            state[0] += _step(ELO_USER_K, ELO_USER_K_MIN, state[1]) * surprise
+            state[1] += 1
+            self.items.difficulty[row] = b - _step(ELO_ITEM_K, ELO_ITEM_K_MIN, self.items.responses[row]) * surprise
+            self.items.responses[row] += 1
+            return state[0]
+
+    def select(self, theta, exclude_ids=()):
+        """Id of the unseen item carrying the most information at ``theta``."""
+        with self._lock:
+            rows = self.items.rows
+            exclude_rows = [rows[item_id] for item_id in exclude_ids if item_id in rows]
+            row = self.items.closest(theta, exclude_rows)
+            return self.items.ids[row] if row is not None else None
+
+    def item_difficulty(self, item_id):
+        with self._lock:
+            row = self.items.rows.get(item_id)
+            return float(self.items.difficulty[row]) if row is not None else None
+
+    def save(self, path):
+        with self._lock:
+            items = {item_id: (float(self.items.difficulty[row]), int(self.items.responses[row]))
+                     for item_id, row in self.items.rows.items()}
+            users = {user_id: (state[0], state[1]) for user_id, state in self.users.items()}
+        # Workers save the same file (e.g. all on shutdown): the lock
+        # serialises their read-merge-replace cycles, and each writes its own
+        # temporary file so only whole files are renamed in.
+        with open(f"{path}.lock", "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                saved_items, saved_users = _read_state(path)
+            except Exception as e:
+                print(f"Ignoring unreadable adaptive engine state: {e}")
+                saved_items, saved_users = {}, {}
+            items = _merge(saved_items, items)
+            users = _merge(saved_users, users)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    item_ids=np.array(list(items), dtype=str),
+                    item_difficulty=np.array([value for value, _ in items.values()]),
+                    item_responses=np.array([n for _, n in items.values()], dtype=np.int64),
+                    user_ids=np.array(list(users), dtype=str),
+                    user_ability=np.array([value for value, _ in users.values()]),
+                    user_responses=np.array([n for _, n in users.values()], dtype=np.int64),
+                )
+            os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Restore learned parameters; restored items stay inactive until synced.
+
+        Items and users the engine already tracks (synced or answered before
+        the state was loaded) are left as they are.
+        """
+        try:
+            items, users = _read_state(path)
+        except Exception as e:
+            print(f"Error loading adaptive engine state: {e}")
+            return
+        with self._lock:
+            for item_id, (b, n) in items.items():
+                if item_id not in self.items.rows:
+                    self.items.add(item_id, b, n, active=False)
+            for user_id, (theta, n) in users.items():
+                self.users.setdefault(user_id, [theta, n])
+
+
+def _read_state(path):
+    """``({item_id: (difficulty, responses)}, {user_id: (ability, responses)})``."""
+    if not os.path.exists(path):
+        return {}, {}
+    with np.load(path) as state:
+        items = {str(item_id): (float(b), int(n)) for item_id, b, n
+                 in zip(state["item_ids"], state["item_difficulty"], state["item_responses"])}
+        users = {str(user_id): (float(theta), int(n)) for user_id, theta, n
+                 in zip(state["user_ids"], state["user_ability"], state["user_responses"])}
+    return items, users
+
+
+def _merge(saved, current):
+    """Union of two ``{id: (estimate, responses)}`` maps, keeping for each id
+    the estimate backed by more responses (ours on a tie)."""
+    merged = dict(saved)
+    for key, value in current.items():
+        previous = merged.get(key)
+        if previous is None or value[1] >= previous[1]:
+            merged[key] = value
+    return merged
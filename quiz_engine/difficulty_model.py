@@ -1,45 +1,249 @@
-import pickle
+import json
+import threading
+from bisect import bisect_right
 import numpy as np
-from sklearn.linear_model import LogisticRegression
+from collections import Counter
+from datetime import datetime, timedelta
 import os
+from quiz_engine.model_registry import ModelRegistry
+
+STATS_PATH = os.environ.get(
+    "DIFFICULTY_STATS_PATH", os.path.join(os.path.dirname(__file__), "difficulty_model_stats.json"))
+DIFFICULTY_LABELS = ["easy", "medium", "hard"]
+# Incremental runs re-read results committed this long before the watermark
+# and skip ids already counted, absorbing clock skew between workers and
+# batches whose commit straddled the previous run.
+RETRAIN_WATERMARK_OVERLAP_SECONDS = float(os.environ.get("RETRAIN_WATERMARK_OVERLAP_SECONDS", "600"))
+# Result field the watermark tracks; set by the result writer at commit.
+_WATERMARK_FIELD = "committed_at"
+
+
+def score_label(score: float) -> int:
+    return 0 if score < 40 else 1 if score < 70 else 2
+
+
+def compile_lookup_table(model):
+    """Reduce a fitted one-feature LogisticRegression to (thresholds, labels).
+
+    The predicted class is the argmax of one linear function of the score per
+    class, so it is piecewise constant. ``labels[bisect_right(thresholds, x)]``
+    reproduces ``model.predict([[x]])`` for every score x.
+    """
+    coef = model.coef_[:, 0]
+    intercept = model.intercept_
+    if len(coef) == 1:
+        # Binary models expose a single decision function: class 1 iff a*x + b > 0.
+        coef = np.array([0.0, coef[0]])
+        intercept = np.array([0.0, intercept[0]])
+
+    breakpoints = set()
+    for i in range(len(coef)):
+        for j in range(i + 1, len(coef)):
+            if coef[i] != coef[j]:
+                breakpoints.add(float((intercept[j] - intercept[i]) / (coef[i] - coef[j])))
+    breakpoints = sorted(breakpoints)
+
+    def label_at(x):
+        return DIFFICULTY_LABELS[int(model.classes_[int(np.argmax(coef * x + intercept))])]
+
+    if breakpoints:
+        probes = [breakpoints[0] - 1.0]
+        probes += [(a + b) / 2 for a, b in zip(breakpoints, breakpoints[1:])]
+        probes.append(breakpoints[-1] + 1.0)
+    else:
+        probes = [0.0]
+
+    thresholds, labels = [], [label_at(probes[0])]
+    for breakpoint, probe in zip(breakpoints, probes[1:]):
+        label = label_at(probe)
+        if label != labels[-1]:
+            thresholds.append(breakpoint)
+            labels.append(label)
+    return thresholds, labels
+
+
+def _logistic_regression():
+    # scikit-learn takes most of a second to import; only training needs it.
+    from sklearn.linear_model import LogisticRegression
+    return LogisticRegression()
+
+
+def model_artifact(model, samples=None) -> dict:
+    """Registry artifact for a fitted estimator: its parameters and lookup table."""
+    thresholds, labels = compile_lookup_table(model)
+    return {
+        "classes": [int(c) for c in model.classes_],
+        "coef": model.coef_.tolist(),
+        "intercept": model.intercept_.tolist(),
+        "thresholds": thresholds,
+        "labels": labels,
+        "samples": samples,
+    }
+
 
 class DifficultyModel:
-    def __init__(self):
-        model_path = os.path.join(os.path.dirname(__file__), "difficulty_model.pkl")
+    """Score-to-difficulty classifier served from the model registry.
+
+    Nothing is read at construction: ``load`` (or the first prediction)
+    applies the registry's live artifact. Training publishes a new version,
+    served at once unless a rollback pinned another; other workers pick it
+    up through ``apply_artifact``.
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry or ModelRegistry()
+        self._load_lock = threading.Lock()
+        self.lookup = None
+        self.version = None
+
+        # Sufficient statistics for training: the only feature is the score and
+        # the label is a function of it, so a histogram of scores reproduces
+        # the full training set as weighted samples.
+        self.score_counts = Counter()
+        self.watermark = None
+        # Ids of counted results committed within the overlap window before
+        # the watermark, so re-reading that window does not count them twice.
+        self.recent_ids = {}
+
+    @property
+    def loaded(self):
+        return self.lookup is not None
+
+    def load(self):
+        with self._load_lock:
+            if self.lookup is not None:
+                return
+            self.load_stats()
+            artifact = self.registry.load()
+            if artifact is None:
+                # Empty registry: fit whatever history we have, else the
+                # minimal initial model, and publish it as the first version.
+                counts = self.score_counts or Counter({0.0: 1, 50.0: 1, 80.0: 1})
+                self.fit_from_counts(counts)
+                return
+            self.apply_artifact(artifact)
+
+    def apply_artifact(self, artifact):
+        # One assignment, so concurrent predictions see the old or the new
+        # table, never a mix.
+        self.lookup = (artifact["thresholds"], artifact["labels"])
+        self.version = artifact["version"]
+
+    def rollback(self, version=None):
+        version = self.registry.rollback(version)
+        self.apply_artifact(self.registry.load(version))
+        return version
+
+    def load_stats(self):
         try:
-            with open(model_path, "rb") as f:
-                self.model = pickle.load(f)
+            with open(STATS_PATH, "r") as f:
+                stats = json.load(f)
+            self.score_counts = Counter({float(score): count for score, count in stats["score_counts"]})
+            watermark = stats.get("watermark")
+            # Watermarks on any other field (older stats files) cannot be
+            # compared with commit times; the next run rebuilds instead.
+            if watermark and stats.get("watermark_field") == _WATERMARK_FIELD:
+                self.watermark = datetime.fromisoformat(watermark)
+                self.recent_ids = {doc_id: datetime.fromisoformat(ts) for doc_id, ts in stats.get("recent_ids", [])}
         except FileNotFoundError:
-            self.model = LogisticRegression()
-            # Minimal initial fit
-            X_init = np.array([[0], [50], [80]])
-            y_init = np.array([0, 1, 2])
-            self.model.fit(X_init, y_init)
-            self.save_model()
-
-    def save_model(self):
-        model_path = os.path.join(os.path.dirname(__file__), "difficulty_model.pkl")
-        with open(model_path, "wb") as f:
-            pickle.dump(self.model, f)
+            pass
+        except Exception as e:
+            # Unreadable statistics force the next training run to rebuild.
+            print(f"Ignoring difficulty model stats: {e}")
+            self.score_counts = Counter()
+            self.watermark = None
+            self.recent_ids = {}
+
+    def save_stats(self):
+        stats = {
+            "watermark_field": _WATERMARK_FIELD,
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+            "recent_ids": sorted((doc_id, ts.isoformat()) for doc_id, ts in self.recent_ids.items()),
+            "score_counts": sorted(self.score_counts.items()),
+        }
+        tmp_path = f"{STATS_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(stats, f)
+        os.replace(tmp_path, STATS_PATH)
 
     def predict_difficulty(self, previous_score: float) -> str:
-        pred = self.model.predict(np.array([[previous_score]]))[0]
-        return ["easy", "medium", "hard"][pred]
+        if self.lookup is None:
+            self.load()
+        thresholds, labels = self.lookup
+        return labels[bisect_right(thresholds, previous_score)]
+
+    def predict_difficulties(self, scores) -> list:
+        if self.lookup is None:
+            self.load()
+        thresholds, labels = self.lookup
+        indices = np.searchsorted(thresholds, np.asarray(scores, dtype=float), side="right")
+        return np.asarray(labels)[indices].tolist()
 
-    def train_from_firebase(self, db) -> None:
+    def train_from_firebase(self, db, full: bool = False) -> int:
+        """Fold newly committed results into the score histogram and refit.
+
+        Results are read by ``committed_at`` (the time the result writer made
+        them visible), not by their own ``timestamp``: a result timestamped
+        before the last run may well be committed after it. With
+        ``full=True`` (or when no statistics exist yet) the histogram is
+        rebuilt from the whole results collection instead.
+        """
         try:
-            docs = db.collection("results").get()
-            X, y = [], []
+            self.load()
+            results = db.collection("results")
+            incremental = not full and self.watermark is not None
+            overlap = timedelta(seconds=RETRAIN_WATERMARK_OVERLAP_SECONDS)
+            if incremental:
+                docs = results.where(_WATERMARK_FIELD, ">", self.watermark - overlap).stream()
+                counts = Counter(self.score_counts)
+                recent_ids = dict(self.recent_ids)
+            else:
+                docs = results.stream()
+                counts = Counter()
+                recent_ids = {}
+
+            watermark = self.watermark if incremental else None
+            consumed = 0
             for doc in docs:
+                if doc.id in recent_ids:
+                    continue
                 data = doc.to_dict()
-                score = data.get("total_score", 0)
-                label = 0 if score < 40 else 1 if score < 70 else 2
-                X.append([score])
-                y.append(label)
-
-            if X and y:
-                self.model.fit(np.array(X), np.array(y))
-                self.save_model()
-                print(f"Model retrained with {len(X)} samples")
+                counts[float(data.get("total_score", 0))] += 1
+                consumed += 1
+                ts = data.get(_WATERMARK_FIELD)
+                if isinstance(ts, datetime):
+                    recent_ids[doc.id] = ts
+                    if watermark is None or ts > watermark:
+                        watermark = ts
+
+            if incremental and not consumed:
+                return sum(counts.values())
+
+            self.score_counts = counts
+            self.watermark = watermark
+            self.recent_ids = {doc_id: ts for doc_id, ts in recent_ids.items()
+                               if watermark is not None and ts > watermark - overlap}
+            if counts:
+                self.fit_from_counts(counts)
+                print(f"Model retrained with {sum(counts.values())} samples ({consumed} new)")
+            self.save_stats()
+            return sum(counts.values())
         except Exception as e:
-            print(f"Training error: {e}")
\ No newline at end of file
+            print(f"Training error: {e}")
+            raise
+
+    def fit_from_counts(self, counts) -> None:
+        scores = sorted(counts)
+        X = np.array([[score] for score in scores])
+        y = np.array([score_label(score) for score in scores])
+        weights = np.array([counts[score] for score in scores], dtype=float)
+
+        # Fit a fresh estimator, publish it, then serve it if it went live.
+        # Predictions only read the compiled lookup table, which is replaced
+        # in one assignment.
+        model = _logistic_regression()
+        model.fit(X, y, sample_weight=weights)
+        artifact = model_artifact(model, samples=int(sum(counts.values())))
+        artifact["version"] = self.registry.publish(artifact)
+        if self.registry.current_version() == artifact["version"]:
+            self.apply_artifact(artifact)
@@ -1,15 +1,132 @@
-def grade_answer(user_answer: str, correct_answer: str) -> dict:
-    if not user_answer or not correct_answer:
-        return {
-            "is_correct": False,
-            "score": 0,
-            "message": "Invalid input"
-        }
-    
-    is_correct = user_answer.strip().lower() == correct_answer.strip().lower()
-    score = 1 if is_correct else 0
+import hashlib
+import threading
+import numpy as np
+
+# Result codes returned by grade_batch, one int8 per submission.
+GRADE_CORRECT = 1
+GRADE_INCORRECT = 0
+GRADE_INVALID = -1
+
+
+def normalize_answer(answer) -> str:
+    return answer.strip().lower() if answer else ""
+
+
+def answer_digest(answer):
+    """SHA-256 of the normalised answer, or None when it is empty.
+
+    Sessions keep this instead of the answer itself, so answer keys are not
+    written to session storage.
+    """
+    normalized = normalize_answer(answer)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest() if normalized else None
+
+
+def _grade(is_correct: bool) -> dict:
     return {
         "is_correct": is_correct,
-        "score": score,
+        "score": 1 if is_correct else 0,
         "message": "Correct" if is_correct else "Incorrect"
-    }
\ No newline at end of file
+    }
+
+
+_INVALID = {
+    "is_correct": False,
+    "score": 0,
+    "message": "Invalid input"
+}
+
+
+def grade_answer(user_answer: str, correct_answer: str) -> dict:
+    if not user_answer or not correct_answer:
+        return dict(_INVALID)
+    return _grade(normalize_answer(user_answer) == normalize_answer(correct_answer))
+
+
+def grade_answer_digest(user_answer: str, key_digest: str) -> dict:
+    """Grade against an ``answer_digest`` of the correct answer."""
+    if not user_answer or not key_digest:
+        return dict(_INVALID)
+    return _grade(answer_digest(user_answer) == key_digest)
+
+
+class AnswerKey:
+    """Normalised correct answers by question id, held in one string array.
+
+    Keys are normalised once when a question is added or changed, so
+    grading only normalises the submitted side. Rows are never reused; a
+    removed question keeps its row with an empty key and grades as invalid.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._keys = []
+        self._array = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, question_id):
+        return question_id in self._rows
+
+    def set(self, question_id, correct_answer):
+        with self._lock:
+            self._set(question_id, correct_answer)
+
+    def _set(self, question_id, correct_answer):
+        row = self._rows.get(question_id)
+        if row is None:
+            self._rows[question_id] = len(self._keys)
+            self._keys.append(normalize_answer(correct_answer))
+        else:
+            self._keys[row] = normalize_answer(correct_answer)
+        self._array = None
+
+    def sync_questions(self, upserted=None, removed=()):
+        """Mirror question-bank changes (``upserted`` maps id to question data)."""
+        with self._lock:
+            for question_id, data in (upserted or {}).items():
+                self._set(question_id, data.get("correct_answer"))
+            for question_id in removed:
+                row = self._rows.get(question_id)
+                if row is not None:
+                    self._keys[row] = ""
+                    self._array = None
+
+    def missing(self, question_ids):
+        return [question_id for question_id in set(question_ids) if question_id not in self._rows]
+
+    def unkeyed(self, question_ids):
+        """Ids that would grade as invalid whatever the answer: unknown,
+        removed from the bank, or stored without a correct answer."""
+        with self._lock:
+            return [question_id for question_id in set(question_ids)
+                    if question_id not in self._rows or not self._keys[self._rows[question_id]]]
+
+    def snapshot(self):
+        """Row map and key array as of now; the array is rebuilt after changes."""
+        with self._lock:
+            if self._array is None:
+                self._array = np.array(self._keys + [""], dtype=str)
+            return self._rows, self._array
+
+
+def grade_batch(question_ids, user_answers, answer_key: AnswerKey) -> np.ndarray:
+    """Grade parallel sequences of question ids and answers in one pass.
+
+    Returns an int8 array of GRADE_CORRECT, GRADE_INCORRECT or GRADE_INVALID
+    (unknown question, question without a key, or empty answer).
+    """
+    rows, keys = answer_key.snapshot()
+    # Unknown ids, and ids added after the snapshot, index the trailing empty key.
+    unknown = len(keys) - 1
+    key_rows = np.fromiter((rows.get(question_id, unknown) for question_id in question_ids),
+                           dtype=np.int64, count=len(question_ids))
+    np.minimum(key_rows, unknown, out=key_rows)
+    answers = np.array([normalize_answer(answer) for answer in user_answers], dtype=str)
+    expected = keys[key_rows]
+
+    results = np.where(expected == answers, GRADE_CORRECT, GRADE_INCORRECT).astype(np.int8)
+    results[(expected == "") | (answers == "")] = GRADE_INVALID
+    return results
@@ -0,0 +1,197 @@
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+MODEL_REGISTRY_DIR = os.environ.get(
+    "MODEL_REGISTRY_DIR", os.path.join(os.path.dirname(__file__), "model_registry"))
+MODEL_REGISTRY_KEEP = int(os.environ.get("MODEL_REGISTRY_KEEP", "20"))
+MODEL_REGISTRY_POLL_SECONDS = float(os.environ.get("MODEL_REGISTRY_POLL_SECONDS", "5"))
+
+_POINTER = "CURRENT"
+# Present while a rolled-back version is pinned live; holds its number.
+_PIN = "PINNED"
+# Held while the pointer or the pin is read and changed.
+_LOCK = ".lock"
+
+
+def _version_name(version):
+    return f"v{version:06d}.json"
+
+
+class ModelRegistry:
+    """Numbered JSON model artifacts plus a pointer to the live version.
+
+    Artifacts are plain dicts (coefficients, thresholds, labels), so they do
+    not depend on the scikit-learn version that produced them. Every file is
+    written to a temporary name first: artifacts are hard-linked into place,
+    which fails rather than overwrites if another process claimed the same
+    version number, and the pointer is replaced with ``os.replace``. Readers
+    therefore never see a partial file.
+
+    A rollback pins the version it points at: later publishes are stored
+    but do not go live until ``unpin`` (or another rollback) is called.
+    Otherwise a publish only ever moves the pointer forward, so of two
+    workers publishing at once the newer version stays live.
+    """
+
+    def __init__(self, directory=MODEL_REGISTRY_DIR, keep=MODEL_REGISTRY_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def versions(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            int(name[1:-5]) for name in os.listdir(self.directory)
+            if name.startswith("v") and name.endswith(".json") and name[1:-5].isdigit()
+        )
+
+    def current_version(self):
+        try:
+            with open(self._path(_POINTER)) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def pinned_version(self):
+        try:
+            with open(self._path(_PIN)) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def load(self, version=None):
+        """The artifact for ``version`` (default: the live one), or None."""
+        version = self.current_version() if version is None else version
+        if version is None:
+            return None
+        try:
+            with open(self._path(_version_name(version))) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def publish(self, artifact):
+        """Store ``artifact`` as a new version and make it live unless a
+        version is pinned; returns the new version."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._path(f".publish.{os.getpid()}.{threading.get_ident()}.tmp")
+        version = (self.versions() or [0])[-1] + 1
+        try:
+            while True:
+                artifact = {**artifact, "version": version, "created_at": datetime.utcnow().isoformat()}
+                with open(tmp_path, "w") as f:
+                    json.dump(artifact, f)
+                try:
+                    os.link(tmp_path, self._path(_version_name(version)))
+                    break
+                except FileExistsError:
+                    version += 1
+        finally:
+            os.remove(tmp_path)
+        with self._pointer_lock():
+            current = self.current_version()
+            if self.pinned_version() is None and (current is None or version > current):
+                self._point_to(version)
+        self._prune()
+        return version
+
+    def rollback(self, version=None):
+        """Point at ``version``, or at the newest version older than the live
+        one, and pin it there."""
+        versions = self.versions()
+        if version is None:
+            current = self.current_version()
+            older = [v for v in versions if current is None or v < current]
+            if not older:
+                raise ValueError("No earlier model version to roll back to")
+            version = older[-1]
+        elif version not in versions:
+            raise ValueError(f"Unknown model version {version}")
+        with self._pointer_lock():
+            self._write(_PIN, version)
+            self._point_to(version)
+        return version
+
+    def unpin(self):
+        """Let publishes go live again; the live version stays until the next one."""
+        with self._pointer_lock():
+            try:
+                os.remove(self._path(_PIN))
+            except FileNotFoundError:
+                pass
+
+    @contextmanager
+    def _pointer_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(_LOCK), "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def _point_to(self, version):
+        self._write(_POINTER, version)
+
+    def _write(self, name, version):
+        tmp_path = self._path(f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(str(version))
+        os.replace(tmp_path, self._path(name))
+
+    def _prune(self):
+        current = self.current_version()
+        for version in self.versions()[: -self.keep]:
+            if version != current and version != self.pinned_version():
+                try:
+                    os.remove(self._path(_version_name(version)))
+                except FileNotFoundError:
+                    pass
+
+
+class RegistryWatcher:
+    """Polls a registry's pointer and hands each newly live artifact to ``callback``."""
+
+    def __init__(self, registry, callback, interval_seconds=MODEL_REGISTRY_POLL_SECONDS):
+        self.registry = registry
+        self.callback = callback
+        self.interval_seconds = interval_seconds
+        self.version = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, version=None):
+        if self._thread is not None:
+            return
+        self.version = version
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-registry-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def check(self):
+        version = self.registry.current_version()
+        if version is None or version == self.version:
+            return False
+        artifact = self.registry.load(version)
+        if artifact is None:
+            return False
+        self.callback(artifact)
+        self.version = version
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Model registry check failed: {e}")
@@ -0,0 +1,165 @@
+import bisect
+import heapq
+import html
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+SEARCH_MAX_LIMIT = int(os.environ.get("SEARCH_MAX_LIMIT", "100"))
+# A one-letter prefix can match thousands of terms; only the most frequent
+# expansions take part in scoring.
+SEARCH_MAX_PREFIX_TERMS = int(os.environ.get("SEARCH_MAX_PREFIX_TERMS", "50"))
+
+# Okapi BM25 parameters (the usual defaults).
+_K1 = 1.2
+_B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(html.unescape(text or "").lower())
+
+
+def question_tokens(data):
+    tokens = tokenize(data.get("question_text"))
+    for option in data.get("options") or ():
+        tokens.extend(tokenize(option))
+    return tokens
+
+
+class SearchIndex:
+    """In-process inverted index over question text and options, ranked by BM25.
+
+    ``postings`` maps each term to ``{question_id: term frequency}``; a sorted
+    term list serves prefix lookups with ``bisect``. Every query token matches
+    the terms it is a prefix of, and a question must match every token.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._terms = []
+        self._question_terms = {}
+        self._lengths = {}
+        self._difficulties = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def _insert(self, question_id, data):
+        self._remove(question_id)
+        counts = Counter(question_tokens(data))
+        for term, frequency in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._terms, term)
+            postings[question_id] = frequency
+        self._question_terms[question_id] = tuple(counts)
+        length = sum(counts.values())
+        self._lengths[question_id] = length
+        self._difficulties[question_id] = data.get("difficulty")
+        self._total_length += length
+
+    def _remove(self, question_id):
+        length = self._lengths.pop(question_id, None)
+        if length is None:
+            return
+        self._difficulties.pop(question_id, None)
+        self._total_length -= length
+        for term in self._question_terms.pop(question_id):
+            postings = self._postings[term]
+            del postings[question_id]
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def add(self, question_id, data):
+        with self._lock:
+            self._insert(question_id, data)
+
+    def remove(self, question_id):
+        with self._lock:
+            self._remove(question_id)
+
+    def sync_questions(self, upserted=None, removed=()):
+        """Question-bank change listener: re-index the text and options of
+        each upserted question and drop the postings of removed ones."""
+        upserted = upserted or {}
+        removed = set(removed)
+        with self._lock:
+            # A bank (re)load hands over every question it keeps; rebuilding
+            # from scratch then beats patching each entry.
+            if (len(upserted) >= len(self._lengths) - len(removed)
+                    and self._lengths.keys() - removed <= upserted.keys()):
+                self._rebuild(upserted)
+                return
+            for question_id, data in upserted.items():
+                self._insert(question_id, data)
+            for question_id in removed:
+                self._remove(question_id)
+
+    def _rebuild(self, questions):
+        postings = {}
+        question_terms = {}
+        lengths = {}
+        for question_id, data in questions.items():
+            counts = Counter(question_tokens(data))
+            for term, frequency in counts.items():
+                postings.setdefault(term, {})[question_id] = frequency
+            question_terms[question_id] = tuple(counts)
+            lengths[question_id] = sum(counts.values())
+        self._postings = postings
+        self._terms = sorted(postings)
+        self._question_terms = question_terms
+        self._lengths = lengths
+        self._difficulties = {question_id: data.get("difficulty") for question_id, data in questions.items()}
+        self._total_length = sum(lengths.values())
+
+    def _expand(self, token):
+        start = bisect.bisect_left(self._terms, token)
+        end = bisect.bisect_left(self._terms, token + "\U0010ffff", start)
+        terms = self._terms[start:end]
+        if len(terms) > SEARCH_MAX_PREFIX_TERMS:
+            terms = sorted(terms, key=lambda term: len(self._postings[term]), reverse=True)[:SEARCH_MAX_PREFIX_TERMS]
+        return terms
+
+    def search(self, query, difficulty=None, limit=20, offset=0):
+        """``(total, [(question_id, score), ...])`` for one page of ranked matches."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return 0, []
+        with self._lock:
+            count = len(self._lengths)
+            if not count:
+                return 0, []
+            average_length = self._total_length / count
+            scores = None
+            for token in tokens:
+                token_scores = {}
+                for term in self._expand(token):
+                    postings = self._postings[term]
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    # Exact matches outrank prefix completions of the same token.
+                    weight = idf if term == token else idf * 0.5
+                    for question_id, frequency in postings.items():
+                        norm = _K1 * (1 - _B + _B * self._lengths[question_id] / average_length)
+                        token_scores[question_id] = (token_scores.get(question_id, 0.0)
+                                                     + weight * frequency * (_K1 + 1) / (frequency + norm))
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {question_id: score + token_scores[question_id]
+                              for question_id, score in scores.items() if question_id in token_scores}
+                if not scores:
+                    return 0, []
+            if difficulty:
+                scores = {question_id: score for question_id, score in scores.items()
+                          if self._difficulties.get(question_id) == difficulty}
+
+        ranked = heapq.nsmallest(offset + limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return len(scores), [(question_id, round(score, 4)) for question_id, score in ranked[offset:]]
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+RETRAIN_EVERY_N_RESULTS = int(os.environ.get("RETRAIN_EVERY_N_RESULTS", "20"))
+RETRAIN_MAX_DELAY_SECONDS = float(os.environ.get("RETRAIN_MAX_DELAY_SECONDS", "300"))
+_MAX_TRACKED_JOBS = 50
+
+
+class RetrainScheduler:
+    """Runs DifficultyModel training on a single background thread.
+
+    A run is triggered once RETRAIN_EVERY_N_RESULTS new results have been
+    reported, once the oldest unprocessed result is RETRAIN_MAX_DELAY_SECONDS
+    old, or when explicitly requested. Requests arriving while a run is queued
+    share that job, so at most one training runs at a time.
+    """
+
+    def __init__(self, model, db, every_n_results=RETRAIN_EVERY_N_RESULTS,
+                 max_delay_seconds=RETRAIN_MAX_DELAY_SECONDS):
+        self.model = model
+        self.db = db
+        self.every_n_results = every_n_results
+        self.max_delay_seconds = max_delay_seconds
+        self._cond = threading.Condition()
+        self._pending_results = 0
+        self._first_pending_at = None
+        self._queued_job = None
+        self._jobs = OrderedDict()
+        self._job_listeners = []
+        self._thread = None
+        self._stopping = False
+
+    def add_job_listener(self, callback):
+        self._job_listeners.append(callback)
+
+    def start(self):
+        if self.db is None or self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="retrain-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def notify_results(self, count=1):
+        with self._cond:
+            if self._pending_results == 0:
+                self._first_pending_at = time.monotonic()
+            self._pending_results += count
+            if self._pending_results >= self.every_n_results:
+                self._cond.notify_all()
+
+    def request_run(self, full=False):
+        with self._cond:
+            if self._queued_job is None:
+                self._queued_job = self._new_job("manual", full)
+                self._cond.notify_all()
+            elif full:
+                self._queued_job["full"] = True
+            return dict(self._queued_job)
+
+    def get_job(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _new_job(self, trigger, full=False):
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "status": "queued",
+            "trigger": trigger,
+            "full": full,
+            "queued_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "duration_seconds": None,
+            "samples": None,
+            "error": None,
+        }
+        self._jobs[job["job_id"]] = job
+        while len(self._jobs) > _MAX_TRACKED_JOBS:
+            self._jobs.popitem(last=False)
+        return job
+
+    def _next_job(self):
+        # Called with the condition held; blocks until a run is due or we stop.
+        while not self._stopping:
+            if self._queued_job is not None:
+                job, self._queued_job = self._queued_job, None
+                return job
+            if self._pending_results >= self.every_n_results:
+                return self._new_job("results")
+            timeout = None
+            if self._pending_results:
+                waited = time.monotonic() - self._first_pending_at
+                if waited >= self.max_delay_seconds:
+                    return self._new_job("interval")
+                timeout = self.max_delay_seconds - waited
+            self._cond.wait(timeout)
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                if job is None:
+                    return
+                self._pending_results = 0
+                self._first_pending_at = None
+                job["status"] = "running"
+                job["started_at"] = datetime.utcnow().isoformat()
+
+            started = time.monotonic()
+            try:
+                samples = self.model.train_from_firebase(self.db, full=job["full"])
+                status, error = "succeeded", None
+            except Exception as e:
+                samples, status, error = None, "failed", str(e)
+
+            with self._cond:
+                job["status"] = status
+                job["samples"] = samples
+                job["error"] = error
+                job["finished_at"] = datetime.utcnow().isoformat()
+                job["duration_seconds"] = time.monotonic() - started
+                finished = dict(job)
+
+            for callback in self._job_listeners:
+                try:
+                    callback(finished)
+                except Exception as e:
+                    print(f"Retrain job listener failed: {e}")
@@ -0,0 +1,208 @@
+"""MinHash/LSH index for spotting near-duplicate question texts.
+
+Texts are normalised (HTML entities decoded, case, punctuation and
+whitespace folded) and cut into overlapping character shingles. A MinHash
+signature of NUM_PERM values estimates the Jaccard similarity of two
+shingle sets as the fraction of positions where the signatures agree.
+Signatures are split into bands; texts sharing any band land in the same
+bucket, so a lookup only compares signatures against a handful of
+candidates instead of the whole bank.
+"""
+import html
+import os
+import re
+import threading
+import numpy as np
+
+# Short questions that differ in one token ("What is 2 + 2?" / "... 2 + 3?")
+# already share ~0.75 of their shingles, so stay above that.
+SIMILARITY_THRESHOLD = float(os.environ.get("SIMILARITY_THRESHOLD", "0.8"))
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+# 32 bands of 4 rows: pairs above ~0.5 similarity almost always share a band.
+NUM_BANDS = 32
+# Texts hashed together by build(); bounds the (NUM_PERM, shingles) matrix.
+_BUILD_CHUNK = 1000
+
+_PRIME = (1 << 31) - 1
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_text(text):
+    return _NON_WORD.sub(" ", html.unescape(text or "").lower()).strip()
+
+
+class SimilarityIndex:
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, num_perm=NUM_PERM, bands=NUM_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Fixed seed: signatures must agree across processes and restarts.
+        # Multiply-shift hashing (odd multiplier, wrapping uint64 arithmetic,
+        # keep the high 32 bits) stands in for a random permutation without
+        # a modulo per element.
+        rng = np.random.default_rng(0x5EED)
+        self._a = (rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) << np.uint64(1) | np.uint64(1))[:, None]
+        self._b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)[:, None]
+        self._band_mix = rng.integers(0, 1 << 63, self.rows, dtype=np.uint64) << np.uint64(1) | np.uint64(1)
+        self._lock = threading.Lock()
+        self._texts = {}
+        self._signatures = {}
+        self._keys = {}
+        self._buckets = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def signature(self, text):
+        return self._signature(normalize_text(text))
+
+    def _signature(self, normalized):
+        if not normalized:
+            return None
+        return self._signatures_of([normalized])[0]
+
+    def _signatures_of(self, texts):
+        """Signatures of non-empty normalised texts, computed in one batch.
+
+        Every shingle of SHINGLE_SIZE bytes is read as a base-257 number over
+        the concatenated texts at once (texts shorter than a shingle are one
+        shingle), then each text's columns are reduced to their minimum.
+        """
+        encoded = [text.encode("utf-8") for text in texts]
+        lengths = np.array([len(data) for data in encoded])
+        widths = np.minimum(lengths, SHINGLE_SIZE)
+        counts = lengths - widths + 1
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+        # Pad so every window start has SHINGLE_SIZE bytes to read.
+        data = np.concatenate([data, np.zeros(SHINGLE_SIZE, dtype=np.uint64)])
+
+        text_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        column_starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        window_starts = np.repeat(text_starts - column_starts, counts) + np.arange(counts.sum())
+        window_widths = np.repeat(widths, counts)
+
+        hashes = np.zeros(len(window_starts), dtype=np.uint64)
+        for offset in range(SHINGLE_SIZE):
+            inside = offset < window_widths
+            hashes[inside] = hashes[inside] * np.uint64(257) + data[window_starts[inside] + offset]
+        hashes %= np.uint64(_PRIME)
+        permuted = (self._a * hashes + self._b) >> np.uint64(32)
+        return np.minimum.reduceat(permuted, column_starts, axis=1).T.astype(np.uint32)
+
+    def _band_keys(self, signatures):
+        """One 64-bit key per band for each row of ``signatures`` (a 2-D array)."""
+        bands = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (bands * self._band_mix).sum(axis=2).tolist()
+
+    def add(self, question_id, text):
+        normalized = normalize_text(text)
+        with self._lock:
+            if self._texts.get(question_id) == normalized:
+                return
+            signature = self._signature(normalized)
+            if signature is None:
+                self._remove(question_id)
+            else:
+                self._insert(question_id, normalized, signature, self._band_keys(signature[None])[0])
+
+    def _insert(self, question_id, normalized, signature, keys):
+        self._remove(question_id)
+        self._texts[question_id] = normalized
+        self._signatures[question_id] = signature
+        self._keys[question_id] = keys
+        for buckets, key in zip(self._buckets, keys):
+            buckets.setdefault(key, set()).add(question_id)
+
+    def remove(self, question_id):
+        with self._lock:
+            self._remove(question_id)
+
+    def _remove(self, question_id):
+        keys = self._keys.pop(question_id, None)
+        self._signatures.pop(question_id, None)
+        self._texts.pop(question_id, None)
+        if keys is None:
+            return
+        for buckets, key in zip(self._buckets, keys):
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.discard(question_id)
+                if not bucket:
+                    del buckets[key]
+
+    def build(self, items):
+        """Index ``(question_id, text)`` pairs, e.g. the whole bank in one pass."""
+        pending = []
+        for question_id, text in items:
+            normalized = normalize_text(text)
+            if self._texts.get(question_id) == normalized:
+                continue
+            if not normalized:
+                self.remove(question_id)
+                continue
+            pending.append((question_id, normalized))
+        for start in range(0, len(pending), _BUILD_CHUNK):
+            chunk = pending[start:start + _BUILD_CHUNK]
+            signatures = self._signatures_of([normalized for _, normalized in chunk])
+            band_keys = self._band_keys(signatures)
+            with self._lock:
+                for (question_id, normalized), signature, keys in zip(chunk, signatures, band_keys):
+                    self._insert(question_id, normalized, signature, keys)
+
+    def sync_questions(self, upserted=None, removed=()):
+        """Question-bank change listener: re-sign upserted question texts in
+        batches and take removed questions out of their LSH buckets."""
+        self.build((question_id, data.get("question_text")) for question_id, data in (upserted or {}).items())
+        for question_id in removed:
+            self.remove(question_id)
+
+    def find_similar(self, text, threshold=None, limit=10, exclude_id=None):
+        """``[(question_id, similarity), ...]`` at or above ``threshold``, most similar first."""
+        threshold = self.threshold if threshold is None else threshold
+        signature = self.signature(text)
+        if signature is None:
+            return []
+        with self._lock:
+            candidates = set()
+            for buckets, key in zip(self._buckets, self._band_keys(signature[None])[0]):
+                candidates.update(buckets.get(key, ()))
+            candidates.discard(exclude_id)
+            if not candidates:
+                return []
+            ids = list(candidates)
+            similarities = (np.stack([self._signatures[c] for c in ids]) == signature).mean(axis=1)
+        matches = [(ids[i], round(float(similarities[i]), 3))
+                   for i in np.argsort(-similarities) if similarities[i] >= threshold]
+        return matches[:limit]
+
+    def clusters(self, threshold=None):
+        """Groups of two or more ids whose texts are near-duplicates, largest first."""
+        threshold = self.threshold if threshold is None else threshold
+        parent = {}
+
+        def find(x):
+            while parent.get(x, x) != x:
+                parent[x] = parent.get(parent[x], parent[x])
+                x = parent[x]
+            return x
+
+        with self._lock:
+            for buckets in self._buckets:
+                for bucket in buckets.values():
+                    if len(bucket) < 2:
+                        continue
+                    # Comparing each member with one anchor keeps this linear
+                    # in bucket size; other bands catch what the anchor misses.
+                    anchor, *others = bucket
+                    anchor_signature = self._signatures[anchor]
+                    for other in others:
+                        if (self._signatures[other] == anchor_signature).mean() >= threshold:
+                            parent.setdefault(anchor, anchor)
+                            parent.setdefault(other, other)
+                            parent[find(other)] = find(anchor)
+
+        groups = {}
+        for question_id in parent:
+            groups.setdefault(find(question_id), set()).add(question_id)
+        return sorted((sorted(group) for group in groups.values() if len(group) > 1), key=len, reverse=True)
@@ -0,0 +1,121 @@
+import math
+import os
+from datetime import timezone
+
+USER_STATS_HISTORY = int(os.environ.get("USER_STATS_HISTORY", "10"))
+# How many recently applied result ids a summary remembers to drop replays;
+# a spool replay only re-commits results from the last few flushes.
+USER_STATS_APPLIED_IDS = int(os.environ.get("USER_STATS_APPLIED_IDS", "1000"))
+STREAK_THRESHOLD = 70
+
+
+def _timestamp_key(ts):
+    """ISO string for ``ts``; aware datetimes are normalised to naive UTC so
+    Firestore timestamps and ``datetime.utcnow()`` values sort together."""
+    if ts is None:
+        return None
+    if not hasattr(ts, "isoformat"):
+        return str(ts)
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts.isoformat()
+
+
+class UserStats:
+    """Running aggregate of one user's quiz results.
+
+    ``add`` is O(1): mean and variance use Welford's update, so the summary
+    never needs the underlying result documents. ``committed_at`` is the
+    newest commit time folded in, a watermark a rebuild compares against.
+    """
+
+    __slots__ = (
+        "attempts",
+        "total_points",
+        "mean_score",
+        "m2",
+        "best_score",
+        "current_streak",
+        "history",
+        "difficulty_counts",
+        "applied_ids",
+        "committed_at",
+    )
+
+    def __init__(self):
+        self.attempts = 0
+        self.total_points = 0.0
+        self.mean_score = 0.0
+        self.m2 = 0.0
+        self.best_score = None
+        self.current_streak = 0
+        self.history = []
+        self.difficulty_counts = {}
+        self.applied_ids = []
+        self.committed_at = None
+
+    def add(self, result, history_length=USER_STATS_HISTORY, result_id=None):
+        score = float(result.get("total_score", 0))
+        self.attempts += 1
+        self.total_points += score
+        delta = score - self.mean_score
+        self.mean_score += delta / self.attempts
+        self.m2 += delta * (score - self.mean_score)
+        self.best_score = score if self.best_score is None else max(self.best_score, score)
+        self.current_streak = self.current_streak + 1 if score >= STREAK_THRESHOLD else 0
+
+        difficulty = result.get("final_difficulty")
+        if difficulty is not None:
+            self.difficulty_counts[difficulty] = self.difficulty_counts.get(difficulty, 0) + 1
+
+        self.history.append({
+            "result_id": result_id,
+            "total_score": score,
+            "final_difficulty": difficulty,
+            "timestamp": _timestamp_key(result.get("timestamp")),
+        })
+        del self.history[:-history_length]
+
+        if result_id is not None:
+            self.applied_ids.append(result_id)
+            del self.applied_ids[:-USER_STATS_APPLIED_IDS]
+        committed_at = _timestamp_key(result.get("committed_at"))
+        if committed_at is not None and (self.committed_at is None or committed_at > self.committed_at):
+            self.committed_at = committed_at
+
+    def includes(self, result_id):
+        """Whether ``result_id`` is among the recent results already folded in."""
+        # Documents written before applied_ids existed only have history.
+        return result_id in self.applied_ids or any(entry.get("result_id") == result_id for entry in self.history)
+
+    def newer_than(self, other):
+        """Whether this summary has folded in a result committed after ``other``'s newest."""
+        return (self.committed_at or "") > (other.committed_at or "")
+
+    @property
+    def variance(self):
+        return self.m2 / self.attempts if self.attempts else 0.0
+
+    def summary(self):
+        return {
+            "attempts": self.attempts,
+            "total_points": self.total_points,
+            "mean_score": self.mean_score,
+            "score_variance": self.variance,
+            "score_stddev": math.sqrt(self.variance),
+            "best_score": self.best_score,
+            "current_streak": self.current_streak,
+            "recent_results": list(reversed(self.history)),
+            "difficulty_distribution": dict(self.difficulty_counts),
+        }
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for name in cls.__slots__:
+            if name in data:
+                setattr(stats, name, data[name])
+        return stats
@@ -0,0 +1,14 @@
+import os
+import tempfile
+
+# Point every backend at an offline datastore and every runtime artifact at a
+# scratch directory before any application module is imported.
+_ARTIFACT_DIR = tempfile.mkdtemp(prefix="nexus-quiz-tests-")
+os.environ.setdefault("DATASTORE_BACKEND", "memory")
+os.environ.setdefault("SESSION_STORE", "memory")
+os.environ.setdefault("METRICS_ENABLED", "0")
+os.environ.setdefault("RESULT_SPOOL_DIR", os.path.join(_ARTIFACT_DIR, "result_spool"))
+os.environ.setdefault("ANSWER_LOG_DIR", os.path.join(_ARTIFACT_DIR, "answer_log"))
+os.environ.setdefault("ADAPTIVE_STATE_PATH", os.path.join(_ARTIFACT_DIR, "adaptive_state.npz"))
+os.environ.setdefault("DIFFICULTY_STATS_PATH", os.path.join(_ARTIFACT_DIR, "difficulty_model_stats.json"))
+os.environ.setdefault("MODEL_REGISTRY_DIR", os.path.join(_ARTIFACT_DIR, "model_registry"))
@@ -0,0 +1,113 @@
+import os
+import threading
+
+import pytest
+
+from quiz_engine.adaptive_engine import AdaptiveEngine
+
+
+def _engine(count=50, difficulty="medium"):
+    engine = AdaptiveEngine()
+    engine.sync_items({f"q{i}": {"difficulty": difficulty} for i in range(count)})
+    return engine
+
+
+def test_equally_informative_items_are_not_always_served_in_the_same_order():
+    engine = _engine()
+    first_questions = {engine.select(0.0) for _ in range(50)}
+    assert len(first_questions) > 10
+
+
+def test_select_prefers_items_near_the_ability_and_skips_excluded_ones():
+    engine = AdaptiveEngine()
+    engine.sync_items({"easy": {"difficulty": "easy"}, "hard": {"difficulty": "hard"}})
+    assert engine.select(1.2) == "hard"
+    assert engine.select(1.2, exclude_ids=["hard"]) == "easy"
+    assert engine.select(1.2, exclude_ids=["hard", "easy"]) is None
+
+
+def test_removed_items_are_not_selected():
+    engine = _engine(count=2)
+    engine.sync_items({}, ["q0"])
+    assert {engine.select(0.0) for _ in range(20)} == {"q1"}
+
+
+def test_load_keeps_items_synced_before_it(tmp_path):
+    path = str(tmp_path / "state.npz")
+    saved = _engine(count=3)
+    saved.record("user@example.com", "q0", correct=False)
+    saved.save(path)
+
+    engine = _engine(count=3)
+    engine.load(path)
+    assert {engine.select(0.0) for _ in range(50)} == {"q0", "q1", "q2"}
+
+
+def test_load_restores_state_for_items_not_yet_synced(tmp_path):
+    path = str(tmp_path / "state.npz")
+    saved = _engine(count=1)
+    saved.record("user@example.com", "q0", correct=False)
+    saved.save(path)
+
+    engine = AdaptiveEngine()
+    engine.load(path)
+    assert engine.select(0.0) is None
+    engine.sync_items({"q0": {"difficulty": "medium"}})
+    assert engine.item_difficulty("q0") == saved.item_difficulty("q0")
+    assert engine.ability("user@example.com") == saved.ability("user@example.com")
+
+
+def test_concurrent_saves_leave_a_loadable_file(tmp_path):
+    path = str(tmp_path / "state.npz")
+    engine = _engine(count=500)
+    threads = [threading.Thread(target=engine.save, args=(path,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    restored = AdaptiveEngine()
+    restored.load(path)
+    assert len(restored.items) == 500
+    assert sorted(os.listdir(tmp_path)) == ["state.npz", "state.npz.lock"]
+
+
+def test_jitter_only_breaks_near_ties():
+    engine = AdaptiveEngine()
+    engine.sync_items({"near": {"irt_difficulty": 0.0}, "close": {"irt_difficulty": 0.02},
+                       "far": {"irt_difficulty": 0.2}})
+    assert {engine.select(0.0) for _ in range(200)} == {"near", "close"}
+
+
+def test_large_tie_sets_are_still_spread():
+    engine = _engine(count=5000)
+    assert len({engine.select(0.0) for _ in range(100)}) > 50
+
+
+def test_failed_state_save_is_raised_to_the_caller(tmp_path, monkeypatch):
+    from backend.routes import quiz
+
+    monkeypatch.setattr(quiz, "ADAPTIVE_STATE_PATH", str(tmp_path / "missing" / "state.npz"))
+    with pytest.raises(OSError):
+        quiz.save_adaptive_state()
+
+
+def test_saves_from_different_workers_are_merged(tmp_path):
+    path = str(tmp_path / "state.npz")
+    first = _engine(count=2)
+    for _ in range(3):
+        first.record("alice@example.com", "q0", correct=True)
+    first.save(path)
+
+    # A second worker that never saw q0 or alice, and has more evidence on q1.
+    second = _engine(count=2)
+    for _ in range(5):
+        second.record("bob@example.com", "q1", correct=False)
+    second.save(path)
+
+    restored = AdaptiveEngine()
+    restored.load(path)
+    assert restored.item_difficulty("q0") == first.item_difficulty("q0")
+    assert restored.item_difficulty("q1") == second.item_difficulty("q1")
+    assert restored.ability("alice@example.com") == first.ability("alice@example.com")
+    assert restored.ability("bob@example.com") == second.ability("bob@example.com")
@@ -0,0 +1,68 @@
+import os
+import random
+
+import numpy as np
+
+from backend.db.answer_log import AnswerLog, AnswerLogReader
+
+
+def test_a_full_segment_is_written_at_once(tmp_path):
+    log = AnswerLog(str(tmp_path), segment_rows=3)
+    for i in range(7):
+        log.record("s1", "user@example.com", f"q{i % 2}", "easy", True, 1000)
+    reader = AnswerLogReader(str(tmp_path))
+    assert len(reader.segments()) == 2
+    assert log.stats()["buffered"] == 1
+
+    log.flush()
+    assert len(reader.segments()) == 3
+    assert log.stats()["segments_total"] == 3
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_segments_are_memory_mapped_and_dictionary_encoded(tmp_path):
+    log = AnswerLog(str(tmp_path))
+    log.record("s1", "a@example.com", "q1", "hard", False, None)
+    log.record("s1", "b@example.com", "q1", "medium", True, 250)
+    segment = AnswerLogReader.read_segment(log.flush())
+    assert isinstance(segment["correct"], np.memmap)
+    assert [str(segment["user_ids"][code]) for code in segment["user"]] == ["a@example.com", "b@example.com"]
+    assert segment["question"].tolist() == [0, 0]
+    assert segment["difficulty"].tolist() == [2, 1]
+    assert segment["response_ms"].tolist() == [-1, 250]
+
+
+def test_item_statistics_add_up_across_segments(tmp_path):
+    rng = random.Random(0)
+    log = AnswerLog(str(tmp_path), segment_rows=50)
+    expected = {}
+    for _ in range(230):
+        # Question ids enter in different segments with different local codes.
+        question_id = f"q{rng.randint(0, 12)}"
+        correct = rng.random() < 0.6
+        response_ms = None if rng.random() < 0.2 else rng.randint(100, 5000)
+        log.record("s", "user@example.com", question_id, "medium", correct, response_ms)
+        entry = expected.setdefault(question_id, {"attempts": 0, "correct": 0, "times": []})
+        entry["attempts"] += 1
+        entry["correct"] += correct
+        if response_ms is not None:
+            entry["times"].append(response_ms)
+    log.flush()
+
+    statistics = AnswerLogReader(str(tmp_path)).item_statistics()
+    assert len(AnswerLogReader(str(tmp_path)).segments()) == 5
+    assert statistics.keys() == expected.keys()
+    for question_id, entry in expected.items():
+        times = entry["times"]
+        assert statistics[question_id] == {
+            "attempts": entry["attempts"],
+            "correct": entry["correct"],
+            "p_correct": round(entry["correct"] / entry["attempts"], 4),
+            "mean_response_ms": round(sum(times) / len(times), 1) if times else None,
+        }
+
+
+def test_reader_of_a_missing_directory_is_empty(tmp_path):
+    reader = AnswerLogReader(str(tmp_path / "missing"))
+    assert reader.segments() == []
+    assert reader.item_statistics() == {}
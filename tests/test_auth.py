@@ -0,0 +1,37 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from backend.auth import PasswordHasher, issue_token, verify_token
+from backend.main import app
+
+
+def test_verify_token_round_trip():
+    claims = verify_token(issue_token("admin@example.com", "admin"))
+    assert claims["sub"] == "admin@example.com"
+    assert claims["role"] == "admin"
+
+
+def test_non_ascii_tokens_are_rejected():
+    payload, signature = issue_token("admin@example.com", "admin").split(".")
+    assert verify_token(f"{payload}.{signature[:-1]}é") is None
+    assert verify_token(f"é{payload}.{signature}") is None
+
+
+def test_non_ascii_bearer_token_is_unauthorised():
+    response = TestClient(app).post("/api/quiz/model/unpin", headers={"Authorization": "Bearer abc.déf".encode("latin-1")})
+    assert response.status_code == 401
+
+
+def test_password_hashing_runs_on_spawned_workers():
+    hasher = PasswordHasher(workers=1)
+
+    async def round_trip():
+        hashed = await hasher.hash("correct horse")
+        return await hasher.verify("correct horse", hashed), await hasher.verify("wrong", hashed)
+
+    try:
+        assert asyncio.run(round_trip()) == (True, False)
+        assert hasher._pool()._mp_context.get_start_method() == "spawn"
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,144 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.db.local_store import MemoryClient
+from backend.db.result_writer import ResultWriter
+from quiz_engine import difficulty_model
+from quiz_engine.difficulty_model import DifficultyModel
+from quiz_engine.model_registry import ModelRegistry
+
+PROBE_SCORES = [float(score) for score in range(0, 101)]
+
+
+@pytest.fixture
+def stats_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "stats.json")
+    monkeypatch.setattr(difficulty_model, "STATS_PATH", path)
+    return path
+
+
+@pytest.fixture
+def db():
+    return MemoryClient()
+
+
+def _model(tmp_path, name):
+    return DifficultyModel(ModelRegistry(str(tmp_path / name)))
+
+
+def _commit_results(db, scores, timestamp=None):
+    # Results reach the collection the way the app writes them: through the
+    # result writer, which stamps committed_at.
+    writer = ResultWriter(db, db.collection("results"))
+    for score in scores:
+        writer.submit({
+            "user_id": "user@example.com",
+            "total_score": score,
+            "timestamp": timestamp or datetime.utcnow(),
+        })
+
+
+def _full_model(tmp_path, db, monkeypatch, name):
+    monkeypatch.setattr(difficulty_model, "STATS_PATH", str(tmp_path / f"{name}.json"))
+    model = _model(tmp_path, name)
+    model.train_from_firebase(db, full=True)
+    return model
+
+
+def test_incremental_training_matches_full_training(tmp_path, db, stats_path, monkeypatch):
+    rng = random.Random(0)
+    incremental = _model(tmp_path, "incremental")
+    for _ in range(4):
+        _commit_results(db, [float(rng.randint(0, 100)) for _ in range(50)])
+        incremental.train_from_firebase(db)
+
+    full = _full_model(tmp_path, db, monkeypatch, "full")
+    assert incremental.score_counts == full.score_counts
+    assert incremental.predict_difficulties(PROBE_SCORES) == full.predict_difficulties(PROBE_SCORES)
+
+
+def test_reading_the_overlap_window_again_does_not_double_count(tmp_path, db, stats_path):
+    model = _model(tmp_path, "model")
+    _commit_results(db, [10.0, 50.0, 90.0])
+    assert model.train_from_firebase(db) == 3
+    _commit_results(db, [95.0])
+    # Every result is inside the overlap window, so all four are re-read.
+    assert model.train_from_firebase(db) == 4
+
+
+def test_late_committed_results_are_counted(tmp_path, db, stats_path, monkeypatch):
+    model = _model(tmp_path, "model")
+    _commit_results(db, [20.0, 60.0])
+    model.train_from_firebase(db)
+
+    # A result finished an hour ago (e.g. replayed from a spool) is only
+    # committed now, after the run above set its watermark.
+    _commit_results(db, [85.0], timestamp=datetime.utcnow() - timedelta(hours=1))
+    model.train_from_firebase(db)
+    assert model.score_counts[85.0] == 1
+    assert model.score_counts == _full_model(tmp_path, db, monkeypatch, "full").score_counts
+
+
+def test_statistics_survive_a_restart(tmp_path, db, stats_path):
+    first = _model(tmp_path, "model")
+    _commit_results(db, [30.0, 70.0])
+    first.train_from_firebase(db)
+
+    restarted = _model(tmp_path, "model")
+    restarted.load_stats()
+    assert restarted.watermark == first.watermark
+    assert restarted.recent_ids == first.recent_ids
+    _commit_results(db, [40.0])
+    assert restarted.train_from_firebase(db) == 3
+
+
+def test_rollback_stays_live_until_unpinned(tmp_path, db, stats_path):
+    model = _model(tmp_path, "model")
+    _commit_results(db, [10.0, 50.0, 90.0])
+    model.train_from_firebase(db)
+    _commit_results(db, [30.0, 70.0])
+    model.train_from_firebase(db)
+    rolled_back = model.rollback()
+
+    _commit_results(db, [40.0])
+    model.train_from_firebase(db)
+    assert model.registry.current_version() == rolled_back
+    assert model.version == rolled_back
+
+    model.registry.unpin()
+    _commit_results(db, [80.0])
+    model.train_from_firebase(db)
+    assert model.registry.current_version() == model.registry.versions()[-1]
+    assert model.version == model.registry.versions()[-1]
+
+
+def _fitted(rng, labels_present):
+    from sklearn.linear_model import LogisticRegression
+
+    ranges = {0: (0, 40), 1: (40, 70), 2: (70, 100)}
+    scores = []
+    for label in labels_present:
+        low, high = ranges[label]
+        scores += [rng.uniform(low, high - 1e-6) for _ in range(rng.randint(1, 30))]
+    model = LogisticRegression(C=rng.choice([0.01, 1.0, 100.0]))
+    model.fit([[score] for score in scores], [difficulty_model.score_label(score) for score in scores])
+    return model
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_lookup_table_matches_sklearn_predict(seed):
+    rng = random.Random(seed)
+    labels_present = sorted(rng.sample([0, 1, 2], rng.choice([2, 3])))
+    estimator = _fitted(rng, labels_present)
+    thresholds, _ = difficulty_model.compile_lookup_table(estimator)
+
+    model = DifficultyModel()
+    model.apply_artifact({**difficulty_model.model_artifact(estimator), "version": 1})
+    probes = [rng.uniform(-50, 150) for _ in range(500)] + PROBE_SCORES
+    # Scores within rounding error of a decision boundary may go either way.
+    probes = [x for x in probes if all(abs(x - t) > 1e-6 for t in thresholds)]
+    expected = [difficulty_model.DIFFICULTY_LABELS[int(c)] for c in estimator.predict([[x] for x in probes])]
+    assert model.predict_difficulties(probes) == expected
+    assert [model.predict_difficulty(x) for x in probes] == expected
@@ -0,0 +1,49 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.auth import issue_token
+from backend.db.question_bank import question_bank
+from backend.main import app
+from backend.routes import quiz
+
+
+@pytest.fixture(autouse=True)
+def loaded_bank():
+    question_bank.reload()
+
+
+def test_grade_batch_caps_reads_of_unknown_questions():
+    client = TestClient(app)
+    submissions = [{"id": f"unknown-{i}", "user_answer": "x"} for i in range(quiz.GRADE_BATCH_FETCH_MAX + 1)]
+    response = client.post("/api/quiz/grade-batch", json={"submissions": submissions})
+    assert response.status_code == 400
+
+
+def test_grade_batch_grades_unknown_questions_as_invalid():
+    client = TestClient(app)
+    response = client.post("/api/quiz/grade-batch", json={"submissions": [{"id": "unknown", "user_answer": "x"}]})
+    assert response.status_code == 200
+    assert response.json()["results"] == [-1]
+
+
+def _store(headers=None, user_id="alice@example.com"):
+    return TestClient(app).post("/api/quiz/grade-batch", headers=headers or {}, json={
+        "submissions": [{"id": "unknown", "user_answer": "x"}], "store": True, "user_id": user_id,
+    })
+
+
+def test_storing_a_submission_requires_authentication():
+    assert _store().status_code == 401
+
+
+def test_users_may_only_store_their_own_submissions():
+    alice = {"Authorization": f"Bearer {issue_token('alice@example.com', 'user')}"}
+    assert _store(alice).status_code == 200
+    assert _store(alice, user_id="bob@example.com").status_code == 403
+
+
+def test_admins_may_store_submissions_for_any_user():
+    admin = {"Authorization": f"Bearer {issue_token('admin@example.com', 'admin')}"}
+    response = _store(admin, user_id="bob@example.com")
+    assert response.status_code == 200
+    assert response.json()["submission_id"]
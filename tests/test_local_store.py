@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.db.local_store import MemoryClient, Query, SQLiteClient
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def collection(request, tmp_path):
+    client = MemoryClient() if request.param == "memory" else SQLiteClient(str(tmp_path / "store.db"))
+    collection = client.collection("results")
+    start = datetime(2024, 1, 1)
+    for i, score in enumerate([40, 90, 10, 90]):
+        collection.document(f"r{i}").set({"total_score": score, "timestamp": start + timedelta(minutes=i)})
+    return collection
+
+
+def _ids(query):
+    return [doc.id for doc in query.stream()]
+
+
+def test_order_by_descending(collection):
+    assert _ids(collection.order_by("total_score", direction=Query.DESCENDING)) == ["r3", "r1", "r0", "r2"]
+    assert _ids(collection.order_by("timestamp", direction=Query.DESCENDING).limit(2)) == ["r3", "r2"]
+    assert _ids(collection.order_by("__name__", direction=Query.DESCENDING)) == ["r3", "r2", "r1", "r0"]
+
+
+def test_start_after_follows_the_direction(collection):
+    query = collection.order_by("total_score", direction=Query.DESCENDING).start_after({"total_score": 90})
+    assert _ids(query) == ["r0", "r2"]
+    assert _ids(collection.order_by("__name__", direction=Query.DESCENDING).start_after("r2")) == ["r1", "r0"]
+    assert _ids(collection.order_by("total_score").start_after({"total_score": 10})) == ["r0", "r1", "r3"]
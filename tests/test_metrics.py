@@ -0,0 +1,56 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend import main, metrics
+from backend.db.firebase_config import questions_collection
+from backend.db.question_bank import question_bank
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # The suite runs with METRICS_ENABLED=0, so instrument a fresh app that
+    # shares the real routes; gauges it registers are dropped afterwards.
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    monkeypatch.setattr(metrics.registry, "_metrics", list(metrics.registry._metrics))
+    instrumented = FastAPI()
+    instrumented.router.routes.extend(main.app.router.routes)
+    main.instrument(instrumented)
+    return TestClient(instrumented)
+
+
+def _scrape(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return response.text, samples
+
+
+def test_requests_are_labelled_by_route_template(client):
+    for email in ("first@example.com", "second@example.com"):
+        assert client.get(f"/api/users/{email}").status_code == 404
+    text, samples = _scrape(client)
+    assert samples['http_requests_total{route="/api/users/{email}",method="GET",status="404"}'] >= 2
+    assert 'http_request_duration_seconds_count{route="/api/users/{email}",method="GET"}' in samples
+    assert "first@example.com" not in text
+
+
+def test_active_session_gauge_follows_quizzes(client):
+    questions_collection.document("metrics-q1").set({
+        "question_text": "What is 3 + 3?", "options": ["5", "6"], "correct_answer": "6", "difficulty": "easy",
+    })
+    question_bank.reload()
+    before = _scrape(client)[1]["quiz_sessions_active"]
+
+    started = client.post("/api/quiz/start", json={"user_id": "metrics@example.com", "previous_score": 10})
+    assert started.status_code == 200
+    assert _scrape(client)[1]["quiz_sessions_active"] == before + 1
+
+    ended = client.post("/api/quiz/end-quiz", json={"session_id": started.json()["session_id"]})
+    assert ended.status_code == 200
+    assert _scrape(client)[1]["quiz_sessions_active"] == before
@@ -0,0 +1,50 @@
+import threading
+from contextlib import contextmanager
+
+from quiz_engine.model_registry import ModelRegistry
+
+
+class StalledRegistry(ModelRegistry):
+    """Reserves its version, then waits before touching the pointer."""
+
+    def __init__(self, directory, gate):
+        super().__init__(directory)
+        self.gate = gate
+
+    @contextmanager
+    def _pointer_lock(self):
+        self.gate.wait(5)
+        with super()._pointer_lock():
+            yield
+
+
+def test_a_slower_concurrent_publish_does_not_move_the_pointer_back(tmp_path):
+    gate = threading.Event()
+    stalled = StalledRegistry(str(tmp_path), gate)
+    published = []
+    worker = threading.Thread(target=lambda: published.append(stalled.publish({"thresholds": [], "labels": ["easy"]})))
+    worker.start()
+    while not stalled.versions():
+        pass
+
+    registry = ModelRegistry(str(tmp_path))
+    newer = registry.publish({"thresholds": [], "labels": ["hard"]})
+    gate.set()
+    worker.join()
+
+    assert published == [newer - 1]
+    assert registry.current_version() == newer
+
+
+def test_rollback_pins_and_unpin_releases(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    first = registry.publish({"thresholds": [], "labels": ["easy"]})
+    registry.publish({"thresholds": [], "labels": ["medium"]})
+    assert registry.rollback() == first
+    assert registry.pinned_version() == first
+
+    registry.publish({"thresholds": [], "labels": ["hard"]})
+    assert registry.current_version() == first
+    registry.unpin()
+    latest = registry.publish({"thresholds": [], "labels": ["hard"]})
+    assert registry.current_version() == latest
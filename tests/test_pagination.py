@@ -0,0 +1,82 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from backend.auth import issue_token
+from backend.db.firebase_config import results_collection
+from backend.db.local_store import MemoryClient
+from backend.db.pagination import MAX_PAGE_SIZE, document_listing
+from backend.main import app
+
+ADMIN = {"Authorization": f"Bearer {issue_token('admin@example.com', 'admin')}"}
+
+
+@pytest.fixture
+def collection():
+    collection = MemoryClient().collection("results")
+    for i in range(23):
+        collection.document(f"doc-{i:03d}").set({
+            "user_id": f"user{i % 4}@example.com",
+            "total_score": float(i),
+            "timestamp": datetime(2026, 1, 1, 12, i),
+        })
+    return collection
+
+
+def test_following_next_page_token_visits_every_document_once(collection):
+    seen = []
+    token = None
+    pages = 0
+    while True:
+        page = document_listing(collection, limit=5, start_after=token)
+        seen.extend(item["id"] for item in page["items"])
+        pages += 1
+        token = page["next_page_token"]
+        if token is None:
+            break
+    assert pages == 5
+    assert seen == [f"doc-{i:03d}" for i in range(23)]
+
+
+def test_an_exactly_full_last_page_ends_with_an_empty_one(collection):
+    first = document_listing(collection, limit=23)
+    assert len(first["items"]) == 23
+    last = document_listing(collection, limit=23, start_after=first["next_page_token"])
+    assert last == {"items": [], "next_page_token": None}
+
+
+def test_fields_project_each_document(collection):
+    page = document_listing(collection, limit=2, fields="total_score, timestamp")
+    assert page["items"][0] == {"id": "doc-000", "total_score": 0.0, "timestamp": "2026-01-01T12:00:00"}
+
+
+def test_without_a_limit_the_plain_list_is_returned(collection):
+    listing = document_listing(collection)
+    assert isinstance(listing, list) and len(listing) == 23
+
+
+@pytest.mark.parametrize("limit", [0, -1, MAX_PAGE_SIZE + 1])
+def test_limits_out_of_range_are_rejected(collection, limit):
+    with pytest.raises(HTTPException) as error:
+        document_listing(collection, limit=limit)
+    assert error.value.status_code == 400
+
+
+def test_results_route_streams_ndjson():
+    for i in range(3):
+        results_collection.document(f"ndjson-{i}").set({"user_id": "user@example.com", "total_score": float(i)})
+    client = TestClient(app)
+    listing = client.get("/api/results/all", headers=ADMIN).json()
+
+    response = client.get("/api/results/all", headers=ADMIN, params={"stream": "true", "fields": "total_score"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.endswith("\n")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == [item["id"] for item in listing]
+    assert all(set(line) <= {"id", "total_score"} for line in lines)
+
+    assert client.get("/api/results/all", headers=ADMIN, params={"limit": 0}).status_code == 400
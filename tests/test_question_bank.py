@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import dependencies
+from backend.db.local_store import MemoryClient
+from backend.db.question_bank import QuestionBank, QuestionBankNotReady
+from backend.main import app
+
+
+class SlowCollection:
+    """Wraps a collection so a full scan blocks until released."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.scanning = threading.Event()
+        self.release = threading.Event()
+
+    def stream(self):
+        self.scanning.set()
+        self.release.wait(5)
+        return self.collection.stream()
+
+    def on_snapshot(self, callback):
+        raise NotImplementedError
+
+
+@pytest.fixture
+def slow_bank():
+    client = MemoryClient()
+    questions = client.collection("questions")
+    questions.document("q1").set({"question_text": "2 + 2?", "correct_answer": "4", "difficulty": "easy"})
+    collection = SlowCollection(questions)
+    bank = QuestionBank(collection, client)
+    loader = threading.Thread(target=bank.start)
+    loader.start()
+    assert collection.scanning.wait(5)
+    yield bank, collection
+    collection.release.set()
+    loader.join()
+
+
+def test_reads_during_first_load_fail_fast(slow_bank):
+    bank, collection = slow_bank
+    with pytest.raises(QuestionBankNotReady):
+        bank.get("q1")
+    collection.release.set()
+    for _ in range(500):
+        if bank.ready():
+            break
+        threading.Event().wait(0.01)
+    assert bank.get("q1")["correct_answer"] == "4"
+
+
+def test_routes_answer_503_until_the_bank_is_loaded(slow_bank, monkeypatch):
+    bank, _ = slow_bank
+    monkeypatch.setattr(dependencies, "question_bank", bank)
+    response = TestClient(app).get("/api/questions/by-difficulty/easy")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(dependencies.QUESTION_BANK_RETRY_AFTER_SECONDS)
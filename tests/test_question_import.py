@@ -0,0 +1,41 @@
+from backend.db.question_import import RequestPacer, fetch_trivia_pages
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+def test_trivia_requests_are_paced_serially():
+    clock = FakeClock()
+    requested_at = []
+    responses = iter([{"token": "t"}, {"response_code": 0, "results": [1]},
+                      {"response_code": 5}, {"response_code": 0, "results": [2]}])
+
+    def http_get(url, params=None, timeout=None):
+        requested_at.append(clock.now)
+        clock.now += 0.5
+        return FakeResponse(next(responses))
+
+    pacer = RequestPacer(interval=5.0, clock=clock, sleep=clock.sleep)
+    pages = list(fetch_trivia_pages(2, http_get=http_get, pacer=pacer))
+
+    assert pages == [(1, [1], None), (2, [2], None)]
+    assert len(requested_at) == 4
+    assert all(later - earlier >= 5.0 for earlier, later in zip(requested_at, requested_at[1:]))
@@ -0,0 +1,43 @@
+import pytest
+
+from backend.db.firebase_config import questions_collection
+from backend.db.question_bank import question_bank
+from backend.db.session_store import QuizSession
+from backend.routes import quiz
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+@pytest.fixture(autouse=True)
+def bank():
+    for difficulty in DIFFICULTIES:
+        for i in range(quiz.QUIZ_LENGTH + 2):
+            questions_collection.document(f"plan-{difficulty}-{i}").set({
+                "question_text": f"{difficulty} question {i}",
+                "options": ["a", "b"],
+                "correct_answer": "a",
+                "difficulty": difficulty,
+            })
+    question_bank.reload()
+
+
+def test_bucket_selection_serves_the_plan_in_order(monkeypatch):
+    monkeypatch.setattr(quiz, "ADAPTIVE_SELECTION", "bucket")
+    session = QuizSession("user@example.com", "medium")
+    session.plan = quiz.build_question_plan()
+    assert set(session.plan) == set(DIFFICULTIES)
+    planned = list(session.plan["medium"])
+    assert len(planned) == quiz.QUIZ_LENGTH
+
+    served = [quiz.select_question(session)["id"] for _ in range(3)]
+    assert served == planned[:3]
+    assert session.plan["medium"] == planned[3:]
+
+
+def test_irt_selection_needs_no_plan(monkeypatch):
+    monkeypatch.setattr(quiz, "ADAPTIVE_SELECTION", "irt")
+    session = QuizSession("user@example.com", "hard")
+    session.ability = 1.0
+    assert quiz.build_question_plan() == {}
+    session.plan = quiz.build_question_plan()
+    assert quiz.select_question(session) is not None
@@ -0,0 +1,41 @@
+from fastapi.testclient import TestClient
+
+from backend.auth import issue_token
+from backend.db.firebase_config import questions_collection
+from backend.db.question_bank import QuestionBankNotReady, question_bank
+from backend.main import app
+
+ADMIN = {"Authorization": f"Bearer {issue_token('admin@example.com', 'admin')}"}
+
+
+def test_all_reads_the_collection_afresh_without_a_listener():
+    question_bank.reload()
+    assert not question_bank.is_live()
+    client = TestClient(app)
+    first = client.get("/api/questions/all", headers=ADMIN)
+    assert first.status_code == 200
+    assert "ETag" not in first.headers
+
+    # Written by another worker: this process's bank has not seen it.
+    questions_collection.document("listing-direct").set({"question_text": "Added elsewhere?", "difficulty": "easy"})
+    second = client.get("/api/questions/all", headers=ADMIN)
+    assert "listing-direct" in [question["id"] for question in second.json()]
+
+
+def test_import_from_api_rejects_out_of_range_sizes():
+    client = TestClient(app)
+    for params in ({"amount": 0}, {"amount": 51}, {"pages": 0}, {"pages": 10_000}):
+        response = client.post("/api/questions/import-from-api", params=params, headers=ADMIN)
+        assert response.status_code == 400, params
+
+
+def test_imports_wait_for_the_question_bank(monkeypatch):
+    def not_ready():
+        raise QuestionBankNotReady("Question bank is still loading")
+
+    monkeypatch.setattr(question_bank, "current_generation", not_ready)
+    client = TestClient(app)
+    for path in ("/api/questions/import-from-api", "/api/questions/import-sample-questions"):
+        response = client.post(path, headers=ADMIN)
+        assert response.status_code == 503, path
+        assert "Retry-After" in response.headers
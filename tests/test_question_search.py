@@ -0,0 +1,103 @@
+from fastapi.testclient import TestClient
+
+from backend.auth import issue_token
+from backend.db.firebase_config import questions_collection
+from backend.db.question_bank import question_bank
+from backend.main import app
+from quiz_engine.question_search import SearchIndex
+
+ADMIN = {"Authorization": f"Bearer {issue_token('admin@example.com', 'admin')}"}
+
+QUESTIONS = {
+    "python": {"question_text": "Which language is named after Monty Python?", "difficulty": "easy",
+               "options": ["Python", "Ruby", "Perl", "Java"]},
+    "snake": {"question_text": "Is a python a venomous snake?", "difficulty": "medium",
+              "options": ["Yes", "No"]},
+    "guido": {"question_text": "Who created the Python programming language, and which Python version came first?",
+              "difficulty": "hard", "options": ["Guido van Rossum", "Linus Torvalds"]},
+    "java": {"question_text": "Which language runs on the JVM?", "difficulty": "easy",
+             "options": ["Java", "C", "Go", "Rust"]},
+}
+
+
+def _index():
+    index = SearchIndex()
+    index.sync_questions(upserted=QUESTIONS)
+    return index
+
+
+def _ids(matches):
+    return [question_id for question_id, _ in matches]
+
+
+def test_bm25_ranks_the_rarer_and_denser_match_first():
+    total, matches = _index().search("python language")
+    assert total == 2
+    # "python" is common to three questions and "language" to three; the
+    # shorter text with both wins over the long one.
+    assert _ids(matches) == ["python", "guido"]
+    assert matches[0][1] > matches[1][1]
+
+
+def test_prefixes_expand_and_rank_below_exact_terms():
+    index = _index()
+    assert _ids(index.search("progr")[1]) == ["guido"]
+    total, matches = index.search("ven snak")
+    assert (total, _ids(matches)) == (1, ["snake"])
+
+    index = SearchIndex()
+    index.add("gopher", {"question_text": "What is the gopher mascot of?"})
+    index.add("go", {"question_text": "What is the go mascot?"})
+    assert _ids(index.search("go")[1]) == ["go", "gopher"]
+
+
+def test_every_token_must_match():
+    assert _index().search("python jvm") == (0, [])
+    assert _index().search("   ") == (0, [])
+
+
+def test_difficulty_filter():
+    total, matches = _index().search("python", difficulty="medium")
+    assert (total, _ids(matches)) == (1, ["snake"])
+
+
+def test_offset_and_limit_page_through_the_ranking():
+    index = _index()
+    total, everything = index.search("python", limit=10)
+    assert total == 3
+    pages = [index.search("python", limit=2, offset=offset)[1] for offset in (0, 2)]
+    assert pages[0] + pages[1] == everything
+    assert len(pages[1]) == 1
+
+
+def test_upsert_and_remove_update_the_postings():
+    index = _index()
+    index.add("snake", {"question_text": "Which animal is a constrictor?", "difficulty": "medium"})
+    assert "snake" not in _ids(index.search("python")[1])
+    assert _ids(index.search("constrictor")[1]) == ["snake"]
+    index.sync_questions(removed=["snake", "java"])
+    assert len(index) == 2
+    assert index.search("constrictor") == (0, [])
+    assert index.search("jvm") == (0, [])
+
+
+def test_search_route_pages_with_next_offset():
+    for i in range(5):
+        questions_collection.document(f"search-{i}").set(
+            {"question_text": f"Zorblax question number {i}", "difficulty": "easy"}
+        )
+    question_bank.reload()
+    client = TestClient(app)
+
+    seen = []
+    offset = 0
+    while offset is not None:
+        response = client.get("/api/questions/search", headers=ADMIN,
+                              params={"q": "zorbl", "limit": 2, "offset": offset})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total"] == 5
+        seen.extend(item["id"] for item in body["items"])
+        offset = body["next_offset"]
+    assert sorted(seen) == [f"search-{i}" for i in range(5)]
+    assert client.get("/api/questions/search", headers=ADMIN, params={"q": "zorbl", "limit": 0}).status_code == 400
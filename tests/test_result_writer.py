@@ -0,0 +1,145 @@
+import glob
+import json
+import os
+import time
+
+import pytest
+
+from backend.db import result_writer as result_writer_module
+from backend.db.local_store import MemoryClient
+from backend.db.result_writer import ResultWriter
+
+
+@pytest.fixture
+def db():
+    return MemoryClient()
+
+
+def _writer(db, spool_dir, **kwargs):
+    kwargs.setdefault("flush_interval", 0.05)
+    writer = ResultWriter(db, db.collection("results"), spool_dir=str(spool_dir), **kwargs)
+    flushed = []
+    writer.add_flush_listener(lambda records: flushed.extend(record["id"] for record in records))
+    return writer, flushed
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _crash(writer):
+    # Stop committing and let go of the spool lock, but leave the file as a
+    # dead process would.
+    writer._stopping.set()
+    writer._thread.join()
+    writer._thread = None
+    writer._spool.close()
+
+
+def _spool_lines(spool_dir):
+    lines = []
+    for path in glob.glob(os.path.join(str(spool_dir), "results.*.jsonl")):
+        with open(path) as f:
+            lines.extend(json.loads(line) for line in f)
+    return lines
+
+
+def test_records_are_committed_in_batches(db, tmp_path):
+    writer, flushed = _writer(db, tmp_path, batch_size=10, flush_interval=0.5)
+    writer.start()
+    ids = [writer.submit({"user_id": "u", "total_score": i}) for i in range(25)]
+    _wait_for(lambda: len(flushed) == 25)
+    writer.stop()
+
+    assert sorted(flushed) == sorted(ids)
+    assert writer.batches_total == 3
+    stored = {doc.id: doc.to_dict() for doc in db.collection("results").stream()}
+    assert set(stored) == set(ids)
+    assert all("committed_at" in data for data in stored.values())
+    assert glob.glob(os.path.join(str(tmp_path), "results.*.jsonl")) == []
+
+
+def test_restart_after_a_crash_does_not_replay_committed_results(db, tmp_path):
+    first, first_flushed = _writer(db, tmp_path)
+    first.start()
+    ids = [first.submit({"user_id": "u", "total_score": i}) for i in range(5)]
+    _wait_for(lambda: len(first_flushed) == 5)
+    committed_at = {doc.id: doc.to_dict()["committed_at"] for doc in db.collection("results").stream()}
+    _crash(first)
+
+    second, second_flushed = _writer(db, tmp_path)
+    second.start()
+    second.stop()
+
+    assert second.replayed_total == 0
+    assert second_flushed == []
+    assert {doc.id: doc.to_dict()["committed_at"] for doc in db.collection("results").stream()} == committed_at
+    assert set(committed_at) == set(ids)
+
+
+def test_replay_commits_only_what_was_not_committed(db, tmp_path):
+    # A crash between a batch commit and its marker: "done" is in the
+    # datastore but not marked in the spool; "lost" never made it.
+    db.collection("results").document("done").set({"total_score": 10, "committed_at": "original"})
+    with open(os.path.join(str(tmp_path), "results.1.dead.jsonl"), "w") as f:
+        for doc_id in ("done", "lost"):
+            f.write(json.dumps({"id": doc_id, "data": {"total_score": 20}}) + "\n")
+        f.write('{"id": "torn", "da')
+
+    writer, flushed = _writer(db, tmp_path)
+    writer.start()
+    _wait_for(lambda: flushed == ["lost"])
+    writer.stop()
+
+    assert writer.replayed_total == 1
+    assert writer.replay_skipped_total == 1
+    assert db.collection("results").document("done").get().to_dict()["committed_at"] == "original"
+    assert db.collection("results").document("lost").get().exists
+
+
+def test_orphaned_spool_is_removed_only_after_it_is_respooled(db, tmp_path):
+    orphan = os.path.join(str(tmp_path), "results.1.dead.jsonl")
+    with open(orphan, "w") as f:
+        f.write(json.dumps({"id": "lost", "data": {"total_score": 20}}) + "\n")
+
+    # A long flush interval holds the replayed record in the queue.
+    writer, _ = _writer(db, tmp_path, flush_interval=1)
+    writer.start()
+    try:
+        assert not os.path.exists(orphan)
+        assert [line["id"] for line in _spool_lines(tmp_path)] == ["lost"]
+    finally:
+        writer.stop()
+
+
+def test_a_spool_claimed_by_another_worker_is_skipped(db, tmp_path, monkeypatch):
+    vanished = os.path.join(str(tmp_path), "results.2.gone.jsonl")
+    monkeypatch.setattr(result_writer_module.glob, "glob", lambda pattern: [vanished])
+    writer, _ = _writer(db, tmp_path)
+    writer.start()
+    writer.stop()
+    assert writer.replayed_total == 0
+
+
+def test_spool_is_compacted_under_steady_load(db, tmp_path):
+    writer, flushed = _writer(db, tmp_path, compact_lines=4, flush_interval=1)
+    writer.start()
+    try:
+        writer.submit({"total_score": 1})
+        # Commit records one at a time while others stay pending.
+        for i in range(6):
+            record = {"id": f"r{i}", "data": {"total_score": i}}
+            with writer._spool_lock:
+                writer._write_spool([record])
+            writer._write_direct([record])
+            writer._mark_committed([record])
+        lines = _spool_lines(tmp_path)
+        assert len(lines) < 4 + 6
+        pending = {line["id"] for line in lines if "id" in line}
+        committed = {doc_id for line in lines if "committed" in line for doc_id in line["committed"]}
+        assert len(pending - committed) == 1
+    finally:
+        writer.stop()
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.auth import issue_token
+from backend.db.local_store import MemoryClient
+from backend.dependencies import MISSING, RoleCache, role_cache
+from backend.main import app
+
+ADMIN = {"Authorization": f"Bearer {issue_token('admin@example.com', 'admin')}"}
+STUDENT = {"Authorization": f"Bearer {issue_token('student@example.com', 'student')}"}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def users():
+    users = MemoryClient().collection("users")
+    users.document("admin@example.com").set({"role": "admin"})
+    users.document("student@example.com").set({"role": "student"})
+    return users
+
+
+def test_roles_are_served_from_the_cache_until_the_ttl(clock, users):
+    cache = RoleCache(users, ttl_seconds=60)
+    assert cache.get_role("admin@example.com") == "admin"
+    users.document("admin@example.com").set({"role": "student"})
+    clock.now += 59
+    assert cache.get_role("admin@example.com") == "admin"
+    clock.now += 1
+    assert cache.lookup("admin@example.com") is MISSING
+    assert cache.get_role("admin@example.com") == "student"
+    assert cache.stats()["hits"] == 1
+
+
+def test_unknown_users_are_cached_as_none(users):
+    cache = RoleCache(users)
+    assert cache.get_role("nobody@example.com") is None
+    assert cache.lookup("nobody@example.com") is None
+
+
+def test_least_recently_used_entries_are_evicted(users):
+    cache = RoleCache(users, max_entries=2)
+    cache.get_role("admin@example.com")
+    cache.get_role("student@example.com")
+    cache.lookup("admin@example.com")
+    cache.get_role("nobody@example.com")
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup("student@example.com") is MISSING
+    assert cache.lookup("admin@example.com") == "admin"
+
+
+def test_invalidate_drops_one_entry_or_all(users):
+    cache = RoleCache(users)
+    cache.get_role("admin@example.com")
+    cache.get_role("student@example.com")
+    cache.invalidate("admin@example.com")
+    assert cache.lookup("admin@example.com") is MISSING
+    assert cache.lookup("student@example.com") == "student"
+    cache.invalidate()
+    assert cache.lookup("student@example.com") is MISSING
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_registering_a_user_invalidates_their_cached_role():
+    email = "new-admin@example.com"
+    assert role_cache.get_role(email) is None
+    client = TestClient(app)
+    response = client.post("/api/users/register", json={"name": "New", "email": email, "role": "admin"})
+    assert response.status_code == 200
+    assert role_cache.lookup(email) is MISSING
+    stats = client.get("/api/users/role-cache/stats", headers={"X-User-Email": email})
+    assert stats.status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/api/users/role-cache/stats", "/api/users/password-hasher/stats"])
+def test_stats_endpoints_are_admin_only(path):
+    client = TestClient(app)
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=STUDENT).status_code == 403
+    assert client.get(path, headers=ADMIN).status_code == 200
@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.db import async_store
+from backend.db.session_store import InMemorySessionStore, QuizSession, SessionStore, SQLiteSessionStore
+from backend.routes import quiz
+
+
+def test_memory_store_calls_run_inline(monkeypatch):
+    async def no_executor(*args):
+        raise AssertionError("in-memory session calls must not hop to the executor")
+
+    store = InMemorySessionStore()
+    monkeypatch.setattr(quiz, "session_store", store)
+    monkeypatch.setattr(async_store.sessions, "run", no_executor)
+    session = QuizSession("user@example.com", "easy")
+    asyncio.run(quiz.session_call(store.save, session))
+    assert asyncio.run(quiz.session_call(store.get, session.session_id)) is session
+
+
+def test_sqlite_store_calls_run_on_the_executor(monkeypatch, tmp_path):
+    calls = []
+
+    async def executor(fn, *args):
+        calls.append(fn.__name__)
+        return fn(*args)
+
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    monkeypatch.setattr(quiz, "session_store", store)
+    monkeypatch.setattr(async_store.sessions, "run", executor)
+    asyncio.run(quiz.session_call(store.get, "missing"))
+    assert calls == ["get"]
+
+
+def test_sessions_store_answer_digests_not_answers(monkeypatch, tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    session = QuizSession("user@example.com", "easy")
+    session.serve({"id": "q1", "difficulty": "easy", "correct_answer": "Paris"})
+    store.save(session)
+    raw = store._conn().execute("SELECT data FROM quiz_sessions").fetchone()[0]
+    assert "Paris" not in raw and "paris" not in raw
+
+    restored = store.get(session.session_id)
+    monkeypatch.setattr(quiz.question_bank, "get", lambda question_id: None)
+    result = asyncio.run(quiz.grade_session_answer(restored, "q1", "  PARIS "))
+    assert result["is_correct"] is True
+    wrong = asyncio.run(quiz.grade_session_answer(restored, "q1", "Lyon"))
+    assert wrong["is_correct"] is False
+
+
+class _Clock:
+    """Stands in for both time.monotonic and time.time."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore(60)
+
+
+def test_memory_sessions_expire_after_the_ttl(clock):
+    store = InMemorySessionStore(ttl_seconds=60)
+    session = QuizSession("user@example.com", "easy")
+    store.save(session)
+    clock.now += 59
+    assert store.get(session.session_id) is session
+    clock.now += 1
+    assert store.get(session.session_id) is None
+    assert store.expired_total == 1
+    assert store.live_count() == 0
+
+
+def test_memory_store_evicts_the_least_recently_used(clock):
+    store = InMemorySessionStore(ttl_seconds=60, max_sessions=2)
+    first, second, third = (QuizSession(f"user{i}@example.com", "easy") for i in range(3))
+    store.save(first)
+    store.save(second)
+    store.get(first.session_id)
+    store.save(third)
+    assert store.get(second.session_id) is None
+    assert store.get(first.session_id) is first
+    assert store.get(third.session_id) is third
+    assert store.evicted_total == 1
+    assert store.expired_total == 0
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_sweep_drops_only_expired_sessions(clock, tmp_path, backend):
+    if backend == "memory":
+        store = InMemorySessionStore(ttl_seconds=60)
+    else:
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl_seconds=60)
+    old = QuizSession("old@example.com", "easy")
+    store.save(old)
+    clock.now += 30
+    fresh = QuizSession("fresh@example.com", "easy")
+    store.save(fresh)
+    clock.now += 30
+    assert store.sweep() == 1
+    assert store.expired_total == 1
+    assert store.last_sweep_at == clock.now
+    assert store.live_count() == 1
+    assert store.get(fresh.session_id) is not None
+
+
+def test_sqlite_sessions_round_trip(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    session = QuizSession("user@example.com", "medium")
+    session.serve({"id": "q1", "difficulty": "medium", "correct_answer": "Au"})
+    session.questions_answered = 1
+    session.answered_questions = ["q0"]
+    session.ability = {"theta": 0.4}
+    session.responses = {"q0": True}
+    session.plan = {"easy": ["q2", "q3"]}
+    SQLiteSessionStore(path).save(session)
+
+    # Another worker opening the same file sees the same session.
+    restored = SQLiteSessionStore(path).get(session.session_id)
+    assert restored is not session
+    assert restored.to_dict() == session.to_dict()
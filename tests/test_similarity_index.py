@@ -0,0 +1,59 @@
+from quiz_engine.similarity_index import SimilarityIndex
+
+RED_PLANET = "Which planet in our solar system is commonly known as the Red Planet because of its reddish appearance?"
+NOVEL = "Who wrote the novel &quot;Pride and Prejudice&quot;?"
+
+
+def _index():
+    index = SimilarityIndex()
+    index.build([
+        ("mars", RED_PLANET),
+        ("austen", NOVEL),
+        ("water", "What is the boiling point of water at sea level in degrees Celsius?"),
+    ])
+    return index
+
+
+def test_reworded_questions_are_found():
+    index = _index()
+    matches = index.find_similar(
+        "Which planet in our solar system is commonly called the Red Planet because of its reddish appearance?"
+    )
+    assert [question_id for question_id, _ in matches] == ["mars"]
+    assert matches[0][1] >= index.threshold
+
+
+def test_html_escaping_case_and_punctuation_are_ignored():
+    assert _index().find_similar('WHO wrote the novel "Pride and Prejudice" ?') == [("austen", 1.0)]
+
+
+def test_unrelated_questions_do_not_match():
+    index = _index()
+    assert index.find_similar("What is the capital city of Australia?") == []
+    assert index.find_similar("Who painted the Mona Lisa?") == []
+    assert index.find_similar("") == []
+
+
+def test_exclude_id_skips_the_question_itself():
+    assert _index().find_similar(RED_PLANET, exclude_id="mars") == []
+
+
+def test_clusters_group_near_duplicates():
+    index = _index()
+    index.add("mars-copy", RED_PLANET.upper())
+    index.add("austen-copy", "Who wrote the novel 'Pride and Prejudice'?")
+    index.add("austen-again", "who  wrote the novel pride and prejudice")
+    assert index.clusters() == [["austen", "austen-again", "austen-copy"], ["mars", "mars-copy"]]
+
+
+def test_sync_questions_applies_upserts_and_removals():
+    index = _index()
+    index.sync_questions(
+        upserted={"mars": {"question_text": "What is the largest moon of Saturn?"}},
+        removed=["austen"],
+    )
+    assert len(index) == 2
+    assert index.find_similar(RED_PLANET) == []
+    assert index.find_similar(NOVEL) == []
+    assert index.find_similar("What is the largest moon of Saturn?") == [("mars", 1.0)]
+    assert index.clusters() == []
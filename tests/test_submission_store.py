@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from backend.db.local_store import MemoryClient
+from backend.db.question_bank import QuestionBank
+from backend.db.submission_store import SubmissionStore, summarize
+from quiz_engine.grader import AnswerKey, grade_batch
+
+
+@pytest.fixture
+def client():
+    client = MemoryClient()
+    questions = client.collection("questions")
+    questions.document("q1").set({"question_text": "2 + 2?", "correct_answer": "4", "difficulty": "easy"})
+    questions.document("q2").set({"question_text": "Capital of France?", "correct_answer": "Paris", "difficulty": "easy"})
+    return client
+
+
+def _bank(client):
+    bank = QuestionBank(client.collection("questions"), client)
+    answer_key = AnswerKey()
+    bank.add_change_listener(answer_key.sync_questions)
+    return bank, answer_key
+
+
+def _store_paper(store, answer_key, question_ids, answers):
+    return store.save({
+        "question_ids": question_ids,
+        "answers": answers,
+        **summarize(grade_batch(question_ids, answers, answer_key)),
+    })
+
+
+def _regrade(store, answer_key, bank):
+    store.start_regrade(answer_key, bank)
+    while store.regrade_status()["status"] == "running":
+        time.sleep(0.01)
+    return store.regrade_status()
+
+
+def test_regrade_before_the_bank_is_loaded_uses_stored_keys(client):
+    store = SubmissionStore(client, client.collection("submissions"))
+    loaded_bank, loaded_key = _bank(client)
+    loaded_bank.reload()
+    paper_id = _store_paper(store, loaded_key, ["q1", "q2"], ["4", "paris"])
+
+    # A fresh worker whose bank has not been loaded yet.
+    bank, answer_key = _bank(client)
+    status = _regrade(store, answer_key, bank)
+    assert status["status"] == "completed"
+    assert status["changed"] == 0
+    assert client.collection("submissions").document(paper_id).get().to_dict()["correct"] == 2
+
+
+def test_regrade_applies_corrected_keys(client):
+    store = SubmissionStore(client, client.collection("submissions"))
+    bank, answer_key = _bank(client)
+    bank.reload()
+    paper_id = _store_paper(store, answer_key, ["q1"], ["5"])
+
+    client.collection("questions").document("q1").set(
+        {"question_text": "2 + 2?", "correct_answer": "5", "difficulty": "easy"})
+    bank.invalidate()
+    status = _regrade(store, answer_key, bank)
+    assert status["changed"] == 1
+    assert client.collection("submissions").document(paper_id).get().to_dict()["results"] == [1]
+
+
+def test_papers_with_deleted_questions_are_skipped(client):
+    store = SubmissionStore(client, client.collection("submissions"))
+    bank, answer_key = _bank(client)
+    bank.reload()
+    paper_id = _store_paper(store, answer_key, ["q1", "q2"], ["4", "Paris"])
+
+    client.collection("questions").document("q2").delete()
+    bank.remove("q2")
+    status = _regrade(store, answer_key, bank)
+    assert status["skipped"] == 1
+    assert client.collection("submissions").document(paper_id).get().to_dict()["results"] == [1, 1]
+
+
+def test_fetch_many_reads_unknown_questions_in_one_batch(client):
+    calls = []
+    get_all = client.get_all
+
+    def counting_get_all(references):
+        calls.append(len(references))
+        return get_all(references)
+
+    client.get_all = counting_get_all
+    bank, answer_key = _bank(client)
+    bank.fetch_many(["q1", "q2", "missing"])
+    assert calls == [3]
+    assert answer_key.unkeyed(["q1", "q2", "missing"]) == ["missing"]
@@ -0,0 +1,96 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.db.local_store import MemoryClient, SQLiteClient
+from backend.db.result_writer import ResultWriter
+from backend.db.user_stats_store import UserStatsStore
+
+EMAIL = "user@example.com"
+
+
+def _store(client):
+    return UserStatsStore(client, client.collection("user_stats"), client.collection("results"))
+
+
+def _record(result_id, score):
+    return {"id": result_id, "data": {"user_id": EMAIL, "total_score": score}}
+
+
+def test_committed_results_update_the_summary():
+    client = MemoryClient()
+    store = _store(client)
+    writer = ResultWriter(client, client.collection("results"))
+    writer.add_flush_listener(store.record_results)
+
+    for score in (80.0, 90.0, 40.0):
+        writer.submit({"user_id": EMAIL, "total_score": score})
+
+    summary = store.get(EMAIL).summary()
+    assert summary["attempts"] == 3
+    assert summary["mean_score"] == pytest.approx(70.0)
+    assert summary["best_score"] == 90.0
+    assert summary["current_streak"] == 0
+
+
+def test_replayed_results_are_counted_once():
+    store = _store(MemoryClient())
+    store.record_results([_record("r1", 50.0), _record("r2", 70.0)])
+    store.record_results([_record("r2", 70.0)])
+    assert store.get(EMAIL).attempts == 2
+
+
+def test_replays_older_than_the_history_are_counted_once():
+    store = _store(MemoryClient())
+    for i in range(15):
+        store.record_results([_record(f"r{i}", 50.0)])
+    store.record_results([_record("r0", 50.0)])
+    assert store.get(EMAIL).attempts == 15
+
+
+def _backfill(store):
+    store.start_backfill()
+    deadline = time.monotonic() + 10
+    while store.backfill_status()["status"] == "running" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return store.backfill_status()
+
+
+def test_backfill_keeps_documents_with_newer_results():
+    client = MemoryClient()
+    store = _store(client)
+    committed = datetime(2026, 1, 1)
+    for i, email in enumerate((EMAIL, "other@example.com")):
+        client.collection("results").document(f"r{i}").set(
+            {"user_id": email, "total_score": 80.0, "timestamp": committed, "committed_at": committed}
+        )
+    # Another worker recorded a result for EMAIL after the stream read;
+    # other@example.com's document is stale and gets rebuilt.
+    store.record_results([{"id": "late", "data": {
+        "user_id": EMAIL, "total_score": 10.0, "committed_at": committed + timedelta(minutes=1),
+    }}])
+    client.collection("user_stats").document("other@example.com").set({"attempts": 7})
+
+    assert _backfill(store)["status"] == "completed"
+    assert store.get(EMAIL).summary()["recent_results"][0]["result_id"] == "late"
+    assert store.get("other@example.com").attempts == 1
+
+
+def test_workers_sharing_a_datastore_do_not_lose_updates(tmp_path):
+    path = str(tmp_path / "store.db")
+    # Separate clients stand in for separate worker processes: only the
+    # datastore transaction, not the in-process lock stripes, is shared.
+    workers = [_store(SQLiteClient(path)) for _ in range(4)]
+
+    def record(worker, start):
+        for i in range(start, start + 25):
+            worker.record_results([_record(f"r{i}", 60.0)])
+
+    threads = [threading.Thread(target=record, args=(worker, n * 25)) for n, worker in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert workers[0].get(EMAIL).attempts == 100